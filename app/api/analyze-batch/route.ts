@@ -0,0 +1,50 @@
+import { NextRequest, NextResponse } from 'next/server';
+
+const PYTHON_BACKEND_URL = process.env.PYTHON_BACKEND_URL || 'http://localhost:8000';
+
+export async function POST(request: NextRequest) {
+  try {
+    // Forward the multipart/zip upload as-is (options are query parameters)
+    // and relay the NDJSON results line by line
+    const response = await fetch(
+      `${PYTHON_BACKEND_URL}/api/v1/analyze-batch${request.nextUrl.search}`,
+      {
+        method: 'POST',
+        headers: {
+          'Content-Type': request.headers.get('Content-Type') || 'application/octet-stream',
+        },
+        body: request.body,
+        // Required by Node's fetch to stream a request body
+        duplex: 'half',
+      } as RequestInit
+    );
+
+    if (!response.ok || !response.body) {
+      const data = await response.json();
+      const retryAfter = response.headers.get('Retry-After');
+      return NextResponse.json(data, {
+        status: response.status,
+        headers: retryAfter ? { 'Retry-After': retryAfter } : undefined,
+      });
+    }
+
+    return new Response(response.body, {
+      headers: {
+        'Content-Type': 'application/x-ndjson',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+      },
+    });
+
+  } catch (error) {
+    console.error('Batch analysis proxy error:', error);
+    return NextResponse.json(
+      {
+        success: false,
+        error: 'Failed to connect to analysis service. Make sure the backend is running.',
+        error_code: 'BACKEND_UNAVAILABLE'
+      },
+      { status: 503 }
+    );
+  }
+}
@@ -0,0 +1,42 @@
+import { NextRequest, NextResponse } from 'next/server';
+
+const PYTHON_BACKEND_URL = process.env.PYTHON_BACKEND_URL || 'http://localhost:8000';
+
+export async function POST(request: NextRequest) {
+  try {
+    const body = await request.json();
+
+    // Forward request to Python backend and relay its event stream unbuffered
+    const response = await fetch(`${PYTHON_BACKEND_URL}/api/v1/analyze-stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify(body),
+    });
+
+    if (!response.ok || !response.body) {
+      const data = await response.json();
+      return NextResponse.json(data, { status: response.status });
+    }
+
+    return new Response(response.body, {
+      headers: {
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+      },
+    });
+
+  } catch (error) {
+    console.error('Analysis stream proxy error:', error);
+    return NextResponse.json(
+      {
+        success: false,
+        error: 'Failed to connect to analysis service. Make sure the backend is running.',
+        error_code: 'BACKEND_UNAVAILABLE'
+      },
+      { status: 503 }
+    );
+  }
+}
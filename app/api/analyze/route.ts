@@ -18,7 +18,12 @@ export async function POST(request: NextRequest) {
     const data = await response.json();
 
     if (!response.ok) {
-      return NextResponse.json(data, { status: response.status });
+      // Pass backpressure hints (429 Retry-After) through to the client
+      const retryAfter = response.headers.get('Retry-After');
+      return NextResponse.json(data, {
+        status: response.status,
+        headers: retryAfter ? { 'Retry-After': retryAfter } : undefined,
+      });
     }
 
     return NextResponse.json(data);
@@ -0,0 +1,43 @@
+import { NextRequest, NextResponse } from 'next/server';
+
+const PYTHON_BACKEND_URL = process.env.PYTHON_BACKEND_URL || 'http://localhost:8000';
+
+// Headers that let the browser cache rendered images and revalidate them cheaply
+const PASSTHROUGH_HEADERS = ['Content-Type', 'ETag', 'Cache-Control', 'Retry-After'];
+
+export async function GET(
+  request: NextRequest,
+  { params }: { params: Promise<{ id: string }> }
+) {
+  const { id } = await params;
+
+  try {
+    const ifNoneMatch = request.headers.get('If-None-Match');
+    const response = await fetch(
+      `${PYTHON_BACKEND_URL}/api/v1/artifacts/${encodeURIComponent(id)}${request.nextUrl.search}`,
+      { headers: ifNoneMatch ? { 'If-None-Match': ifNoneMatch } : undefined }
+    );
+
+    const headers = new Headers();
+    for (const name of PASSTHROUGH_HEADERS) {
+      const value = response.headers.get(name);
+      if (value) headers.set(name, value);
+    }
+
+    return new Response(response.status === 304 ? null : response.body, {
+      status: response.status,
+      headers,
+    });
+
+  } catch (error) {
+    console.error('Artifact proxy error:', error);
+    return NextResponse.json(
+      {
+        success: false,
+        error: 'Failed to connect to analysis service. Make sure the backend is running.',
+        error_code: 'BACKEND_UNAVAILABLE'
+      },
+      { status: 503 }
+    );
+  }
+}
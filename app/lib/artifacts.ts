@@ -0,0 +1,72 @@
+/**
+ * Rendered Image Artifacts
+ *
+ * Analysis responses reference their overlay images by artifact id instead of
+ * carrying multi-megabyte base64 PNGs. The backend keeps artifacts for a
+ * limited time (and loses them on restart), while results live on in
+ * sessionStorage, so each image is fetched once as a downscaled WebP and
+ * stored with the result as a data URL.
+ */
+
+// Widest image the results pages display
+export const ARTIFACT_MAX_WIDTH = 1600;
+
+/**
+ * URL of an artifact through the Next.js proxy
+ */
+export function artifactUrl(id: string, maxWidth: number = ARTIFACT_MAX_WIDTH): string {
+  return `/api/artifacts/${encodeURIComponent(id)}?format=webp&max_width=${maxWidth}`;
+}
+
+function blobToDataUrl(blob: Blob): Promise<string> {
+  return new Promise((resolve, reject) => {
+    const reader = new FileReader();
+    reader.onload = () => resolve(reader.result as string);
+    reader.onerror = () => reject(reader.error);
+    reader.readAsDataURL(blob);
+  });
+}
+
+/**
+ * Fetch an artifact as a WebP data URL, or null if it is gone or the fetch fails
+ */
+export async function fetchArtifactDataUrl(
+  id: string,
+  maxWidth: number = ARTIFACT_MAX_WIDTH
+): Promise<string | null> {
+  try {
+    const response = await fetch(artifactUrl(id, maxWidth));
+    if (!response.ok) return null;
+    return await blobToDataUrl(await response.blob());
+  } catch (error) {
+    console.error("Artifact fetch error:", error);
+    return null;
+  }
+}
+
+/**
+ * Replace artifact references in a result with the fetched images.
+ *
+ * For each field (e.g. "annotated_image"), a result carrying `<field>_id` but
+ * no inline image gets `<field>` set to the image's data URL. Images that
+ * cannot be fetched are left as references; the results page then tries the
+ * artifact URL itself.
+ */
+export async function resolveArtifactImages<T extends object>(
+  result: T,
+  fields: string[]
+): Promise<T> {
+  const record = result as Record<string, unknown>;
+  const resolved: Record<string, unknown> = { ...record };
+
+  await Promise.all(
+    fields.map(async (field) => {
+      const id = record[`${field}_id`];
+      if (record[field] || typeof id !== "string") return;
+      const dataUrl = await fetchArtifactDataUrl(id);
+      if (dataUrl) resolved[field] = dataUrl;
+    })
+  );
+
+  return resolved as T;
+}
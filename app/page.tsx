@@ -24,6 +24,7 @@ import {
   ShieldCheck,
 } from "lucide-react";
 import PhotoGuidance from "./components/PhotoGuidance";
+import { resolveArtifactImages } from "./lib/artifacts";
 
 // Types for orientation
 type ImageOrientation = "standard" | "flipped" | "unknown";
@@ -46,6 +47,7 @@ interface OrientationDetectionResponse {
   success: boolean;
   detection_result: OrientationDetectionResult;
   preview_image: string;
+  upload_id?: string | null;
 }
 
 function FeatureItem({ icon: Icon, text }: { icon: LucideIcon; text: string }) {
@@ -308,6 +310,8 @@ export default function Home() {
     null
   );
   const [isFlipped, setIsFlipped] = useState(false);
+  // Handle of the X-ray staged by orientation detection, so analysis need not re-upload it
+  const [uploadId, setUploadId] = useState<string | null>(null);
 
   const handleDrag = (e: React.DragEvent) => {
     e.preventDefault();
@@ -390,6 +394,7 @@ export default function Home() {
 
     setIsDetecting(true);
     setError(null);
+    setUploadId(null);
 
     try {
       const response = await fetch("/api/detect-orientation", {
@@ -403,6 +408,7 @@ export default function Home() {
       if (data.success) {
         setDetectionResult(data.detection_result);
         setPreviewWithMarker(data.preview_image);
+        setUploadId(data.upload_id ?? null);
       } else {
         setDetectionResult({
           detected_marker: null,
@@ -444,17 +450,25 @@ export default function Home() {
     setError(null);
 
     try {
-      const response = await fetch("/api/analyze", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({
-          image: preview,
-          confirmed_orientation: confirmedOrientation,
-          image_flipped: isFlipped,
-        }),
-      });
+      const analyze = (source: { image: string } | { upload_id: string }) =>
+        fetch("/api/analyze", {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify({
+            ...source,
+            confirmed_orientation: confirmedOrientation,
+            image_flipped: isFlipped,
+          }),
+        });
 
-      const data = await response.json();
+      // Reuse the image staged during orientation detection; re-send it if that expired
+      let response = await analyze(uploadId ? { upload_id: uploadId } : { image: preview });
+      let data = await response.json();
+      if (uploadId && data.detail?.error_code === "UPLOAD_NOT_FOUND") {
+        setUploadId(null);
+        response = await analyze({ image: preview });
+        data = await response.json();
+      }
 
       if (!response.ok) {
         throw new Error(
@@ -462,8 +476,11 @@ export default function Home() {
         );
       }
 
+      // The overlay comes as an artifact reference; keep the image itself with the result
+      const result = await resolveArtifactImages(data, ["annotated_image"]);
+
       // Store with type indicator
-      sessionStorage.setItem("analysisResults", JSON.stringify({ ...data, type: "xray" }));
+      sessionStorage.setItem("analysisResults", JSON.stringify({ ...result, type: "xray" }));
       router.push("/results");
     } catch (err) {
       console.error("Analysis error:", err);
@@ -500,8 +517,11 @@ export default function Home() {
         );
       }
 
+      // The original is kept for progress tracking and landmark editing
+      const result = await resolveArtifactImages(data, ["annotated_image", "original_image"]);
+
       // Store with type indicator
-      sessionStorage.setItem("analysisResults", JSON.stringify({ ...data, type: "photo" }));
+      sessionStorage.setItem("analysisResults", JSON.stringify({ ...result, type: "photo" }));
       router.push("/results");
     } catch (err) {
       console.error("Photo analysis error:", err);
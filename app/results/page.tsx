@@ -12,6 +12,7 @@ import {
 } from "lucide-react";
 import LandmarkEditor, { createDefaultLandmarks } from "@/app/components/LandmarkEditor";
 import { syncAnalysisData, syncProgressPhoto } from "@/app/lib/supabase/sync";
+import { artifactUrl } from "@/app/lib/artifacts";
 
 // Types matching backend schema
 interface Keypoint {
@@ -61,7 +62,8 @@ interface AnalysisResult {
   curve_direction: string;
   schroth_type: string;
   severity: string;
-  annotated_image: string;
+  annotated_image?: string;
+  annotated_image_id?: string;
   exercises: Exercise[];
   confidence_score: number;
   processing_time_ms: number;
@@ -114,7 +116,8 @@ interface PhotoAnalysisResult {
   risk_level: "LOW" | "MEDIUM" | "HIGH";
   risk_factors: string[];
   recommendations: string[];
-  annotated_image: string;
+  annotated_image?: string;
+  annotated_image_id?: string;
   original_image?: string;
   landmarks?: LandmarkPositions;
   image_width?: number;
@@ -253,6 +256,13 @@ function ExerciseCard({
 }
 
 // Format helpers
+// Annotated images are stored with the result, or fetched as a rendered artifact through our proxy
+function annotatedImageSrc(result: { annotated_image?: string; annotated_image_id?: string }): string | undefined {
+  if (result.annotated_image) return result.annotated_image;
+  if (result.annotated_image_id) return artifactUrl(result.annotated_image_id);
+  return undefined;
+}
+
 function formatLocation(location: string): string {
   const map: Record<string, string> = {
     thoracic: "Thoracic",
@@ -1523,7 +1533,7 @@ function PhotoResultsDisplay({ result: initialResult, onNewAnalysis }: { result:
         ) : (
           <div className="relative rounded-[16px] overflow-hidden bg-dark/5">
             <img
-              src={result.annotated_image}
+              src={annotatedImageSrc(result)}
               alt="Analyzed back photo with pose overlay"
               className="w-full h-auto max-h-[500px] object-contain mx-auto"
             />
@@ -2033,6 +2043,8 @@ export default function ResultsPage() {
   const [prediction, setPrediction] = useState<Prediction | null>(null);
   const [flowStep, setFlowStep] = useState<"setup" | "prediction" | "main">("setup");
   const [isEditingProfile, setIsEditingProfile] = useState(false);
+  // Artifact URLs of older results expire with the backend's artifact store
+  const [overlayUnavailable, setOverlayUnavailable] = useState(false);
 
   // Check if this is a photo analysis result
   const isPhotoAnalysis = result?.type === "photo";
@@ -2244,11 +2256,18 @@ export default function ResultsPage() {
         <div className="glass p-6 space-y-6">
           {/* X-ray with Skeleton Overlay */}
           <div className="relative rounded-[16px] overflow-hidden bg-dark/5">
-            <img
-              src={xrayResult.annotated_image}
-              alt="Analyzed X-ray with spine overlay"
-              className="w-full h-auto max-h-[500px] object-contain mx-auto"
-            />
+            {overlayUnavailable ? (
+              <p className="p-6 text-sm text-muted text-center">
+                The annotated X-ray is no longer available. Analyze the image again to view it.
+              </p>
+            ) : (
+              <img
+                src={annotatedImageSrc(xrayResult)}
+                alt="Analyzed X-ray with spine overlay"
+                className="w-full h-auto max-h-[500px] object-contain mx-auto"
+                onError={() => setOverlayUnavailable(true)}
+              />
+            )}
             {/* Legend */}
             <div className="absolute bottom-4 left-4 glass-subtle p-3 text-xs space-y-1">
               <div className="flex items-center gap-2">
@@ -0,0 +1,260 @@
+"""
+Many-image uploads for /analyze-batch.
+
+A batch arrives as multipart/form-data with one or more "images" files, or
+as a zip archive (a single multipart file, or the request body itself with
+application/zip). Files stay spooled on disk and each image is read only
+when its analysis starts, so a large batch never sits in memory at once.
+"""
+
+import json
+import os
+import tempfile
+import zipfile
+import zlib
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, List
+
+from fastapi import HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from starlette.datastructures import UploadFile
+
+from utils.validation import ValidationError, ErrorCodes, MAX_UPLOAD_BYTES
+
+
+BATCH_FIELD = "images"
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+ZIP_CONTENT_TYPES = ("application/zip", "application/x-zip-compressed")
+
+# Largest zip archive accepted as a request body
+MAX_ARCHIVE_BYTES = 4 * 1024 * 1024 * 1024
+
+# Spool request bodies to disk beyond this size
+SPOOL_BYTES = 16 * 1024 * 1024
+
+# How long one image may keep waiting for busy stages before it fails with 429
+MAX_BUSY_WAIT_SECONDS = 300
+
+# Errors zipfile raises for a damaged, encrypted or unsupported member
+ARCHIVE_MEMBER_ERRORS = (zipfile.BadZipFile, zlib.error, NotImplementedError, RuntimeError, EOFError, OSError)
+
+
+@dataclass
+class BatchSettings:
+    """Limits for /analyze-batch."""
+    # Images accepted per request
+    max_images: int = 500
+    # Images of one request analyzed concurrently (enough to fill a micro-batch)
+    concurrency: int = 4
+
+
+_settings = BatchSettings()
+
+
+def configure_batch(max_images: int = 500, concurrency: int = 4) -> BatchSettings:
+    global _settings
+    _settings = BatchSettings(max_images=max(1, max_images), concurrency=max(1, concurrency))
+    return _settings
+
+
+def get_batch_settings() -> BatchSettings:
+    return _settings
+
+
+def too_large(name: str, max_bytes: int) -> ValidationError:
+    return ValidationError(
+        f"{name} is too large. Maximum size is {max_bytes // (1024 * 1024)}MB.",
+        ErrorCodes.IMAGE_TOO_LARGE
+    )
+
+
+class BatchUpload:
+    """The images of a batch request, read one at a time."""
+
+    def __init__(
+        self,
+        names: List[str],
+        read: Callable[[int], bytes],
+        close: Callable[[], Awaitable[None]]
+    ):
+        self.names = names
+        self._read = read
+        self._close = close
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def read(self, index: int) -> bytes:
+        """Bytes of one image. Blocking (reads the spooled file)."""
+        return self._read(index)
+
+    async def close(self) -> None:
+        await self._close()
+
+
+def read_limited(file, name: str, max_bytes: int) -> bytes:
+    """Read a file, failing if it is larger than max_bytes."""
+    data = file.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise too_large(name, max_bytes)
+    if not data:
+        raise ValidationError(f"{name} is empty.", ErrorCodes.INVALID_IMAGE_FORMAT)
+    return data
+
+
+def open_archive(file, max_images: int, max_bytes: int, close: Callable[[], Awaitable[None]]) -> BatchUpload:
+    """Batch over the images in a zip archive (directories and other files are skipped)."""
+    try:
+        archive = zipfile.ZipFile(file)
+    except zipfile.BadZipFile:
+        raise ValidationError("The archive is not a valid zip file.", ErrorCodes.INVALID_IMAGE_FORMAT)
+
+    members = [
+        info for info in archive.infolist()
+        if not info.is_dir()
+        and info.filename.lower().endswith(IMAGE_EXTENSIONS)
+        and not os.path.basename(info.filename).startswith(".")
+        and not info.filename.startswith("__MACOSX/")
+    ]
+    if len(members) > max_images:
+        archive.close()
+        raise ValidationError(
+            f"Too many images ({len(members)}). At most {max_images} are allowed per batch.",
+            ErrorCodes.INVALID_IMAGE_FORMAT
+        )
+
+    def read(index: int) -> bytes:
+        info = members[index]
+        # The declared size may be wrong; read_limited stops at the limit either way
+        if info.file_size > max_bytes:
+            raise too_large(info.filename, max_bytes)
+        try:
+            with archive.open(info) as member:
+                return read_limited(member, info.filename, max_bytes)
+        except ARCHIVE_MEMBER_ERRORS as e:
+            raise ValidationError(
+                f"{info.filename} could not be read from the archive: {e}",
+                ErrorCodes.INVALID_IMAGE_FORMAT
+            )
+
+    async def close_archive() -> None:
+        archive.close()
+        await close()
+
+    return BatchUpload([info.filename for info in members], read, close_archive)
+
+
+def is_zip_upload(upload: UploadFile) -> bool:
+    filename = (upload.filename or "").lower()
+    return filename.endswith(".zip") or (upload.content_type or "") in ZIP_CONTENT_TYPES
+
+
+async def read_batch_form(request: Request, max_images: int, max_bytes: int) -> BatchUpload:
+    """Batch over the files of a multipart form (or the zip archive it carries)."""
+    form = await request.form(max_files=max_images + 1)
+    try:
+        uploads = [f for f in form.getlist(BATCH_FIELD) if isinstance(f, UploadFile)]
+        if not uploads:
+            raise ValidationError(
+                f'Missing "{BATCH_FIELD}" files in multipart upload.',
+                ErrorCodes.INVALID_IMAGE_FORMAT
+            )
+
+        if len(uploads) == 1 and is_zip_upload(uploads[0]):
+            return open_archive(uploads[0].file, max_images, max_bytes, form.close)
+
+        if len(uploads) > max_images:
+            raise ValidationError(
+                f"Too many images ({len(uploads)}). At most {max_images} are allowed per batch.",
+                ErrorCodes.INVALID_IMAGE_FORMAT
+            )
+
+        names = [upload.filename or f"image_{i + 1}" for i, upload in enumerate(uploads)]
+
+        def read(index: int) -> bytes:
+            file = uploads[index].file
+            file.seek(0)
+            return read_limited(file, names[index], max_bytes)
+
+        return BatchUpload(names, read, form.close)
+
+    except BaseException:
+        await form.close()
+        raise
+
+
+async def read_batch_body(request: Request, max_images: int, max_bytes: int) -> BatchUpload:
+    """Batch over a zip archive sent as the request body."""
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+    try:
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > MAX_ARCHIVE_BYTES:
+                raise too_large("Archive", MAX_ARCHIVE_BYTES)
+            spooled.write(chunk)
+        if size == 0:
+            raise ValidationError(
+                "Empty upload. Please send images as multipart files or a zip archive.",
+                ErrorCodes.INVALID_IMAGE_FORMAT
+            )
+        spooled.seek(0)
+
+        async def close() -> None:
+            spooled.close()
+
+        return open_archive(spooled, max_images, max_bytes, close)
+
+    except BaseException:
+        spooled.close()
+        raise
+
+
+async def read_batch_upload(request: Request, max_bytes: int = MAX_UPLOAD_BYTES) -> BatchUpload:
+    """
+    The images of a batch request. Close the returned upload when done.
+
+    Raises:
+        HTTPException: 400 with the usual error_code for missing, empty,
+            oversized or too many images
+    """
+    max_images = _settings.max_images
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("multipart/form-data"):
+            upload = await read_batch_form(request, max_images, max_bytes)
+        else:
+            upload = await read_batch_body(request, max_images, max_bytes)
+
+        if len(upload) == 0:
+            await upload.close()
+            raise ValidationError(
+                "No images found. Please send JPG, PNG or WEBP images.",
+                ErrorCodes.INVALID_IMAGE_FORMAT
+            )
+        return upload
+
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail={
+            "error": e.message,
+            "error_code": e.error_code
+        })
+
+
+def ndjson_line(data: Any) -> str:
+    """Format one newline-delimited JSON record."""
+    return json.dumps(jsonable_encoder(data)) + "\n"
+
+
+def error_record(index: int, filename: str, status_code: int, detail: Any) -> dict:
+    """Batch result line for an image whose analysis failed."""
+    if not isinstance(detail, dict):
+        detail = {"error": str(detail), "error_code": ErrorCodes.MODEL_ERROR}
+    return {
+        "success": False,
+        "index": index,
+        "filename": filename,
+        "error": detail.get("error"),
+        "error_code": detail.get("error_code"),
+        "status_code": status_code,
+    }
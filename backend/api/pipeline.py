@@ -0,0 +1,318 @@
+"""
+Stages of the X-ray analysis pipeline.
+
+/analyze runs them and returns one response; /analyze-stream emits each
+stage's result as soon as it is ready. Blocking work runs on the stage
+executors (see utils/executors.py). Orientation detection and vertebra
+detection do not depend on each other, so both start at once on their own
+executors and are joined before the Cobb angle stage.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from fastapi import HTTPException
+from PIL import Image
+
+from .schemas import (
+    DetectorProfile, CobbAngleMeasurement, Exercise,
+    CurveLocation, CurveDirection, SchrothType, Severity, ImageOrientation
+)
+from scoliovis.model import get_model
+from scoliovis.inference import predict_spine, profile_supported
+from scoliovis.preprocessing import image_to_numpy
+from scoliovis.postprocessing import filter_detections, extract_geometry, mirror_detections
+from scoliovis.geometry import SpineGeometry, geometry_nbytes
+from scoliovis.cobb_angle import calculate_all_cobb_angles, get_primary_cobb_angle
+from scoliovis.classification import (
+    determine_schroth_type, determine_severity, get_primary_curve_info
+)
+from scoliovis.visualization import draw_skeleton_overlay, image_to_base64
+from scoliovis.orientation import (
+    detect_lr_marker, flip_image_horizontal, mirror_detection_result
+)
+from exercises.recommendations import get_exercises_for_schroth_type
+from utils.validation import (
+    validate_detection_results, decode_base64_data, ValidationError, ErrorCodes
+)
+from utils.cache import load_image_cached, cached_outputs, cached_orientation
+from utils.executors import run_stage
+from utils.artifacts import get_artifact_store
+from utils.upload_store import get_upload_store
+
+
+# Where the artifact route is mounted (see api/routes.py)
+ARTIFACTS_PATH = "/api/v1/artifacts"
+
+
+@dataclass(frozen=True)
+class UploadHandle:
+    """An image staged by /detect-orientation (see utils/upload_store.py)."""
+    upload_id: str
+
+
+# A base64 string (JSON endpoints), the raw file bytes (upload endpoints)
+# or a staged upload
+ImageSource = Union[str, bytes, UploadHandle]
+
+
+@dataclass
+class LoadedImage:
+    """A decoded request image, flipped as the user asked."""
+    digest: str
+    # The image as uploaded; detection runs on it and is mirrored when flipped
+    original: Image.Image
+    image: Image.Image
+    pixels: np.ndarray
+    flipped: bool
+
+
+@dataclass
+class CurveAnalysis:
+    """Cobb angles and the classifications derived from them."""
+    cobb_angles: List[CobbAngleMeasurement]
+    primary_cobb_angle: float
+    curve_location: CurveLocation
+    curve_direction: CurveDirection
+    schroth_type: SchrothType
+    severity: Severity
+
+
+def image_bytes(source: ImageSource) -> bytes:
+    """Raw file bytes of a request image."""
+    if isinstance(source, str):
+        return decode_base64_data(source)
+    return source
+
+
+def request_source(image: Optional[str], upload_id: Optional[str]) -> Optional[ImageSource]:
+    """Image source of a JSON request: the staged upload if given, else the base64 image."""
+    return UploadHandle(upload_id) if upload_id else image
+
+
+def staged_image(handle: UploadHandle) -> Tuple[str, Image.Image]:
+    """
+    Digest and decoded image of a staged upload.
+
+    Raises:
+        ValidationError: If the upload is unknown or has expired
+    """
+    upload = get_upload_store().get(handle.upload_id)
+    if upload is None:
+        raise ValidationError(
+            "The uploaded image has expired. Please send the image again.",
+            ErrorCodes.UPLOAD_NOT_FOUND
+        )
+    # Usually the decode /detect-orientation left in the image cache
+    return load_image_cached(upload.data, upload.digest)
+
+
+def decode_request_image(source: Optional[ImageSource], flipped: bool = False) -> LoadedImage:
+    """Decode (cached by content, or staged earlier) and optionally flip an uploaded image."""
+    if source is None:
+        raise ValidationError(
+            "No image provided. Send the image or an upload_id.",
+            ErrorCodes.INVALID_IMAGE_FORMAT
+        )
+    if isinstance(source, UploadHandle):
+        digest, image = staged_image(source)
+    else:
+        digest, image = load_image_cached(image_bytes(source))
+    original = image
+    if flipped:
+        image = flip_image_horizontal(original)
+    return LoadedImage(digest, original, image, image_to_numpy(image), flipped)
+
+
+async def load_image(source: Optional[ImageSource], flipped: bool = False) -> LoadedImage:
+    """Validate, decode and flip the request image."""
+    return await run_stage("decode", decode_request_image, source, flipped)
+
+
+async def resolve_orientation(
+    loaded: LoadedImage,
+    confirmed_orientation: Optional[ImageOrientation] = None
+) -> Tuple[ImageOrientation, float]:
+    """
+    Orientation to measure with: the user's confirmation, or the L/R marker.
+
+    Returns:
+        Tuple of (orientation, confidence)
+    """
+    if confirmed_orientation:
+        return confirmed_orientation, 1.0  # User confirmed
+
+    # Auto-detect orientation on the unflipped image; a flip only moves the marker
+    detection_result = await run_stage(
+        "ocr", cached_orientation, loaded.digest, lambda: detect_lr_marker(loaded.original)
+    )
+    if loaded.flipped:
+        detection_result = mirror_detection_result(detection_result)
+    return detection_result.suggested_orientation, detection_result.confidence
+
+
+async def detect_vertebrae(
+    loaded: LoadedImage,
+    profile: Optional[DetectorProfile] = None
+) -> SpineGeometry:
+    """
+    Run the detector and turn its output into the validated spine geometry.
+
+    Raises:
+        HTTPException: 503 if the model is not loaded
+        ValidationError: If the backend cannot run the requested profile,
+            or the detections are insufficient for analysis
+    """
+    model = get_model()
+    if not model.is_loaded():
+        raise HTTPException(
+            status_code=503,
+            detail="Model not loaded. Please try again later."
+        )
+
+    profile_name = profile.value if profile else None
+    if not profile_supported(profile_name):
+        raise ValidationError(
+            f"Detector profile '{profile_name}' is not available on this deployment's "
+            "inference backend. Omit the profile to use the default.",
+            ErrorCodes.UNSUPPORTED_PROFILE
+        )
+
+    # Run off the event loop so concurrent requests can share a batch;
+    # re-submissions of the same image reuse the cached outputs
+    raw_outputs = await run_stage(
+        "inference", cached_outputs, loaded.digest, profile_name,
+        lambda: predict_spine(loaded.original, profile_name)
+    )
+
+    # A flip is an exact transform: mirror the detections instead of re-running the model
+    if loaded.flipped:
+        raw_outputs = mirror_detections(raw_outputs, loaded.original.width)
+
+    # Filter and process detections
+    filtered = filter_detections(raw_outputs)
+
+    # Validate detection results
+    validate_detection_results(filtered)
+
+    # Extract the spine geometry (Vertebra models are built for the response only)
+    return extract_geometry(filtered)
+
+
+def start_detection(
+    loaded: LoadedImage,
+    confirmed_orientation: Optional[ImageOrientation] = None,
+    profile: Optional[DetectorProfile] = None
+) -> Tuple["asyncio.Task[Tuple[ImageOrientation, float]]", "asyncio.Task[SpineGeometry]"]:
+    """
+    Start orientation detection and vertebra detection side by side.
+
+    OCR and inference run on separate stage executors, so the wait is close
+    to the slower of the two instead of their sum. Pass both tasks to
+    cancel_detection when done, so an early failure does not leave the
+    other running.
+
+    Returns:
+        Tuple of (orientation task, geometry task)
+    """
+    return (
+        asyncio.create_task(resolve_orientation(loaded, confirmed_orientation)),
+        asyncio.create_task(detect_vertebrae(loaded, profile)),
+    )
+
+
+def cancel_detection(*tasks: asyncio.Task) -> None:
+    """Cancel unfinished detection tasks (a call already running on its executor still finishes)."""
+    for task in tasks:
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            # Mark a failure nobody awaited as retrieved, so asyncio does not log it
+            task.exception()
+
+
+async def detect_orientation_and_vertebrae(
+    loaded: LoadedImage,
+    confirmed_orientation: Optional[ImageOrientation] = None,
+    profile: Optional[DetectorProfile] = None
+) -> Tuple[ImageOrientation, float, SpineGeometry]:
+    """
+    Orientation and spine geometry, detected concurrently.
+
+    The first failure is raised as soon as it happens (an orientation error
+    first if both failed) and cancels the other stage.
+
+    Returns:
+        Tuple of (orientation, orientation confidence, geometry)
+    """
+    orientation_task, geometry_task = start_detection(loaded, confirmed_orientation, profile)
+    try:
+        await asyncio.wait((orientation_task, geometry_task), return_when=asyncio.FIRST_EXCEPTION)
+        for task in (orientation_task, geometry_task):
+            if task.done() and task.exception() is not None:
+                raise task.exception()
+
+        orientation, orientation_confidence = await orientation_task
+        return orientation, orientation_confidence, await geometry_task
+    finally:
+        cancel_detection(orientation_task, geometry_task)
+
+
+def analyze_curves(geometry: SpineGeometry, orientation: ImageOrientation) -> CurveAnalysis:
+    """Cobb angles (with orientation for correct left/right) and classifications."""
+    cobb_angles = calculate_all_cobb_angles(geometry, orientation)
+    primary_cobb = get_primary_cobb_angle(cobb_angles)
+    curve_location, curve_direction = get_primary_curve_info(cobb_angles)
+
+    return CurveAnalysis(
+        cobb_angles=cobb_angles,
+        primary_cobb_angle=primary_cobb,
+        curve_location=curve_location,
+        curve_direction=curve_direction,
+        schroth_type=determine_schroth_type(cobb_angles, geometry),
+        severity=determine_severity(primary_cobb)
+    )
+
+
+def recommend_exercises(curves: CurveAnalysis) -> List[Exercise]:
+    """Exercise recommendations for the curve pattern."""
+    return get_exercises_for_schroth_type(curves.schroth_type, limit=6)
+
+
+def publish_image(name: str, render: Callable[[], np.ndarray], pending_bytes: int) -> Dict[str, str]:
+    """
+    Register an image in the artifact store to be rendered on first fetch.
+
+    Returns:
+        Response fields "<name>_id" and "<name>_url"
+    """
+    artifact_id = get_artifact_store().put(render, pending_bytes)
+    return {
+        f"{name}_id": artifact_id,
+        f"{name}_url": f"{ARTIFACTS_PATH}/{artifact_id}",
+    }
+
+
+async def render_annotated_image(
+    loaded: LoadedImage,
+    geometry: SpineGeometry,
+    curves: CurveAnalysis,
+    inline: bool = False
+) -> Dict[str, Optional[str]]:
+    """
+    Skeleton overlay response fields: an artifact id and URL, or with
+    `inline` the base64 PNG itself.
+    """
+    # Capture only what the render needs: a pending artifact keeps its
+    # closure alive, and the store charges it by the size of pixels
+    pixels = loaded.pixels
+    cobb_angles = curves.cobb_angles
+
+    def render() -> np.ndarray:
+        return draw_skeleton_overlay(pixels, geometry, cobb_angles)
+
+    if inline:
+        return {"annotated_image": await run_stage("render", lambda: image_to_base64(render()))}
+    return publish_image("annotated_image", render, pixels.nbytes + geometry_nbytes(geometry))
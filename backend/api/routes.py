@@ -1,70 +1,94 @@
+import asyncio
+import json
 import time
 import uuid
+from typing import Optional
 import numpy as np
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from .schemas import (
     AnalysisRequest, AnalysisResponse, ErrorResponse, HealthResponse,
-    Severity, ImageOrientation,
+    Severity, ImageOrientation, DetectorProfile, ArtifactFormat,
     OrientationDetectionRequest, OrientationDetectionResponse,
     OrientationDetectionResult,
     PhotoAnalysisRequest, PhotoAnalysisResponse, AsymmetryMetrics, RiskLevel,
     LandmarkPosition, LandmarkPositions, RecalculateMetricsRequest
 )
-from scoliovis.model import get_model
-from scoliovis.preprocessing import image_to_numpy
-from scoliovis.postprocessing import (
-    filter_detections, extract_vertebrae, calculate_average_confidence
-)
-from scoliovis.cobb_angle import calculate_all_cobb_angles, get_primary_cobb_angle
-from scoliovis.classification import (
-    determine_schroth_type, determine_severity, get_primary_curve_info
-)
-from scoliovis.visualization import draw_skeleton_overlay, image_to_base64
-from scoliovis.orientation import (
-    detect_lr_marker, flip_image_horizontal, draw_marker_highlight
+from .pipeline import (
+    ImageSource, image_bytes, request_source, decode_request_image, load_image,
+    start_detection, cancel_detection, detect_orientation_and_vertebrae,
+    analyze_curves, recommend_exercises, render_annotated_image, publish_image
 )
-from exercises.recommendations import get_exercises_for_schroth_type
-from utils.validation import (
-    validate_image, validate_detection_results,
-    ValidationError, ErrorCodes
+from .uploads import read_upload
+from .batch import (
+    read_batch_upload, get_batch_settings, ndjson_line, error_record, MAX_BUSY_WAIT_SECONDS
 )
+from scoliovis.model import get_model
+from scoliovis.warmup import is_warming, get_warmup_state, WARMUP_FAILED
+from scoliovis.worker_pool import get_worker_pool
+from scoliovis.postprocessing import calculate_average_confidence
+from scoliovis.visualization import image_to_base64
+from scoliovis.orientation import detect_lr_marker, draw_marker_highlight
+from utils.validation import validate_image_bytes, ValidationError, ErrorCodes
+from utils.cache import get_cache, cached_orientation
+from utils.executors import run_stage, get_stage_stats, StageBusyError
+from utils.artifacts import ARTIFACT_FORMATS, get_artifact_store
+from utils.upload_store import get_upload_store
 
 router = APIRouter()
 
 
-@router.post("/detect-orientation", response_model=OrientationDetectionResponse)
-async def detect_orientation(request: OrientationDetectionRequest):
-    """
-    Detect L/R marker orientation on an X-ray image.
+def busy_error(e: StageBusyError) -> HTTPException:
+    """429 telling the client when to retry, for a stage at capacity."""
+    return HTTPException(
+        status_code=429,
+        detail={"error": str(e), "error_code": ErrorCodes.SERVER_BUSY},
+        headers={"Retry-After": str(e.retry_after)}
+    )
 
-    Returns:
-    - Detected marker (if any)
-    - Suggested orientation
-    - Preview image with marker highlighted
-    """
+
+def sse_event(event: str, data) -> str:
+    """Format one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+async def run_orientation_detection(source: ImageSource) -> OrientationDetectionResponse:
+    """Marker detection shared by the JSON and upload endpoints."""
     try:
-        # Validate and decode image
-        image = validate_image(request.image)
-        image_np = image_to_numpy(image)
+        # Validate and decode image (cached by content)
+        data = await run_stage("decode", image_bytes, source)
+        loaded = await run_stage("decode", decode_request_image, data)
 
         # Detect marker
-        detection_result = detect_lr_marker(image)
+        detection_result = await run_stage(
+            "ocr", cached_orientation, loaded.digest, lambda: detect_lr_marker(loaded.image)
+        )
 
         # Create preview image
-        if detection_result.detected_marker:
-            preview_np = draw_marker_highlight(image_np, detection_result.detected_marker)
-        else:
-            preview_np = image_np
+        def render_preview() -> str:
+            if detection_result.detected_marker:
+                preview_np = draw_marker_highlight(loaded.pixels, detection_result.detected_marker)
+            else:
+                preview_np = loaded.pixels
+            return image_to_base64(preview_np)
+
+        preview_base64 = await run_stage("render", render_preview)
 
-        preview_base64 = image_to_base64(preview_np)
+        # Stage the upload so /analyze can take its upload_id instead of the image
+        upload_id = get_upload_store().put(loaded.digest, data)
 
         return OrientationDetectionResponse(
             success=True,
             detection_result=detection_result,
-            preview_image=preview_base64
+            preview_image=preview_base64,
+            upload_id=upload_id
         )
 
+    except StageBusyError as e:
+        raise busy_error(e)
+
     except ValidationError as e:
         raise HTTPException(status_code=400, detail={
             "error": e.message,
@@ -79,79 +103,66 @@ async def detect_orientation(request: OrientationDetectionRequest):
         })
 
 
-@router.post("/analyze", response_model=AnalysisResponse)
-async def analyze_spine(request: AnalysisRequest):
+@router.post("/detect-orientation", response_model=OrientationDetectionResponse)
+async def detect_orientation(request: OrientationDetectionRequest):
     """
-    Analyze a spine X-ray image and return comprehensive results.
+    Detect L/R marker orientation on an X-ray image.
 
     Returns:
-    - Vertebrae detection (up to 17 vertebrae with 4 keypoints each)
-    - Cobb angle measurements
-    - Curve classification (location, direction)
-    - Schroth type classification
-    - Severity assessment
-    - Personalized exercise recommendations
-    - Annotated image with skeleton overlay
+    - Detected marker (if any)
+    - Suggested orientation
+    - Preview image with marker highlighted
+    - upload_id to send to /analyze instead of the image
     """
-    start_time = time.time()
+    return await run_orientation_detection(request.image)
 
-    try:
-        # 1. Validate and decode image
-        image = validate_image(request.image)
 
-        # 2. Handle image flipping if user requested
-        if request.image_flipped:
-            image = flip_image_horizontal(image)
-
-        image_np = image_to_numpy(image)
-
-        # 3. Determine orientation to use
-        if request.confirmed_orientation:
-            orientation = request.confirmed_orientation
-            orientation_confidence = 1.0  # User confirmed
-        else:
-            # Auto-detect orientation
-            detection_result = detect_lr_marker(image)
-            orientation = detection_result.suggested_orientation
-            orientation_confidence = detection_result.confidence
-
-        # 4. Get model and run inference
-        model = get_model()
-        if not model.is_loaded():
-            raise HTTPException(
-                status_code=503,
-                detail="Model not loaded. Please try again later."
-            )
-
-        raw_outputs = model.predict(image)
-
-        # 3. Filter and process detections
-        filtered = filter_detections(raw_outputs)
+@router.post("/detect-orientation/upload", response_model=OrientationDetectionResponse)
+async def detect_orientation_upload(request: Request):
+    """
+    /detect-orientation for a raw image upload.
 
-        # 4. Validate detection results
-        validate_detection_results(filtered)
+    Send the image file as multipart/form-data (field "image") or as the
+    request body (application/octet-stream or image/*).
+    """
+    return await run_orientation_detection(await read_upload(request))
+
+
+async def run_spine_analysis(
+    source: ImageSource,
+    confirmed_orientation: Optional[ImageOrientation] = None,
+    image_flipped: bool = False,
+    profile: Optional[DetectorProfile] = None,
+    inline_images: bool = False,
+    annotated_image: bool = True
+) -> AnalysisResponse:
+    """Full X-ray analysis shared by the JSON, upload and batch endpoints."""
+    start_time = time.time()
 
-        # 5. Extract vertebrae objects
-        vertebrae = extract_vertebrae(filtered)
+    try:
+        # 1. Validate and decode image (cached by content)
+        # 2. Handle image flipping if user requested
+        loaded = await load_image(source, image_flipped)
 
-        # 6. Calculate Cobb angles (with orientation for correct left/right)
-        cobb_angles = calculate_all_cobb_angles(vertebrae, orientation)
-        primary_cobb = get_primary_cobb_angle(cobb_angles)
+        # 3. Determine orientation to use, while
+        # 4. running inference, filtering, validating and extracting the spine geometry
+        orientation, orientation_confidence, geometry = await detect_orientation_and_vertebrae(
+            loaded, confirmed_orientation, profile
+        )
 
-        # 7. Determine classifications
-        schroth_type = determine_schroth_type(cobb_angles, vertebrae)
-        severity = determine_severity(primary_cobb)
-        curve_location, curve_direction = get_primary_curve_info(cobb_angles)
+        # 5. Calculate Cobb angles and classifications
+        curves = analyze_curves(geometry, orientation)
 
-        # 8. Get exercise recommendations
-        exercises = get_exercises_for_schroth_type(schroth_type, limit=6)
+        # 6. Get exercise recommendations
+        exercises = recommend_exercises(curves)
 
-        # 9. Generate annotated image
-        annotated_np = draw_skeleton_overlay(image_np, vertebrae, cobb_angles)
-        annotated_base64 = image_to_base64(annotated_np)
+        # 7. Publish the annotated image (rendered when first fetched)
+        annotated_fields = {}
+        if annotated_image:
+            annotated_fields = await render_annotated_image(loaded, geometry, curves, inline_images)
 
-        # 10. Calculate confidence
-        confidence_score = calculate_average_confidence(vertebrae)
+        # 8. Calculate confidence
+        confidence_score = calculate_average_confidence(geometry)
 
         # Calculate processing time
         processing_time = (time.time() - start_time) * 1000
@@ -159,22 +170,28 @@ async def analyze_spine(request: AnalysisRequest):
         return AnalysisResponse(
             success=True,
             image_id=str(uuid.uuid4()),
-            vertebrae=vertebrae,
-            total_vertebrae_detected=len(vertebrae),
-            cobb_angles=cobb_angles,
-            primary_cobb_angle=primary_cobb,
-            curve_location=curve_location,
-            curve_direction=curve_direction,
-            schroth_type=schroth_type,
-            severity=severity,
-            annotated_image=annotated_base64,
+            vertebrae=geometry.to_vertebrae(),
+            total_vertebrae_detected=len(geometry),
+            cobb_angles=curves.cobb_angles,
+            primary_cobb_angle=curves.primary_cobb_angle,
+            curve_location=curves.curve_location,
+            curve_direction=curves.curve_direction,
+            schroth_type=curves.schroth_type,
+            severity=curves.severity,
             exercises=exercises,
             confidence_score=round(confidence_score, 3),
             processing_time_ms=round(processing_time, 2),
             orientation_used=orientation,
-            orientation_confidence=round(orientation_confidence, 3)
+            orientation_confidence=round(orientation_confidence, 3),
+            **annotated_fields
         )
 
+    except HTTPException:
+        raise
+
+    except StageBusyError as e:
+        raise busy_error(e)
+
     except ValidationError as e:
         raise HTTPException(status_code=400, detail={
             "error": e.message,
@@ -189,33 +206,328 @@ async def analyze_spine(request: AnalysisRequest):
         })
 
 
+@router.post("/analyze", response_model=AnalysisResponse)
+async def analyze_spine(request: AnalysisRequest):
+    """
+    Analyze a spine X-ray image and return comprehensive results.
+
+    Returns:
+    - Vertebrae detection (up to 17 vertebrae with 4 keypoints each)
+    - Cobb angle measurements
+    - Curve classification (location, direction)
+    - Schroth type classification
+    - Severity assessment
+    - Personalized exercise recommendations
+    - Annotated image with skeleton overlay (URL, or base64 with inline_images)
+    """
+    return await run_spine_analysis(
+        request_source(request.image, request.upload_id),
+        request.confirmed_orientation, request.image_flipped,
+        request.profile, request.inline_images
+    )
+
+
+@router.post("/analyze/upload", response_model=AnalysisResponse)
+async def analyze_spine_upload(
+    request: Request,
+    confirmed_orientation: Optional[ImageOrientation] = None,
+    image_flipped: bool = False,
+    profile: Optional[DetectorProfile] = None,
+    inline_images: bool = False
+):
+    """
+    /analyze for a raw image upload.
+
+    Send the image file as multipart/form-data (field "image") or as the
+    request body (application/octet-stream or image/*); the options of
+    AnalysisRequest are query parameters.
+    """
+    return await run_spine_analysis(
+        await read_upload(request), confirmed_orientation, image_flipped, profile, inline_images
+    )
+
+
+@router.post("/analyze-batch")
+async def analyze_spine_batch(
+    request: Request,
+    confirmed_orientation: Optional[ImageOrientation] = None,
+    profile: Optional[DetectorProfile] = None,
+    annotated_images: bool = True,
+    inline_images: bool = False
+):
+    """
+    Analyze many X-rays and stream one result per line (NDJSON).
+
+    Send the images as multipart/form-data files (field "images", repeated),
+    or as a zip archive (a single "images" file, or the request body with
+    application/zip). Images are analyzed concurrently so they share
+    inference micro-batches, and each line is written as soon as its image
+    is done, so lines arrive in completion order.
+
+    Each line is an AnalysisResponse plus "index" and "filename", or, for an
+    image that failed, success=false with index, filename, error, error_code
+    and status_code. confirmed_orientation, if given, applies to every image
+    (otherwise each one's L/R marker is detected). With annotated_images=false
+    no skeleton overlay is produced, which keeps bulk runs cheap.
+    """
+    if not get_model().is_loaded():
+        raise HTTPException(
+            status_code=503,
+            detail="Model not loaded. Please try again later."
+        )
+
+    upload = await read_batch_upload(request)
+    concurrency = get_batch_settings().concurrency
+
+    async def analyze_item(index: int) -> str:
+        filename = upload.names[index]
+        # Bulk runs wait out busy stages instead of failing the image, up to a deadline
+        deadline = time.monotonic() + MAX_BUSY_WAIT_SECONDS
+
+        async def wait_busy(retry_after: int) -> bool:
+            if time.monotonic() + retry_after > deadline:
+                return False
+            await asyncio.sleep(retry_after)
+            return True
+
+        while True:
+            try:
+                data = await run_stage("decode", upload.read, index)
+                response = await run_spine_analysis(
+                    data, confirmed_orientation, profile=profile, inline_images=inline_images,
+                    annotated_image=annotated_images
+                )
+                return ndjson_line({"index": index, "filename": filename, **response.model_dump()})
+
+            except StageBusyError as e:
+                if await wait_busy(e.retry_after):
+                    continue
+                return ndjson_line(error_record(index, filename, 429, {
+                    "error": str(e), "error_code": ErrorCodes.SERVER_BUSY
+                }))
+
+            except HTTPException as e:
+                if e.status_code == 429 and await wait_busy(int(e.headers.get("Retry-After", "1"))):
+                    continue
+                return ndjson_line(error_record(index, filename, e.status_code, e.detail))
+
+            except ValidationError as e:
+                return ndjson_line(error_record(
+                    index, filename, 400, {"error": e.message, "error_code": e.error_code}
+                ))
+
+            except Exception as e:
+                # One unreadable image must not end the stream for the others
+                print(f"Batch item error ({filename}): {str(e)}")
+                return ndjson_line(error_record(index, filename, 500, {
+                    "error": f"Analysis failed: {str(e)}", "error_code": ErrorCodes.MODEL_ERROR
+                }))
+
+    async def lines():
+        pending = set()
+        next_index = 0
+        try:
+            while next_index < len(upload) or pending:
+                while next_index < len(upload) and len(pending) < concurrency:
+                    pending.add(asyncio.create_task(analyze_item(next_index)))
+                    next_index += 1
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            # Client went away: stop the images still in progress
+            for task in pending:
+                task.cancel()
+            await upload.close()
+
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/analyze-stream")
+async def analyze_spine_stream(request: AnalysisRequest):
+    """
+    Analyze a spine X-ray and stream results as Server-Sent Events.
+
+    Same analysis as /analyze, but each stage's result is sent as soon as it
+    is ready, so measurements arrive before the annotated image is rendered.
+
+    Events, in order:
+    - orientation: orientation_used, orientation_confidence
+    - vertebrae: vertebrae, total_vertebrae_detected, confidence_score
+    - measurements: Cobb angles, curve location/direction, Schroth type, severity
+    - exercises: exercise recommendations
+    - annotated_image: skeleton overlay URL (or base64 PNG with inline_images)
+    - done: image_id, processing_time_ms
+
+    A failure ends the stream with an error event carrying error, error_code
+    and status_code (plus retry_after when the server is busy).
+    """
+    start_time = time.time()
+
+    async def events():
+        detection = ()
+        try:
+            loaded = await load_image(
+                request_source(request.image, request.upload_id), request.image_flipped
+            )
+
+            # Inference runs while the orientation is detected; events keep their order
+            detection = start_detection(loaded, request.confirmed_orientation, request.profile)
+            orientation_task, geometry_task = detection
+
+            orientation, orientation_confidence = await orientation_task
+            yield sse_event("orientation", {
+                "orientation_used": orientation,
+                "orientation_confidence": round(orientation_confidence, 3)
+            })
+
+            geometry = await geometry_task
+            yield sse_event("vertebrae", {
+                "vertebrae": geometry.to_vertebrae(),
+                "total_vertebrae_detected": len(geometry),
+                "confidence_score": round(calculate_average_confidence(geometry), 3)
+            })
+
+            curves = analyze_curves(geometry, orientation)
+            yield sse_event("measurements", curves)
+
+            yield sse_event("exercises", {"exercises": recommend_exercises(curves)})
+
+            yield sse_event("annotated_image", await render_annotated_image(
+                loaded, geometry, curves, request.inline_images
+            ))
+
+            yield sse_event("done", {
+                "image_id": str(uuid.uuid4()),
+                "processing_time_ms": round((time.time() - start_time) * 1000, 2)
+            })
+
+        except StageBusyError as e:
+            yield sse_event("error", {
+                "error": str(e),
+                "error_code": ErrorCodes.SERVER_BUSY,
+                "status_code": 429,
+                "retry_after": e.retry_after
+            })
+
+        except ValidationError as e:
+            yield sse_event("error", {
+                "error": e.message,
+                "error_code": e.error_code,
+                "status_code": 400
+            })
+
+        except HTTPException as e:
+            # Structured details (upload not found, busy, ...) keep their own code
+            detail = e.detail
+            if not isinstance(detail, dict):
+                detail = {"error": str(detail), "error_code": ErrorCodes.MODEL_ERROR}
+            event = {
+                "error": detail.get("error"),
+                "error_code": detail.get("error_code"),
+                "status_code": e.status_code
+            }
+            if e.headers and "Retry-After" in e.headers:
+                event["retry_after"] = int(e.headers["Retry-After"])
+            yield sse_event("error", event)
+
+        except Exception as e:
+            print(f"Analysis stream error: {str(e)}")
+            yield sse_event("error", {
+                "error": f"Analysis failed: {str(e)}",
+                "error_code": ErrorCodes.MODEL_ERROR,
+                "status_code": 500
+            })
+
+        finally:
+            cancel_detection(*detection)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/artifacts/{artifact_id}")
+async def get_artifact(
+    artifact_id: str,
+    request: Request,
+    format: ArtifactFormat = ArtifactFormat.WEBP,
+    max_width: Optional[int] = Query(default=None, ge=16, le=8192)
+):
+    """
+    Serve a rendered image referenced by an analysis response.
+
+    The image is drawn on the first fetch and each format/width variant is
+    encoded once. Responses carry a strong ETag and may be cached by the
+    browser until the artifact expires.
+    """
+    try:
+        fetched = await run_stage(
+            "render", get_artifact_store().fetch, artifact_id, format.value, max_width
+        )
+    except StageBusyError as e:
+        raise busy_error(e)
+
+    if fetched is None:
+        raise HTTPException(status_code=404, detail={
+            "error": "Image not found or expired. Please run the analysis again.",
+            "error_code": ErrorCodes.ARTIFACT_NOT_FOUND
+        })
+
+    data, etag, expires_at = fetched
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={max(0, int(expires_at - time.time()))}, immutable",
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    _, media_type, _ = ARTIFACT_FORMATS[format.value]
+    return Response(content=data, media_type=media_type, headers=headers)
+
+
 @router.get("/health", response_model=HealthResponse)
 async def health_check():
     """
     Check if the API and model are ready.
+
+    Responds 503 while the model is warming up so load balancers
+    keep traffic away from a cold instance, and for good once the
+    inference workers have failed, since every analysis would fail.
     """
     model = get_model()
+    pool = get_worker_pool()
+    if get_warmup_state() == WARMUP_FAILED or (pool is not None and pool.is_broken()):
+        response = HealthResponse(
+            status="unavailable", model_loaded=False,
+            cache=get_cache().stats(), stages=get_stage_stats()
+        )
+        return JSONResponse(status_code=503, content=response.model_dump())
+
+    # Worker pool models count as loaded only once warmed up
+    if is_warming():
+        response = HealthResponse(
+            status="warming", model_loaded=model.is_loaded(), warming_up=True,
+            cache=get_cache().stats(), stages=get_stage_stats()
+        )
+        return JSONResponse(status_code=503, content=response.model_dump())
+
     return HealthResponse(
         status="healthy" if model.is_loaded() else "initializing",
-        model_loaded=model.is_loaded()
+        model_loaded=model.is_loaded(),
+        cache=get_cache().stats(),
+        stages=get_stage_stats()
     )
 
 
-@router.post("/analyze-photo", response_model=PhotoAnalysisResponse)
-async def analyze_photo(request: PhotoAnalysisRequest):
-    """
-    Analyze a back photo for scoliosis screening indicators.
-
-    This is a SCREENING TOOL ONLY, not a diagnostic tool.
-    It uses pose estimation to detect postural asymmetries that may indicate scoliosis.
-
-    Returns:
-    - Asymmetry metrics (shoulder/hip height differences, trunk shift, rotation)
-    - Risk level assessment (LOW, MEDIUM, HIGH)
-    - Human-readable risk factors
-    - Recommendations based on findings
-    - Annotated image with pose overlay
-    """
+async def run_photo_analysis(source: ImageSource, inline_images: bool = False) -> PhotoAnalysisResponse:
+    """Back photo screening shared by the JSON and upload endpoints."""
     from photo_analysis import (
         analyze_back_photo,
         validate_photo_for_analysis,
@@ -228,27 +540,47 @@ async def analyze_photo(request: PhotoAnalysisRequest):
 
     try:
         # 1. Validate and decode image
-        image = validate_image(request.image)
+        image = await run_stage("decode", lambda: validate_image_bytes(image_bytes(source)))
 
         # 2. Validate photo is suitable for analysis
-        validation_result = validate_photo_for_analysis(image)
-        if not validation_result.is_valid:
-            raise ValidationError(
-                message=validation_result.error_message or "Invalid photo",
-                error_code=ErrorCodes.INVALID_IMAGE_FORMAT
+        # 3. Run analysis
+        def detect_pose():
+            validation_result = validate_photo_for_analysis(image)
+            if not validation_result.is_valid:
+                raise ValidationError(
+                    message=validation_result.error_message or "Invalid photo",
+                    error_code=ErrorCodes.INVALID_IMAGE_FORMAT
+                )
+            return analyze_back_photo(image)
+
+        result = await run_stage("pose", detect_pose)
+
+        # 4. Annotated image (and the original for the landmark editor),
+        # rendered when first fetched unless requested inline
+        def render_overlay() -> np.ndarray:
+            return draw_pose_overlay(
+                image,
+                result.landmarks,
+                result.metrics,
+                result.risk_level
             )
 
-        # 3. Run analysis
-        result = analyze_back_photo(image)
-
-        # 4. Generate annotated image
-        annotated_np = draw_pose_overlay(
-            image,
-            result.landmarks,
-            result.metrics,
-            result.risk_level
-        )
-        annotated_base64 = image_to_base64(annotated_np)
+        def render_original() -> np.ndarray:
+            return np.array(image)
+
+        if inline_images:
+            image_fields = await run_stage("render", lambda: {
+                "annotated_image": image_to_base64(render_overlay()),
+                "original_image": image_to_base64(render_original()),
+            })
+        else:
+            # Both renders keep the same image alive; charge it once, split
+            # between them
+            pixel_bytes = image.width * image.height * 3 // 2
+            image_fields = {
+                **publish_image("annotated_image", render_overlay, pixel_bytes),
+                **publish_image("original_image", render_original, pixel_bytes),
+            }
 
         # 5. Calculate processing time
         processing_time = (time.time() - start_time) * 1000
@@ -301,9 +633,6 @@ async def analyze_photo(request: PhotoAnalysisRequest):
             ),
         )
 
-        # 8. Encode original image for landmark editor
-        original_base64 = image_to_base64(np.array(image))
-
         return PhotoAnalysisResponse(
             success=True,
             image_id=str(uuid.uuid4()),
@@ -324,15 +653,17 @@ async def analyze_photo(request: PhotoAnalysisRequest):
             risk_level=risk_level_map[result.risk_level],
             risk_factors=result.risk_factors,
             recommendations=result.recommendations,
-            annotated_image=annotated_base64,
-            original_image=original_base64,
             landmarks=landmark_positions,
             image_width=image.width,
             image_height=image.height,
             landmark_confidence=round(result.landmark_confidence, 3),
-            processing_time_ms=round(processing_time, 2)
+            processing_time_ms=round(processing_time, 2),
+            **image_fields
         )
 
+    except StageBusyError as e:
+        raise busy_error(e)
+
     except ValidationError as e:
         raise HTTPException(status_code=400, detail={
             "error": e.message,
@@ -354,6 +685,35 @@ async def analyze_photo(request: PhotoAnalysisRequest):
         })
 
 
+@router.post("/analyze-photo", response_model=PhotoAnalysisResponse)
+async def analyze_photo(request: PhotoAnalysisRequest):
+    """
+    Analyze a back photo for scoliosis screening indicators.
+
+    This is a SCREENING TOOL ONLY, not a diagnostic tool.
+    It uses pose estimation to detect postural asymmetries that may indicate scoliosis.
+
+    Returns:
+    - Asymmetry metrics (shoulder/hip height differences, trunk shift, rotation)
+    - Risk level assessment (LOW, MEDIUM, HIGH)
+    - Human-readable risk factors
+    - Recommendations based on findings
+    - Annotated image with pose overlay (URL, or base64 with inline_images)
+    """
+    return await run_photo_analysis(request.image, request.inline_images)
+
+
+@router.post("/analyze-photo/upload", response_model=PhotoAnalysisResponse)
+async def analyze_photo_upload(request: Request, inline_images: bool = False):
+    """
+    /analyze-photo for a raw image upload.
+
+    Send the image file as multipart/form-data (field "image") or as the
+    request body (application/octet-stream or image/*).
+    """
+    return await run_photo_analysis(await read_upload(request), inline_images)
+
+
 @router.post("/recalculate-metrics")
 async def recalculate_metrics(request: RecalculateMetricsRequest):
     """
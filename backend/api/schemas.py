@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from enum import Enum
 
 
@@ -37,6 +37,20 @@ class ImageOrientation(str, Enum):
     UNKNOWN = "unknown"        # No marker detected
 
 
+class DetectorProfile(str, Enum):
+    """Speed/recall trade-off of the vertebra detector"""
+    ACCURATE = "accurate"
+    BALANCED = "balanced"
+    FAST = "fast"
+
+
+class ArtifactFormat(str, Enum):
+    """Encoding of a served image artifact"""
+    WEBP = "webp"
+    JPEG = "jpeg"
+    PNG = "png"
+
+
 class Keypoint(BaseModel):
     x: float
     y: float
@@ -97,10 +111,18 @@ class OrientationDetectionResponse(BaseModel):
     success: bool
     detection_result: OrientationDetectionResult
     preview_image: str  # Base64 image with detected marker highlighted
+    upload_id: Optional[str] = None  # Pass to /analyze instead of re-sending the image
 
 
 class AnalysisRequest(BaseModel):
-    image: str = Field(..., description="Base64 encoded image")
+    image: Optional[str] = Field(
+        default=None,
+        description="Base64 encoded image. Required unless upload_id is given."
+    )
+    upload_id: Optional[str] = Field(
+        default=None,
+        description="upload_id returned by /detect-orientation, instead of re-sending the image"
+    )
     confirmed_orientation: Optional[ImageOrientation] = Field(
         default=None,
         description="User-confirmed orientation. If not provided, auto-detection is used."
@@ -109,6 +131,14 @@ class AnalysisRequest(BaseModel):
         default=False,
         description="Whether the user flipped the image horizontally"
     )
+    profile: Optional[DetectorProfile] = Field(
+        default=None,
+        description="Detector profile. If not provided, the deployment default is used."
+    )
+    inline_images: bool = Field(
+        default=False,
+        description="Return images as base64 data URLs instead of artifact URLs"
+    )
 
 
 class AnalysisResponse(BaseModel):
@@ -129,8 +159,10 @@ class AnalysisResponse(BaseModel):
     schroth_type: SchrothType
     severity: Severity
 
-    # Visualization
-    annotated_image: str
+    # Visualization (inline only when requested, otherwise fetched from annotated_image_url)
+    annotated_image: Optional[str] = None
+    annotated_image_id: Optional[str] = None
+    annotated_image_url: Optional[str] = None
 
     # Recommendations
     exercises: List[Exercise]
@@ -153,6 +185,9 @@ class ErrorResponse(BaseModel):
 class HealthResponse(BaseModel):
     status: str
     model_loaded: bool
+    warming_up: bool = False
+    cache: Optional[Dict[str, int]] = None  # Image/result cache counters
+    stages: Optional[Dict[str, Dict[str, Any]]] = None  # Per-stage executor load
 
 
 # ============================================
@@ -219,6 +254,10 @@ class LandmarkPositions(BaseModel):
 class PhotoAnalysisRequest(BaseModel):
     """Request for back photo analysis."""
     image: str = Field(..., description="Base64 encoded image of person's back")
+    inline_images: bool = Field(
+        default=False,
+        description="Return images as base64 data URLs instead of artifact URLs"
+    )
 
 
 class RecalculateMetricsRequest(BaseModel):
@@ -240,8 +279,12 @@ class PhotoAnalysisResponse(BaseModel):
     recommendations: List[str] = Field(..., description="Recommendations based on risk level")
 
     # Visualization
-    annotated_image: str = Field(..., description="Base64 encoded image with pose overlay")
-    original_image: Optional[str] = Field(None, description="Base64 encoded original image (for landmark editing)")
+    annotated_image: Optional[str] = Field(None, description="Base64 encoded image with pose overlay (inline_images only)")
+    original_image: Optional[str] = Field(None, description="Base64 encoded original image (for landmark editing, inline_images only)")
+    annotated_image_id: Optional[str] = Field(None, description="Artifact id of the pose overlay")
+    annotated_image_url: Optional[str] = Field(None, description="URL of the pose overlay")
+    original_image_id: Optional[str] = Field(None, description="Artifact id of the original image")
+    original_image_url: Optional[str] = Field(None, description="URL of the original image")
 
     # Landmark positions (for manual adjustment)
     landmarks: Optional[LandmarkPositions] = Field(None, description="Detected landmark positions")
@@ -0,0 +1,80 @@
+"""
+Raw image uploads for the /upload endpoint variants.
+
+The file arrives as multipart/form-data (field "image") or as the request
+body itself (application/octet-stream or image/*). Either way the bytes go
+straight to the image decoder, skipping the base64 round trip and the large
+JSON parse of the regular endpoints.
+"""
+
+from fastapi import HTTPException, Request
+from starlette.datastructures import UploadFile
+
+from utils.validation import ValidationError, ErrorCodes, MAX_UPLOAD_BYTES
+
+
+UPLOAD_FIELD = "image"
+
+
+async def read_body(request: Request, max_bytes: int) -> bytes:
+    """Read a raw request body chunk by chunk, stopping at max_bytes."""
+    data = bytearray()
+    async for chunk in request.stream():
+        data.extend(chunk)
+        if len(data) > max_bytes:
+            raise ValidationError(
+                f"Upload too large. Maximum size is {max_bytes // (1024 * 1024)}MB.",
+                ErrorCodes.IMAGE_TOO_LARGE
+            )
+    return bytes(data)
+
+
+async def read_form_file(request: Request, max_bytes: int) -> bytes:
+    """Read the image file from a multipart form."""
+    form = await request.form()
+    try:
+        upload = form.get(UPLOAD_FIELD)
+        if not isinstance(upload, UploadFile):
+            raise ValidationError(
+                f'Missing "{UPLOAD_FIELD}" file in multipart upload.',
+                ErrorCodes.INVALID_IMAGE_FORMAT
+            )
+        # Read one byte past the limit to detect oversized files without reading them whole
+        data = await upload.read(max_bytes + 1)
+        if len(data) > max_bytes:
+            raise ValidationError(
+                f"Upload too large. Maximum size is {max_bytes // (1024 * 1024)}MB.",
+                ErrorCodes.IMAGE_TOO_LARGE
+            )
+        return data
+    finally:
+        await form.close()
+
+
+async def read_upload(request: Request, max_bytes: int = MAX_UPLOAD_BYTES) -> bytes:
+    """
+    Raw image bytes of an upload request.
+
+    Raises:
+        HTTPException: 400 with the usual error_code for missing, empty or
+            oversized uploads
+    """
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("multipart/form-data"):
+            data = await read_form_file(request, max_bytes)
+        else:
+            data = await read_body(request, max_bytes)
+
+        if not data:
+            raise ValidationError(
+                "Empty upload. Please send a JPG, PNG or WEBP image.",
+                ErrorCodes.INVALID_IMAGE_FORMAT
+            )
+        return data
+
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail={
+            "error": e.message,
+            "error_code": e.error_code
+        })
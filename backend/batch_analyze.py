@@ -0,0 +1,239 @@
+"""
+Analyze a directory of X-rays offline.
+
+Runs the measurement part of /analyze (image validation, detection,
+filtering, Cobb angles, Schroth type and severity) over every image in a
+directory on a pool of worker processes, without the HTTP, base64 and
+annotated-image overhead. Workers are spawned (forking after torch has run
+risks an OpenMP deadlock) and each loads the memory-mapped weights, so the
+weight pages are shared through the page cache.
+
+Results are appended to the output as each image finishes (JSON lines, or
+CSV when the output ends in .csv). Re-running with the same output resumes
+where an interrupted run stopped: images already in the output are skipped.
+With --retry-failed, failed images are analyzed again and their old rows are
+replaced.
+
+Usage:
+    python batch_analyze.py IMAGE_DIR --output results.jsonl [--recursive]
+        [--workers 4] [--threads 1] [--profile accurate]
+        [--orientation standard] [--retry-failed]
+        [--weights models/keypointsrcnn_weights.pt]
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Set
+
+import cv2
+import torch
+
+from api.schemas import ImageOrientation
+from scoliovis.model import load_model, get_model
+from scoliovis.postprocessing import filter_detections, extract_geometry
+from scoliovis.cobb_angle import calculate_all_cobb_angles, get_primary_cobb_angle
+from scoliovis.classification import (
+    determine_schroth_type, determine_severity, get_primary_curve_info
+)
+from scoliovis.profiles import DEFAULT_PROFILE, PROFILES
+from utils.images import list_images
+from utils.validation import (
+    validate_image_bytes, validate_detection_results, ValidationError, ErrorCodes
+)
+
+
+CSV_COLUMNS = [
+    "file", "success", "error_code", "error", "total_vertebrae_detected",
+    "primary_cobb_angle", "curve_location", "curve_direction", "schroth_type",
+    "severity", "confidence_score", "cobb_angles", "processing_time_ms",
+]
+
+
+def init_worker(threads: int, weights: str) -> None:
+    """Runs once in each worker process."""
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(1)
+    load_model(weights)
+
+
+def analyze_file(image_dir: str, relative_path: str, profile: str, orientation: str) -> Dict[str, Any]:
+    """Analyze one image in a worker; failures become result rows too."""
+    start_time = time.time()
+    row: Dict[str, Any] = {"file": relative_path}
+
+    try:
+        with open(os.path.join(image_dir, relative_path), "rb") as f:
+            image = validate_image_bytes(f.read())
+
+        raw_outputs = get_model().predict(image, profile=profile)
+        filtered = filter_detections(raw_outputs)
+        validate_detection_results(filtered)
+
+        geometry = extract_geometry(filtered)
+        cobb_angles = calculate_all_cobb_angles(geometry, ImageOrientation(orientation))
+        primary_cobb = get_primary_cobb_angle(cobb_angles)
+        curve_location, curve_direction = get_primary_curve_info(cobb_angles)
+
+        row.update({
+            "success": True,
+            "total_vertebrae_detected": len(geometry),
+            "primary_cobb_angle": primary_cobb,
+            "curve_location": curve_location.value,
+            "curve_direction": curve_direction.value,
+            "schroth_type": determine_schroth_type(cobb_angles, geometry).value,
+            "severity": determine_severity(primary_cobb).value,
+            "confidence_score": round(geometry.average_confidence(), 3),
+            "cobb_angles": [c.model_dump(mode="json") for c in cobb_angles],
+        })
+
+    except ValidationError as e:
+        row.update({"success": False, "error_code": e.error_code, "error": e.message})
+
+    except Exception as e:
+        row.update({"success": False, "error_code": ErrorCodes.MODEL_ERROR, "error": str(e)})
+
+    row["processing_time_ms"] = round((time.time() - start_time) * 1000, 2)
+    return row
+
+
+def drop_partial_line(path: str) -> None:
+    """Truncate a record cut off by an interrupted run."""
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+def load_records(path: str, is_csv: bool) -> List[Dict[str, Any]]:
+    """Records in an existing output, oldest first."""
+    if not os.path.exists(path):
+        return []
+    drop_partial_line(path)
+
+    with open(path, newline="") as f:
+        if is_csv:
+            return list(csv.DictReader(f))
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def succeeded(record: Dict[str, Any]) -> bool:
+    # CSV keeps the flag as text
+    return record.get("success") in (True, "True")
+
+
+def load_done(records: List[Dict[str, Any]], retry_failed: bool) -> Set[str]:
+    """Files already recorded, judged by their last record."""
+    latest = {record["file"]: record for record in records}
+    return {
+        name for name, record in latest.items()
+        if not retry_failed or succeeded(record)
+    }
+
+
+def rewrite_records(path: str, is_csv: bool, records: List[Dict[str, Any]], retried: Set[str]) -> None:
+    """
+    Rewrite the output without the files about to be retried, keeping the
+    last record of every other file, so a retry leaves one row per file.
+    """
+    latest: Dict[str, Dict[str, Any]] = {}
+    for record in records:
+        if record["file"] not in retried:
+            latest[record["file"]] = record
+
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", newline="") as f:
+        if is_csv:
+            writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS)
+            writer.writeheader()
+            writer.writerows(latest.values())
+        else:
+            for record in latest.values():
+                f.write(json.dumps(record) + "\n")
+    os.replace(temp_path, path)
+
+
+def format_csv_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten the Cobb angle list, e.g. "40.0 T4-T11; 35.0 T11-L4"."""
+    cobb_angles = row.get("cobb_angles") or []
+    return {
+        **row,
+        "cobb_angles": "; ".join(
+            f"{c['angle']} {c['upper_vertebra']}-{c['lower_vertebra']}" for c in cobb_angles
+        ),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline batch X-ray analysis")
+    parser.add_argument("image_dir", help="Directory of X-ray images")
+    parser.add_argument("--output", required=True, help="Results file (.jsonl, or .csv)")
+    parser.add_argument("--recursive", action="store_true", help="Include subdirectories")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1) // 2))
+    parser.add_argument("--threads", type=int, default=1, help="Torch threads per worker")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, choices=list(PROFILES))
+    parser.add_argument(
+        "--orientation", default=ImageOrientation.STANDARD.value,
+        choices=[o.value for o in ImageOrientation],
+        help="Orientation used for curve direction (no L/R marker detection)"
+    )
+    parser.add_argument("--retry-failed", action="store_true", help="Re-run images that failed before")
+    parser.add_argument("--weights", default=os.getenv("MODEL_PATH", "models/keypointsrcnn_weights.pt"))
+    args = parser.parse_args()
+
+    is_csv = args.output.lower().endswith(".csv")
+    images = list_images(args.image_dir, args.recursive)
+    records = load_records(args.output, is_csv)
+    done = load_done(records, args.retry_failed)
+    pending = [path for path in images if path not in done]
+    print(f"{len(images)} images, {len(images) - len(pending)} already done, {len(pending)} to analyze")
+    if not pending:
+        return
+
+    if not os.path.exists(args.weights):
+        parser.error(f"Model weights not found at {args.weights}")
+
+    # Retried failures get a new row; drop their old ones first
+    retried = {record["file"] for record in records} & set(pending)
+    if retried:
+        rewrite_records(args.output, is_csv, records, retried)
+
+    write_header = is_csv and (not os.path.exists(args.output) or os.path.getsize(args.output) == 0)
+    start_time = time.time()
+    completed = failed = 0
+
+    context = multiprocessing.get_context("spawn")
+    with open(args.output, "a", newline="") as out, ProcessPoolExecutor(
+        max_workers=max(1, args.workers), mp_context=context,
+        initializer=init_worker, initargs=(max(1, args.threads), args.weights)
+    ) as pool:
+        writer = csv.DictWriter(out, fieldnames=CSV_COLUMNS) if is_csv else None
+        if write_header:
+            writer.writeheader()
+
+        futures = [
+            pool.submit(analyze_file, args.image_dir, path, args.profile, args.orientation)
+            for path in pending
+        ]
+        for future in as_completed(futures):
+            row = future.result()
+            if writer:
+                writer.writerow(format_csv_row(row))
+            else:
+                out.write(json.dumps(row) + "\n")
+            out.flush()
+
+            completed += 1
+            failed += not row["success"]
+            rate = completed / (time.time() - start_time)
+            print(f"[{completed}/{len(pending)}] {row['file']}: "
+                  f"{row.get('primary_cobb_angle', row.get('error_code'))} ({rate:.2f} images/s)")
+
+    print(f"Done: {completed} analyzed, {failed} failed, results in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark the detector profiles: latency versus recall.
+
+Runs every profile over a directory of X-rays and prints a markdown table of
+mean and p95 latency and vertebra recall. Recall is measured against the
+vertebrae kept by filter_detections under the "accurate" profile: a reference
+vertebra counts as found when a detection's center lies within half a
+vertebra height of its center.
+
+Usage:
+    python benchmark_profiles.py IMAGE_DIR [--runs 3]
+        [--weights models/keypointsrcnn_weights.pt] [--output profiles.json]
+"""
+import argparse
+import json
+import os
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+import torch
+from PIL import Image
+
+from scoliovis.model import build_model, run_model
+from scoliovis.backends import EagerBackend
+from scoliovis.postprocessing import filter_detections
+from scoliovis.profiles import DEFAULT_PROFILE, PROFILES
+from utils.images import list_images
+
+
+def detect(backend: EagerBackend, image: Image.Image, profile: str, runs: int) -> Dict[str, Any]:
+    """Run one image under a profile; latency is the best of `runs` passes."""
+    latencies = []
+    for _ in range(runs):
+        start_time = time.time()
+        raw_outputs = run_model(backend, [image], profile=profile)[0]
+        latencies.append((time.time() - start_time) * 1000)
+
+    filtered = filter_detections(raw_outputs)
+    return {
+        "latency_ms": min(latencies),
+        "boxes": np.array(filtered["boxes"]).reshape(-1, 4),
+    }
+
+
+def count_matches(reference: np.ndarray, candidate: np.ndarray) -> int:
+    """Number of reference vertebrae with a candidate detection at the same position."""
+    if len(reference) == 0 or len(candidate) == 0:
+        return 0
+
+    ref_centers = (reference[:, :2] + reference[:, 2:]) / 2
+    cand_centers = (candidate[:, :2] + candidate[:, 2:]) / 2
+    tolerance = (reference[:, 3] - reference[:, 1]) / 2
+
+    distances = np.linalg.norm(ref_centers[:, None, :] - cand_centers[None, :, :], axis=2)
+    return int((distances.min(axis=1) <= tolerance).sum())
+
+
+def build_report(image_dir: str, weights_path: str, runs: int) -> Dict[str, Any]:
+    device = torch.device("cpu")
+    image_names = list_images(image_dir)
+
+    backend = EagerBackend(build_model(weights_path, device), device)
+
+    latencies: Dict[str, List[float]] = {name: [] for name in PROFILES}
+    found: Dict[str, int] = {name: 0 for name in PROFILES}
+    total_reference = 0
+
+    for image_name in image_names:
+        image = Image.open(os.path.join(image_dir, image_name)).convert("RGB")
+        # Warm the variant for this image size so the first profile is not penalized
+        run_model(backend, [image])
+
+        results = {name: detect(backend, image, name, runs) for name in PROFILES}
+        reference = results[DEFAULT_PROFILE]["boxes"]
+        total_reference += len(reference)
+
+        for name, result in results.items():
+            latencies[name].append(result["latency_ms"])
+            found[name] += count_matches(reference, result["boxes"])
+
+        print(f"{image_name}: " + ", ".join(
+            f"{name} {result['latency_ms']:.0f}ms/{len(result['boxes'])}"
+            for name, result in results.items()
+        ))
+
+    profiles = []
+    for name, profile in PROFILES.items():
+        values = latencies[name]
+        profiles.append({
+            "profile": name,
+            "rpn_post_nms_top_n": profile.rpn_post_nms_top_n,
+            "detections_per_img": profile.detections_per_img,
+            "mean_latency_ms": round(float(np.mean(values)), 1) if values else None,
+            "p95_latency_ms": round(float(np.percentile(values, 95)), 1) if values else None,
+            "recall": round(found[name] / total_reference, 3) if total_reference else None,
+        })
+
+    return {"images": len(image_names), "reference_vertebrae": total_reference, "profiles": profiles}
+
+
+def format_table(report: Dict[str, Any]) -> str:
+    """Markdown table of the profiles, ready to paste into a PR or the docs."""
+    lines = [
+        "| Profile | RPN proposals | Max detections | Mean latency (ms) | p95 latency (ms) | Recall |",
+        "|---|---|---|---|---|---|",
+    ]
+    for row in report["profiles"]:
+        lines.append(
+            f"| {row['profile']} | {row['rpn_post_nms_top_n']} | {row['detections_per_img']} | "
+            f"{row['mean_latency_ms']} | {row['p95_latency_ms']} | {row['recall']} |"
+        )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Detector profile latency/recall benchmark")
+    parser.add_argument("image_dir", help="Directory of X-ray images")
+    parser.add_argument("--runs", type=int, default=3, help="Timed passes per image and profile")
+    parser.add_argument("--weights", default=os.getenv("MODEL_PATH", "models/keypointsrcnn_weights.pt"))
+    parser.add_argument("--output", help="Write the full report as JSON")
+    args = parser.parse_args()
+
+    report = build_report(args.image_dir, args.weights, max(1, args.runs))
+
+    print(f"\n{report['images']} images, {report['reference_vertebrae']} reference vertebrae\n")
+    print(format_table(report))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
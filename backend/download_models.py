@@ -14,6 +14,29 @@ def download_file(url: str, dest: Path) -> None:
     print(f"Downloaded successfully: {dest}")
 
 
+def convert_to_safetensors(checkpoint: Path) -> None:
+    """
+    Write a safetensors copy of a .pt state dict next to it.
+
+    The server memory-maps the safetensors file at startup instead of
+    unpickling the checkpoint, which keeps cold starts short.
+    """
+    target = checkpoint.with_suffix(".safetensors")
+    if target.exists() or not checkpoint.exists():
+        return
+
+    try:
+        import torch
+        from safetensors.torch import save_file
+    except ImportError:
+        print("Warning: safetensors not installed, skipping conversion")
+        return
+
+    state_dict = torch.load(checkpoint, map_location="cpu", weights_only=False)
+    save_file({k: v.contiguous() for k, v in state_dict.items()}, str(target))
+    print(f"Converted to safetensors: {target}")
+
+
 def ensure_models() -> None:
     """Ensure all required model files exist."""
     models_dir = Path(__file__).parent / "models"
@@ -28,6 +51,7 @@ def ensure_models() -> None:
         else:
             print("Warning: keypointsrcnn_weights.pt not found and MODEL_URL not set")
             print("Set MODEL_URL environment variable to download the model")
+    convert_to_safetensors(keypoint_model)
 
     # MediaPipe models (should already be in repo)
     for task_file in ["pose_landmarker_lite.task", "pose_landmarker_full.task"]:
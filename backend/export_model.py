@@ -0,0 +1,103 @@
+"""
+Export the Keypoint RCNN to TorchScript or ONNX for the non-eager backends.
+
+The artifact is written next to the checkpoint by default, where
+INFERENCE_BACKEND=torchscript|onnx looks for it. With --check, the exported
+artifact is run against the eager model on the given images (or a synthetic
+image) and the export fails if the filtered detections drift apart.
+
+Usage:
+    python export_model.py --format onnx [--weights PATH] [--output PATH]
+        [--check [IMAGE ...]] [--tolerance 1.0]
+"""
+import argparse
+import os
+import sys
+from typing import List
+
+import numpy as np
+import torch
+from PIL import Image
+
+from scoliovis.model import build_model, load_backend, run_model
+from scoliovis.backends import (
+    EagerBackend, default_artifact_path, export_onnx, export_torchscript
+)
+from scoliovis.postprocessing import filter_detections
+from scoliovis.warmup import synthetic_xray
+
+
+def check_parity(eager: EagerBackend, exported, images: List[Image.Image], tolerance: float) -> bool:
+    """
+    Compare filtered detections of the eager model and the exported artifact.
+
+    Returns:
+        True if every image has the same number of detections and all box and
+        keypoint coordinates agree within `tolerance` pixels.
+    """
+    ok = True
+    for i, image in enumerate(images):
+        reference = filter_detections(run_model(eager, [image])[0])
+        candidate = filter_detections(run_model(exported, [image])[0])
+
+        if len(reference["boxes"]) != len(candidate["boxes"]):
+            print(f"  image {i}: {len(reference['boxes'])} vs {len(candidate['boxes'])} detections")
+            ok = False
+            continue
+
+        if not reference["boxes"]:
+            print(f"  image {i}: no detections in either model")
+            continue
+
+        box_error = np.abs(np.array(reference["boxes"]) - np.array(candidate["boxes"])).max()
+        kp_error = np.abs(
+            np.array(reference["keypoints"])[..., :2] - np.array(candidate["keypoints"])[..., :2]
+        ).max()
+        score_error = np.abs(np.array(reference["scores"]) - np.array(candidate["scores"])).max()
+        print(
+            f"  image {i}: {len(reference['boxes'])} detections, max box error {box_error:.3f}px, "
+            f"max keypoint error {kp_error:.3f}px, max score error {score_error:.4f}"
+        )
+        if box_error > tolerance or kp_error > tolerance:
+            ok = False
+
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export the Keypoint RCNN")
+    parser.add_argument("--format", choices=["torchscript", "onnx"], required=True)
+    parser.add_argument("--weights", default=os.getenv("MODEL_PATH", "models/keypointsrcnn_weights.pt"))
+    parser.add_argument("--output", help="Artifact path (default: next to the weights)")
+    parser.add_argument("--check", nargs="*", metavar="IMAGE",
+                        help="Verify output parity against the eager model on these images")
+    parser.add_argument("--tolerance", type=float, default=1.0,
+                        help="Max allowed coordinate difference in pixels for --check")
+    args = parser.parse_args()
+
+    device = torch.device("cpu")
+    output_path = args.output or default_artifact_path(args.weights, args.format)
+
+    model = build_model(args.weights, device)
+    print(f"Exporting {args.format} artifact to {output_path}...")
+    with torch.no_grad():
+        if args.format == "torchscript":
+            export_torchscript(model, output_path)
+        else:
+            export_onnx(model, output_path)
+    print("Export complete")
+
+    if args.check is None:
+        return
+
+    images = [Image.open(path).convert("RGB") for path in args.check] or [synthetic_xray(800, 1333)]
+    exported = load_backend(args.format, args.weights, device, output_path)
+    print(f"Checking parity on {len(images)} image(s)...")
+    if not check_parity(EagerBackend(model, device), exported, images, args.tolerance):
+        print("Parity check FAILED")
+        sys.exit(1)
+    print("Parity check passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,99 @@
 import os
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 
 from api.routes import router
+from api.batch import configure_batch
 from scoliovis.model import load_model
+from scoliovis.batching import start_batcher, stop_batcher
+from scoliovis.worker_pool import start_worker_pool, stop_worker_pool
+from scoliovis.quantization import load_calibration_images
+from scoliovis.inference import configure_inference, get_inference_settings
+from scoliovis.warmup import run_warmup, parse_warmup_sizes, mark_warming
+from utils.cache import configure_cache
+from utils.executors import configure_stages, shutdown_stages, parse_stage_concurrency
+from utils.artifacts import configure_artifacts
+from utils.upload_store import configure_uploads
 
 # Load environment variables
 load_dotenv()
 
 # Configuration
 MODEL_PATH = os.getenv("MODEL_PATH", "models/keypointsrcnn_weights.pt")
+# Opt-in INT8 CPU inference: "dynamic" or "static" (static needs a calibration directory)
+MODEL_QUANTIZATION = os.getenv("MODEL_QUANTIZATION", "").lower() or None
+MODEL_CALIBRATION_DIR = os.getenv("MODEL_CALIBRATION_DIR", "models/calibration")
+# Inference runtime: "eager", "torchscript" or "onnx" (artifacts come from export_model.py).
+# Exported artifacts only run INFERENCE_MODE=full with the "accurate" detector profile
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "eager").lower()
+MODEL_ARTIFACT_PATH = os.getenv("MODEL_ARTIFACT_PATH") or None
 CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
 DEBUG = os.getenv("DEBUG", "false").lower() == "true"
 
+# Micro-batching: hold concurrent requests for a short window and run them together
+INFERENCE_BATCHING = os.getenv("INFERENCE_BATCHING", "true").lower() == "true"
+INFERENCE_BATCH_WINDOW_MS = float(os.getenv("INFERENCE_BATCH_WINDOW_MS", "10"))
+INFERENCE_MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "4"))
+
+# Worker pool: N spawned inference processes, each loading the model; the server
+# process then loads none (0 = run in the server process)
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0"))
+INFERENCE_WORKER_THREADS = int(os.getenv("INFERENCE_WORKER_THREADS", "1"))
+# Seconds the workers get to load and warm up; a worker still loading after that
+# marks the pool broken (/health "unavailable") instead of "warming" forever
+INFERENCE_WORKER_START_TIMEOUT = float(os.getenv("INFERENCE_WORKER_START_TIMEOUT", "600"))
+
+# Inference strategy: "full" frame, coarse-to-fine spine "roi", or native-resolution "tiled"
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "full").lower()
+# Detector limits: "accurate" (torchvision defaults), "balanced" or "fast"; requests may override
+DETECTOR_PROFILE = os.getenv("DETECTOR_PROFILE", "accurate").lower()
+ROI_COARSE_SIZE = int(os.getenv("ROI_COARSE_SIZE", "512"))
+# Cap on the spine crop's fine pass, which otherwise runs at the crop's native
+# resolution: higher keeps more detail on large films at more latency
+ROI_MAX_SIZE = int(os.getenv("ROI_MAX_SIZE", "2048"))
+TILE_SIZE = int(os.getenv("TILE_SIZE", "800"))
+# Minimum tile overlap; it grows to 8% of the image's long side (at most half a tile)
+TILE_OVERLAP = int(os.getenv("TILE_OVERLAP", "200"))
+TILE_PARALLELISM = int(os.getenv("TILE_PARALLELISM", "2"))
+
+# In-memory caches. The defaults total 320MB, sized for the 1GB VM in fly.toml
+# next to the model weights (~240MB) and inference buffers; raise them on
+# larger machines. A decoded 4096x3000 X-ray takes 36MB.
+# Content-addressed cache of decoded images, model outputs and OCR results (0 = disabled)
+IMAGE_CACHE_MB = int(os.getenv("IMAGE_CACHE_MB", "128"))
+
+# Rendered images referenced by analysis responses, drawn on first fetch. Each
+# artifact is charged for the decoded pixels its render keeps until it expires
+# (36MB for a full-size X-ray or photo, plus its encodings), so the store must
+# hold several analyses or a response's images are evicted before the client
+# fetches them (404). 160MB holds four full-size results; raise it with the
+# number of concurrent users.
+ARTIFACT_STORE_MB = int(os.getenv("ARTIFACT_STORE_MB", "160"))
+ARTIFACT_TTL_SECONDS = int(os.getenv("ARTIFACT_TTL_SECONDS", "3600"))
+
+# Image files staged by /detect-orientation for /analyze to reuse by upload_id
+# (compressed bytes; the decode itself is shared with the image cache)
+UPLOAD_STORE_MB = int(os.getenv("UPLOAD_STORE_MB", "32"))
+UPLOAD_TTL_SECONDS = int(os.getenv("UPLOAD_TTL_SECONDS", "900"))
+
+# Blocking stages run on bounded executors; a full stage answers 429 with Retry-After
+STAGE_CONCURRENCY = parse_stage_concurrency(os.getenv("STAGE_CONCURRENCY", ""))
+STAGE_QUEUE_SIZE = int(os.getenv("STAGE_QUEUE_SIZE", "16"))
+
+# /analyze-batch: images per request, and images of one request analyzed at once
+BATCH_MAX_IMAGES = int(os.getenv("BATCH_MAX_IMAGES", "500"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", str(INFERENCE_MAX_BATCH_SIZE)))
+
+# Warm-up: synthetic passes before serving, /health reports "warming" until done
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_SIZES = parse_warmup_sizes(os.getenv("WARMUP_SIZES", "800x1333"))
+WARMUP_RUNS = int(os.getenv("WARMUP_RUNS", "1"))
+WARMUP_OCR = os.getenv("WARMUP_OCR", "false").lower() == "true"
+WARMUP_POSE = os.getenv("WARMUP_POSE", "false").lower() == "true"
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -27,10 +106,63 @@ async def lifespan(app: FastAPI):
     print(f"Debug mode: {DEBUG}")
     print(f"CORS origins: {CORS_ORIGINS}")
 
+    configure_cache(IMAGE_CACHE_MB * 1024 * 1024)
+    print(f"Image cache: {IMAGE_CACHE_MB}MB")
+
+    configure_artifacts(ARTIFACT_STORE_MB * 1024 * 1024, ARTIFACT_TTL_SECONDS)
+    print(f"Artifact store: {ARTIFACT_STORE_MB}MB, {ARTIFACT_TTL_SECONDS}s TTL")
+
+    configure_uploads(UPLOAD_STORE_MB * 1024 * 1024, UPLOAD_TTL_SECONDS)
+    print(f"Upload store: {UPLOAD_STORE_MB}MB, {UPLOAD_TTL_SECONDS}s TTL")
+
+    configure_stages(STAGE_CONCURRENCY, STAGE_QUEUE_SIZE)
+    print(f"Stage concurrency: {STAGE_CONCURRENCY}, queue size {STAGE_QUEUE_SIZE}")
+
+    configure_batch(BATCH_MAX_IMAGES, BATCH_CONCURRENCY)
+    print(f"Batch analysis: up to {BATCH_MAX_IMAGES} images, {BATCH_CONCURRENCY} at a time")
+
+    # Raises (and stops startup) for a mode or profile the backend cannot run
+    configure_inference(
+        mode=INFERENCE_MODE,
+        backend=INFERENCE_BACKEND,
+        profile=DETECTOR_PROFILE,
+        roi_coarse_size=ROI_COARSE_SIZE,
+        roi_max_size=ROI_MAX_SIZE,
+        tile_size=TILE_SIZE,
+        tile_overlap=TILE_OVERLAP,
+        tile_parallelism=TILE_PARALLELISM
+    )
+    print(f"Inference mode: {INFERENCE_MODE}, detector profile: {DETECTOR_PROFILE}")
+
     # Load model
+    model_started = False
+    calibration_images = None
     try:
         print(f"Loading model from: {MODEL_PATH}")
-        load_model(MODEL_PATH)
+        if MODEL_QUANTIZATION == "static":
+            calibration_images = load_calibration_images(MODEL_CALIBRATION_DIR)
+
+        if INFERENCE_WORKERS > 0:
+            # Only the workers load the model. They are spawned (not forked from
+            # this process, which has run torch ops by now), load the same weights
+            # and warm themselves up, so a copy here would just be one more model
+            # in memory. Missing weights show up as a broken pool on /health
+            start_worker_pool(
+                INFERENCE_WORKERS, INFERENCE_WORKER_THREADS, get_inference_settings(),
+                dict(
+                    weights_path=MODEL_PATH, quantization=MODEL_QUANTIZATION,
+                    calibration_images=calibration_images, backend=INFERENCE_BACKEND,
+                    artifact_path=MODEL_ARTIFACT_PATH
+                ),
+                WARMUP_SIZES if WARMUP_ENABLED else None, WARMUP_RUNS,
+                INFERENCE_WORKER_START_TIMEOUT
+            )
+        else:
+            load_model(
+                MODEL_PATH, MODEL_QUANTIZATION, calibration_images,
+                INFERENCE_BACKEND, MODEL_ARTIFACT_PATH
+            )
+        model_started = True
     except FileNotFoundError as e:
         print(f"Warning: {e}")
         print("The API will start but analysis will fail until model weights are downloaded.")
@@ -38,11 +170,32 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"Error loading model: {e}")
 
+    # Workers batch nothing across each other, so the in-process batcher stays off with the pool
+    if INFERENCE_WORKERS == 0 and INFERENCE_BATCHING:
+        print(
+            f"Inference batching: up to {INFERENCE_MAX_BATCH_SIZE} images, "
+            f"{INFERENCE_BATCH_WINDOW_MS}ms window"
+        )
+        start_batcher(INFERENCE_MAX_BATCH_SIZE, INFERENCE_BATCH_WINDOW_MS)
+
+    # Warm up in the background so /health can answer "warming" meanwhile
+    warmup_task = None
+    if WARMUP_ENABLED and model_started:
+        mark_warming()
+        warmup_task = asyncio.create_task(asyncio.to_thread(
+            run_warmup, WARMUP_SIZES, WARMUP_RUNS, WARMUP_OCR, WARMUP_POSE
+        ))
+
     print("API ready!")
     yield
 
     # Shutdown
     print("Shutting down ScrollToSco API...")
+    if warmup_task is not None and not warmup_task.done():
+        await warmup_task
+    shutdown_stages()
+    stop_batcher()
+    stop_worker_pool()
 
 
 # Create FastAPI application
@@ -0,0 +1,156 @@
+"""
+Compare fp32 and INT8 inference on the same X-rays.
+
+Runs both models over a directory of images and reports, per image and
+overall, how far the vertebra keypoints and the resulting Cobb angles move
+under quantization, along with the latency of each model.
+
+Usage:
+    python quantization_report.py IMAGE_DIR [--mode dynamic|static]
+        [--weights models/keypointsrcnn_weights.pt] [--output report.json]
+"""
+import argparse
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import torch
+from PIL import Image
+
+from scoliovis.model import build_model, run_model
+from scoliovis.backends import EagerBackend
+from scoliovis.postprocessing import filter_detections, extract_geometry
+from scoliovis.cobb_angle import calculate_all_cobb_angles, get_primary_cobb_angle
+from scoliovis.quantization import QUANTIZATION_MODES, load_calibration_images
+from utils.images import list_images
+
+
+def analyze(backend: EagerBackend, image: Image.Image) -> Dict[str, Any]:
+    """Run one image through inference, postprocessing and Cobb angle calculation."""
+    start_time = time.time()
+    raw_outputs = run_model(backend, [image])[0]
+    latency_ms = (time.time() - start_time) * 1000
+
+    geometry = extract_geometry(filter_detections(raw_outputs))
+    cobb_angles = calculate_all_cobb_angles(geometry)
+
+    return {
+        "latency_ms": latency_ms,
+        "keypoints": geometry.keypoints[:, :, :2],
+        "primary_cobb_angle": get_primary_cobb_angle(cobb_angles),
+        "cobb_angles": [c.angle for c in cobb_angles],
+    }
+
+
+def compare_keypoints(reference: np.ndarray, candidate: np.ndarray) -> Optional[Dict[str, float]]:
+    """
+    Match each reference vertebra to the nearest candidate vertebra (by center)
+    and measure corner displacement in pixels.
+    """
+    if len(reference) == 0 or len(candidate) == 0:
+        return None
+
+    ref_centers = reference.mean(axis=1)
+    cand_centers = candidate.mean(axis=1)
+    distances = np.linalg.norm(ref_centers[:, None, :] - cand_centers[None, :, :], axis=2)
+    matches = distances.argmin(axis=1)
+
+    errors = np.linalg.norm(reference - candidate[matches], axis=2)
+    return {
+        "mean_px": float(errors.mean()),
+        "max_px": float(errors.max()),
+    }
+
+
+def build_report(
+    image_dir: str,
+    weights_path: str,
+    mode: str,
+    calibration_dir: Optional[str]
+) -> Dict[str, Any]:
+    device = torch.device("cpu")
+    image_names = list_images(image_dir)
+
+    calibration_images = None
+    if mode == "static":
+        calibration_images = load_calibration_images(calibration_dir or image_dir)
+
+    print("Loading fp32 model...")
+    fp32_backend = EagerBackend(build_model(weights_path, device), device)
+    print(f"Loading INT8 model ({mode})...")
+    int8_backend = EagerBackend(build_model(weights_path, device, mode, calibration_images), device)
+
+    rows: List[Dict[str, Any]] = []
+    for name in image_names:
+        image = Image.open(os.path.join(image_dir, name)).convert("RGB")
+        fp32 = analyze(fp32_backend, image)
+        int8 = analyze(int8_backend, image)
+
+        keypoint_error = compare_keypoints(fp32["keypoints"], int8["keypoints"])
+        row = {
+            "image": name,
+            "fp32_latency_ms": round(fp32["latency_ms"], 1),
+            "int8_latency_ms": round(int8["latency_ms"], 1),
+            "fp32_vertebrae": len(fp32["keypoints"]),
+            "int8_vertebrae": len(int8["keypoints"]),
+            "keypoint_mean_error_px": round(keypoint_error["mean_px"], 2) if keypoint_error else None,
+            "keypoint_max_error_px": round(keypoint_error["max_px"], 2) if keypoint_error else None,
+            "fp32_cobb_angles": fp32["cobb_angles"],
+            "int8_cobb_angles": int8["cobb_angles"],
+            "primary_cobb_error_deg": round(
+                abs(fp32["primary_cobb_angle"] - int8["primary_cobb_angle"]), 1
+            ),
+        }
+        rows.append(row)
+        print(
+            f"{name}: {row['fp32_latency_ms']}ms -> {row['int8_latency_ms']}ms, "
+            f"keypoints {row['keypoint_mean_error_px']}px mean, "
+            f"Cobb {fp32['primary_cobb_angle']} -> {int8['primary_cobb_angle']}"
+        )
+
+    summary: Dict[str, Any] = {"images": len(rows), "mode": mode}
+    if rows:
+        keypoint_errors = [r["keypoint_mean_error_px"] for r in rows if r["keypoint_mean_error_px"] is not None]
+        cobb_errors = [r["primary_cobb_error_deg"] for r in rows]
+        fp32_latency = float(np.mean([r["fp32_latency_ms"] for r in rows]))
+        int8_latency = float(np.mean([r["int8_latency_ms"] for r in rows]))
+        summary.update({
+            "fp32_mean_latency_ms": round(fp32_latency, 1),
+            "int8_mean_latency_ms": round(int8_latency, 1),
+            "speedup": round(fp32_latency / int8_latency, 2) if int8_latency > 0 else None,
+            "keypoint_mean_error_px": round(float(np.mean(keypoint_errors)), 2) if keypoint_errors else None,
+            "primary_cobb_mean_error_deg": round(float(np.mean(cobb_errors)), 2),
+            "primary_cobb_max_error_deg": round(float(np.max(cobb_errors)), 2),
+            "vertebra_count_mismatches": sum(
+                1 for r in rows if r["fp32_vertebrae"] != r["int8_vertebrae"]
+            ),
+        })
+
+    return {"summary": summary, "images": rows}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="fp32 vs INT8 parity report")
+    parser.add_argument("image_dir", help="Directory of X-ray images")
+    parser.add_argument("--mode", choices=QUANTIZATION_MODES, default="dynamic")
+    parser.add_argument("--weights", default=os.getenv("MODEL_PATH", "models/keypointsrcnn_weights.pt"))
+    parser.add_argument("--calibration-dir", help="Calibration images for static mode (default: IMAGE_DIR)")
+    parser.add_argument("--output", help="Write the full report as JSON")
+    args = parser.parse_args()
+
+    report = build_report(args.image_dir, args.weights, args.mode, args.calibration_dir)
+
+    print("\nSummary:")
+    for key, value in report["summary"].items():
+        print(f"  {key}: {value}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
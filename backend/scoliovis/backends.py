@@ -0,0 +1,244 @@
+"""
+Inference backends for the Keypoint RCNN.
+
+Every backend takes a list of preprocessed image tensors ([C, H, W], 0-1 range)
+and returns one dict per image with "boxes", "scores" and "keypoints" tensors
+in the coordinates of the tensor it was given.
+
+- eager: the torchvision model in regular PyTorch
+- torchscript: a scripted artifact produced by export_model.py
+- onnx: an ONNX Runtime CPU session over an artifact produced by export_model.py
+
+`max_size` asks the backend to run its internal resize at a different scale
+than torchvision's default (800 px short side / 1333 px long side), and
+`profile` selects a detector profile (see profiles.py). Only the eager
+backend supports these; exported artifacts have both baked in.
+"""
+
+import copy
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import torch
+from torchvision.models.detection.transform import GeneralizedRCNNTransform
+
+from .profiles import DetectorProfile, get_profile
+
+
+BACKENDS = ("eager", "torchscript", "onnx")
+# Backends that honour max_size/profile; the others run the exported graph as-is
+TUNABLE_BACKENDS = ("eager",)
+
+# Output names used when exporting to ONNX (matches torchvision's Keypoint RCNN outputs)
+ONNX_OUTPUT_NAMES = ["boxes", "labels", "scores", "keypoints", "keypoints_scores"]
+
+
+class InferenceBackend:
+    """Base class for a runtime that executes the Keypoint RCNN."""
+    name = "base"
+
+    def __init__(self, device: torch.device):
+        self.device = device
+
+    def check_overrides(self, max_size: Optional[int], profile: Optional[str]) -> None:
+        """Refuse max_size/profile overrides a non-tunable backend would otherwise ignore."""
+        if self.name in TUNABLE_BACKENDS or (max_size is None and profile is None):
+            return
+        raise ValueError(
+            f"The {self.name} backend runs the exported model at its default size and "
+            f"detector profile (requested max_size={max_size}, profile={profile}). "
+            "Use INFERENCE_BACKEND=eager for other sizes or profiles."
+        )
+
+    def run(
+        self,
+        tensors: List[torch.Tensor],
+        max_size: Optional[int] = None,
+        profile: Optional[str] = None
+    ) -> List[Dict[str, torch.Tensor]]:
+        raise NotImplementedError
+
+
+def shallow_clone(module: torch.nn.Module) -> torch.nn.Module:
+    """
+    Copy a module without copying its parameters.
+
+    Submodules can then be swapped on the clone without affecting the
+    original; everything not swapped (including all weights) stays shared.
+    """
+    clone = copy.copy(module)
+    clone.__dict__["_modules"] = module._modules.copy()
+    return clone
+
+
+def apply_profile(model: torch.nn.Module, profile: DetectorProfile) -> torch.nn.Module:
+    """
+    Clone of the Keypoint RCNN using a detector profile's limits.
+
+    The RPN and ROI heads are shallow-cloned too, so the clone shares every
+    weight with the original and the original is left untouched.
+    """
+    variant = shallow_clone(model)
+
+    rpn = shallow_clone(model.rpn)
+    rpn._pre_nms_top_n = dict(model.rpn._pre_nms_top_n, testing=profile.rpn_pre_nms_top_n)
+    rpn._post_nms_top_n = dict(model.rpn._post_nms_top_n, testing=profile.rpn_post_nms_top_n)
+    variant.rpn = rpn
+
+    roi_heads = shallow_clone(model.roi_heads)
+    roi_heads.detections_per_img = profile.detections_per_img
+    roi_heads.score_thresh = profile.score_thresh
+    variant.roi_heads = roi_heads
+
+    return variant
+
+
+class EagerBackend(InferenceBackend):
+    """Runs the torchvision model directly."""
+    name = "eager"
+
+    def __init__(self, model: torch.nn.Module, device: torch.device):
+        super().__init__(device)
+        self.model = model
+        self._variants: Dict[Tuple[Optional[int], Optional[str]], torch.nn.Module] = {}
+        self._variants_lock = threading.Lock()
+
+    def _model_for(self, max_size: Optional[int], profile: Optional[str]) -> torch.nn.Module:
+        """
+        Model sharing all weights but resizing inputs so the longest side is
+        max_size and using the given detector profile.
+        """
+        if max_size is None and profile is None:
+            return self.model
+
+        with self._variants_lock:
+            variant = self._variants.get((max_size, profile))
+            if variant is None:
+                variant = self.model
+                if profile is not None:
+                    variant = apply_profile(variant, get_profile(profile))
+                if max_size is not None:
+                    transform = self.model.transform
+                    variant = shallow_clone(variant)
+                    variant.transform = GeneralizedRCNNTransform(
+                        min_size=max_size,
+                        max_size=max_size,
+                        image_mean=transform.image_mean,
+                        image_std=transform.image_std,
+                    )
+                self._variants[(max_size, profile)] = variant
+            return variant
+
+    def run(
+        self,
+        tensors: List[torch.Tensor],
+        max_size: Optional[int] = None,
+        profile: Optional[str] = None
+    ) -> List[Dict[str, torch.Tensor]]:
+        model = self._model_for(max_size, profile)
+        return model([t.to(self.device) for t in tensors])
+
+
+class TorchScriptBackend(InferenceBackend):
+    """Runs a scripted model saved with torch.jit.save."""
+    name = "torchscript"
+
+    def __init__(self, artifact_path: str, device: torch.device):
+        super().__init__(device)
+        if not os.path.exists(artifact_path):
+            raise FileNotFoundError(
+                f"TorchScript artifact not found at {artifact_path}. "
+                "Create it with: python export_model.py --format torchscript"
+            )
+        self.module = torch.jit.load(artifact_path, map_location=device)
+        self.module.eval()
+
+    def run(
+        self,
+        tensors: List[torch.Tensor],
+        max_size: Optional[int] = None,
+        profile: Optional[str] = None
+    ) -> List[Dict[str, torch.Tensor]]:
+        self.check_overrides(max_size, profile)
+        # Scripted detection models return (losses, detections)
+        _, detections = self.module([t.to(self.device) for t in tensors])
+        return detections
+
+
+class OnnxBackend(InferenceBackend):
+    """Runs an exported ONNX graph with ONNX Runtime on CPU."""
+    name = "onnx"
+
+    def __init__(self, artifact_path: str):
+        super().__init__(torch.device("cpu"))
+        if not os.path.exists(artifact_path):
+            raise FileNotFoundError(
+                f"ONNX artifact not found at {artifact_path}. "
+                "Create it with: python export_model.py --format onnx"
+            )
+
+        # Optional dependency, only needed for this backend
+        import onnxruntime
+
+        self.session = onnxruntime.InferenceSession(
+            artifact_path, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+        self.output_names = [o.name for o in self.session.get_outputs()]
+
+    def run(
+        self,
+        tensors: List[torch.Tensor],
+        max_size: Optional[int] = None,
+        profile: Optional[str] = None
+    ) -> List[Dict[str, torch.Tensor]]:
+        self.check_overrides(max_size, profile)
+        # The exported graph takes one image per call
+        results = []
+        for tensor in tensors:
+            outputs = self.session.run(None, {self.input_name: tensor.cpu().numpy()})
+            named = dict(zip(self.output_names, outputs))
+            results.append({
+                "boxes": torch.from_numpy(named["boxes"]),
+                "scores": torch.from_numpy(named["scores"]),
+                "keypoints": torch.from_numpy(named["keypoints"]),
+            })
+        return results
+
+
+def default_artifact_path(weights_path: str, backend: str) -> str:
+    """Artifact path next to the checkpoint, e.g. models/keypointsrcnn_weights.onnx."""
+    base = os.path.splitext(weights_path)[0]
+    if backend == "torchscript":
+        return f"{base}.torchscript.pt"
+    return f"{base}.onnx"
+
+
+def export_torchscript(model: torch.nn.Module, output_path: str) -> None:
+    """Script the eager model and save it for TorchScriptBackend."""
+    scripted = torch.jit.script(model)
+    scripted.save(output_path)
+
+
+def export_onnx(model: torch.nn.Module, output_path: str, example_size=(3, 1333, 800)) -> None:
+    """
+    Export the eager model to ONNX for OnnxBackend.
+
+    Uses the TorchScript-based exporter: the dynamo exporter (the default
+    since torch 2.9) cannot trace the list-of-images Keypoint RCNN forward.
+    """
+    example = torch.rand(*example_size)
+    torch.onnx.export(
+        model,
+        ([example],),
+        output_path,
+        dynamo=False,
+        opset_version=11,
+        input_names=["image"],
+        output_names=ONNX_OUTPUT_NAMES,
+        dynamic_axes={
+            "image": {1: "height", 2: "width"},
+            **{name: {0: "detections"} for name in ONNX_OUTPUT_NAMES},
+        },
+    )
@@ -0,0 +1,193 @@
+"""
+Dynamic micro-batching in front of SpineModel inference.
+
+Concurrent requests are held for a short window (or until a batch is full)
+and run through the Keypoint RCNN as one list, so the ResNet50-FPN backbone
+processes several X-rays per forward pass. Each caller receives its own
+result, scaled back to its own image size.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Any, List, Optional, Tuple
+from PIL import Image
+
+from .model import SpineModel, get_model
+from .preprocessing import DEFAULT_MAX_SIZE
+from .profiles import DEFAULT_PROFILE
+
+
+# Sentinel placed on the queue to stop the worker thread
+_STOP = object()
+
+
+class InferenceBatcher:
+    """
+    Collects inference requests from many threads and runs them in batches
+    on a single background worker thread.
+    """
+
+    def __init__(
+        self,
+        model: SpineModel,
+        max_batch_size: int = 4,
+        max_wait_ms: float = 10.0
+    ):
+        self.model = model
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the background worker thread."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="inference-batcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the worker thread after the queued requests are served."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None
+
+    def submit(
+        self,
+        image: Image.Image,
+        max_size: int = DEFAULT_MAX_SIZE,
+        profile: str = DEFAULT_PROFILE
+    ) -> Future:
+        """Queue an image for inference and return a future for its outputs."""
+        future: Future = Future()
+        self._queue.put((image, (max_size, profile), future))
+        return future
+
+    def predict(
+        self,
+        image: Image.Image,
+        max_size: int = DEFAULT_MAX_SIZE,
+        profile: str = DEFAULT_PROFILE
+    ) -> Dict[str, Any]:
+        """Blocking equivalent of SpineModel.predict that goes through the batcher."""
+        return self.submit(image, max_size, profile).result()
+
+    def _collect_batch(self, first: tuple) -> Tuple[list, bool]:
+        """
+        Gather requests until the batch is full or the wait window closes.
+
+        Returns:
+            Tuple of (batch items, whether a stop was requested)
+        """
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+
+        return batch, False
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            batch, stop_requested = self._collect_batch(item)
+
+            # Drop requests whose callers have already given up, then run one
+            # forward pass per input size and detector profile (each pair
+            # uses its own model variant)
+            groups: Dict[Tuple[int, str], List[Tuple[Image.Image, Future]]] = {}
+            for image, key, future in batch:
+                if future.set_running_or_notify_cancel():
+                    groups.setdefault(key, []).append((image, future))
+
+            for (max_size, profile), group in groups.items():
+                self._run_batch(group, max_size, profile)
+
+            if stop_requested:
+                return
+
+    def _run_batch(
+        self,
+        batch: List[Tuple[Image.Image, Future]],
+        max_size: int,
+        profile: str
+    ) -> None:
+        images = [image for image, _ in batch]
+        try:
+            results = self.model.predict_batch(images, max_size, profile)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+# Global batcher instance (None when batching is disabled)
+_batcher: Optional[InferenceBatcher] = None
+
+
+def get_batcher() -> Optional[InferenceBatcher]:
+    """Get the running batcher, if batching is enabled."""
+    return _batcher
+
+
+def start_batcher(max_batch_size: int = 4, max_wait_ms: float = 10.0) -> InferenceBatcher:
+    """Create and start the global batcher in front of the global model."""
+    global _batcher
+    if _batcher is None:
+        _batcher = InferenceBatcher(get_model(), max_batch_size, max_wait_ms)
+        _batcher.start()
+    return _batcher
+
+
+def stop_batcher() -> None:
+    """Stop the global batcher if it is running."""
+    global _batcher
+    if _batcher is not None:
+        _batcher.stop()
+        _batcher = None
+
+
+def submit_inference(
+    image: Image.Image,
+    max_size: int = DEFAULT_MAX_SIZE,
+    profile: str = DEFAULT_PROFILE
+) -> Future:
+    """
+    Submit an image for inference.
+
+    Goes through the batcher when it is running, otherwise runs the model
+    directly and returns an already-completed future.
+    """
+    if _batcher is not None:
+        return _batcher.submit(image, max_size, profile)
+
+    future: Future = Future()
+    try:
+        future.set_result(get_model().predict(image, max_size, profile))
+    except Exception as e:
+        future.set_exception(e)
+    return future
@@ -1,49 +1,41 @@
-import numpy as np
 from typing import List, Tuple
 from api.schemas import (
-    Vertebra, CobbAngleMeasurement, SchrothType, CurveLocation,
+    CobbAngleMeasurement, SchrothType, CurveLocation,
     CurveDirection, Severity
 )
-from .cobb_angle import get_vertebra_center
+from .geometry import SpineGeometry
 
 
-def is_pelvis_balanced(vertebrae: List[Vertebra], threshold: float = 0.1) -> bool:
+def is_pelvis_balanced(geometry: SpineGeometry, threshold: float = 0.1) -> bool:
     """
     Determine if the pelvis is balanced based on the lowest vertebra (L5/S1) level.
 
     Balanced: The lower endplate is approximately horizontal.
 
     Args:
-        vertebrae: List of detected vertebrae
+        geometry: Detected spine geometry
         threshold: Maximum tilt ratio (relative to width) for "balanced"
 
     Returns:
         True if pelvis appears balanced, False otherwise
     """
-    if len(vertebrae) < 5:
+    if len(geometry) < 5:
         return True  # Assume balanced if insufficient data
 
-    # Use lowest vertebra as pelvic reference
-    lowest = vertebrae[-1]
-    kp = lowest.keypoints
-
-    if len(kp) < 4:
-        return True
-
-    # Check horizontal deviation of lower endplate
-    lower_left_y = kp[2].y
-    lower_right_y = kp[3].y
-    width = abs(kp[3].x - kp[2].x)
+    # Use the lower endplate of the lowest vertebra as pelvic reference
+    dx, dy = geometry.lower_endplates[-1]
+    width = abs(dx)
 
     if width == 0:
         return True
 
-    deviation_ratio = abs(lower_right_y - lower_left_y) / width
+    # Check horizontal deviation of lower endplate
+    deviation_ratio = abs(dy) / width
 
-    return deviation_ratio < threshold
+    return bool(deviation_ratio < threshold)
 
 
-def is_pelvis_lumbar_coupled(vertebrae: List[Vertebra]) -> bool:
+def is_pelvis_lumbar_coupled(geometry: SpineGeometry) -> bool:
     """
     Determine if the pelvis and lumbar spine deviate in the same direction (coupled).
 
@@ -53,34 +45,35 @@ def is_pelvis_lumbar_coupled(vertebrae: List[Vertebra]) -> bool:
     Returns:
         True if coupled, False if uncoupled
     """
-    if len(vertebrae) < 5:
+    if len(geometry) < 5:
         return True
 
+    center_x = geometry.centers[:, 0]
+
     # Get reference midline from upper vertebrae
-    upper_centers = [get_vertebra_center(v.keypoints)[0] for v in vertebrae[:3]]
-    midline_x = np.mean(upper_centers)
+    midline_x = center_x[:3].mean()
 
     # Lumbar region (approximately L1-L4)
-    lumbar_start = max(0, len(vertebrae) - 5)
-    lumbar_end = len(vertebrae) - 1
+    lumbar_start = max(0, len(geometry) - 5)
+    lumbar_end = len(geometry) - 1
 
-    lumbar_segment = vertebrae[lumbar_start:lumbar_end]
+    lumbar_segment = center_x[lumbar_start:lumbar_end]
 
-    if not lumbar_segment:
+    if len(lumbar_segment) == 0:
         return True
 
     # Calculate average lateral position of lumbar vertebrae
-    lumbar_x = np.mean([get_vertebra_center(v.keypoints)[0] for v in lumbar_segment])
+    lumbar_x = lumbar_segment.mean()
 
     # Pelvis position (lowest vertebra center)
-    pelvis_x = get_vertebra_center(vertebrae[-1].keypoints)[0]
+    pelvis_x = center_x[-1]
 
     # Coupled if both deviate in the same direction from midline
     lumbar_direction = lumbar_x - midline_x
     pelvis_direction = pelvis_x - midline_x
 
     # Same sign = coupled (both left or both right of midline)
-    return (lumbar_direction * pelvis_direction) > 0
+    return bool((lumbar_direction * pelvis_direction) > 0)
 
 
 def get_dominant_curve_region(
@@ -109,7 +102,7 @@ def get_dominant_curve_region(
 
 def determine_schroth_type(
     cobb_angles: List[CobbAngleMeasurement],
-    vertebrae: List[Vertebra]
+    geometry: SpineGeometry
 ) -> SchrothType:
     """
     Determine Schroth classification based on curve patterns and pelvis balance.
@@ -124,7 +117,7 @@ def determine_schroth_type(
         return SchrothType.UNKNOWN
 
     # Analyze pelvis balance
-    pelvis_balanced = is_pelvis_balanced(vertebrae)
+    pelvis_balanced = is_pelvis_balanced(geometry)
 
     # Get dominant curve region
     dominant_region, dominant_angle = get_dominant_curve_region(cobb_angles)
@@ -153,7 +146,7 @@ def determine_schroth_type(
             return SchrothType.TYPE_4C  # Lumbar dominant or balanced double
     else:
         # Unbalanced pelvis
-        pelvis_coupled = is_pelvis_lumbar_coupled(vertebrae)
+        pelvis_coupled = is_pelvis_lumbar_coupled(geometry)
 
         if pelvis_coupled:
             return SchrothType.TYPE_3CP  # Thoracic with coupled pelvic shift
@@ -1,99 +1,94 @@
 import numpy as np
 from typing import List, Tuple, Optional
-from api.schemas import Vertebra, Keypoint, CobbAngleMeasurement, CurveLocation, CurveDirection, ImageOrientation
+from api.schemas import CobbAngleMeasurement, CurveLocation, CurveDirection, ImageOrientation
+from .geometry import SpineGeometry
 
 
-def get_endplate_vector(keypoints: List[Keypoint], endplate: str = "upper") -> np.ndarray:
-    """
-    Get the endplate vector for a vertebra.
-
-    Args:
-        keypoints: List of 4 keypoints [TL, TR, BL, BR]
-        endplate: "upper" for top endplate, "lower" for bottom
+# Curves must span at least this many vertebrae (end vertebra indices apart)
+MIN_CURVE_SPAN = 3
 
-    Returns:
-        Vector from left to right of the endplate
-    """
-    if endplate == "upper":
-        # Top-left to top-right
-        left = np.array([keypoints[0].x, keypoints[0].y])
-        right = np.array([keypoints[1].x, keypoints[1].y])
-    else:
-        # Bottom-left to bottom-right
-        left = np.array([keypoints[2].x, keypoints[2].y])
-        right = np.array([keypoints[3].x, keypoints[3].y])
+# Angles below the scoliosis threshold are not reported as curves
+MIN_COBB_ANGLE = 10.0
 
-    return right - left
 
-
-def get_vertebra_center(keypoints: List[Keypoint]) -> np.ndarray:
-    """Get the center point of a vertebra from its 4 keypoints."""
-    x = sum(kp.x for kp in keypoints) / 4
-    y = sum(kp.y for kp in keypoints) / 4
-    return np.array([x, y])
-
-
-def calculate_angle_between_vectors(v1: np.ndarray, v2: np.ndarray) -> float:
+def cobb_angle_matrix(geometry: SpineGeometry) -> np.ndarray:
     """
-    Calculate angle between two vectors using dot product.
+    Angles between every upper endplate and every lower endplate.
 
-    Formula: cos(θ) = (v1 · v2) / (|v1| × |v2|)
+    Formula: cos(θ) = (u_i · l_j) / (|u_i| × |l_j|), evaluated for all pairs
+    in one broadcast.
 
-    Returns angle in degrees.
+    Returns:
+        (N, N) array in degrees; entry [i, j] is the angle between the upper
+        endplate of vertebra i and the lower endplate of vertebra j
+        (0 where either endplate has zero length)
     """
-    # Normalize vectors
-    norm1 = np.linalg.norm(v1)
-    norm2 = np.linalg.norm(v2)
-
-    if norm1 == 0 or norm2 == 0:
-        return 0.0
+    upper = geometry.upper_endplates
+    lower = geometry.lower_endplates
+    upper_norms = np.linalg.norm(upper, axis=1)
+    lower_norms = np.linalg.norm(lower, axis=1)
 
-    v1_normalized = v1 / norm1
-    v2_normalized = v2 / norm2
+    norms = upper_norms[:, None] * lower_norms[None, :]
+    dots = upper @ lower.T
 
-    # Calculate dot product
-    dot_product = np.dot(v1_normalized, v2_normalized)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cosines = np.where(norms > 0, dots / norms, 1.0)
 
     # Clamp to [-1, 1] to handle numerical errors
-    dot_product = np.clip(dot_product, -1.0, 1.0)
+    return np.degrees(np.arccos(np.clip(cosines, -1.0, 1.0)))
 
-    # Calculate angle
-    angle_rad = np.arccos(dot_product)
-    angle_deg = np.degrees(angle_rad)
 
-    return angle_deg
+def select_curves(
+    angles: np.ndarray,
+    top_k: Optional[int] = None,
+    min_span: int = MIN_CURVE_SPAN,
+    min_angle: float = MIN_COBB_ANGLE
+) -> List[Tuple[int, int, float]]:
+    """
+    Pick the maximal Cobb angle of each curve region from the angle matrix.
 
+    Clinically, a curve's Cobb angle is measured between its most tilted end
+    vertebrae, i.e. the pair with the largest angle. The largest pair overall
+    is the primary curve; every further curve is the largest pair that does
+    not overlap an already selected one (adjacent curves may share an end
+    vertebra).
 
-def find_inflection_points(vertebrae: List[Vertebra]) -> List[int]:
-    """
-    Find inflection points where the spinal curve changes direction.
-    These mark the boundaries between different curves.
+    Args:
+        angles: (N, N) matrix from cobb_angle_matrix
+        top_k: Maximum number of curves to return (None for all)
+        min_span: Minimum index distance between the end vertebrae
+        min_angle: Minimum angle for a curve to count, after rounding to 0.1
 
-    Returns list of vertebra indices that are inflection points.
+    Returns:
+        List of (upper index, lower index, angle), largest angle first
     """
-    if len(vertebrae) < 3:
-        return [0, len(vertebrae) - 1]
+    n = len(angles)
+    rows, cols = np.indices((n, n))
+    candidates = np.where(cols - rows >= min_span, angles, -np.inf)
 
-    # Calculate tilt for each vertebra
-    tilts = [v.tilt_angle for v in vertebrae]
+    curves = []
+    while candidates.size and (top_k is None or len(curves) < top_k):
+        upper_idx, lower_idx = divmod(int(np.argmax(candidates)), n)
+        angle = float(candidates[upper_idx, lower_idx])
+        # Compared as reported (to 0.1 degrees), so 9.96 counts as a 10.0 curve
+        if round(angle, 1) < min_angle:
+            break
+        curves.append((upper_idx, lower_idx, angle))
 
-    inflections = []
+        # Exclude every pair overlapping this curve
+        candidates[(rows < lower_idx) & (cols > upper_idx)] = -np.inf
 
-    # Find local maxima and minima
-    for i in range(1, len(tilts) - 1):
-        prev_diff = tilts[i] - tilts[i - 1]
-        next_diff = tilts[i + 1] - tilts[i]
+    return curves
 
-        # Direction change (sign change in slope)
-        if prev_diff * next_diff < 0:
-            inflections.append(i)
 
-    # Always include first and last
-    inflections = [0] + inflections + [len(vertebrae) - 1]
-    return sorted(set(inflections))
+def segment_lateral_deviations(geometry: SpineGeometry, start_idx: int, end_idx: int) -> np.ndarray:
+    """Lateral (x) distance of each center in a segment from the midpoint of its end vertebrae."""
+    x_positions = geometry.centers[start_idx:end_idx + 1, 0]
+    midline_x = (x_positions[0] + x_positions[-1]) / 2
+    return x_positions - midline_x
 
 
-def find_apex_vertebra(vertebrae: List[Vertebra], start_idx: int, end_idx: int) -> int:
+def find_apex_vertebra(geometry: SpineGeometry, start_idx: int, end_idx: int) -> int:
     """
     Find the apex vertebra (most laterally deviated) in a curve segment.
 
@@ -103,28 +98,8 @@ def find_apex_vertebra(vertebrae: List[Vertebra], start_idx: int, end_idx: int)
     if end_idx - start_idx < 2:
         return start_idx
 
-    segment = vertebrae[start_idx:end_idx + 1]
-
-    # Get centers of first and last vertebra
-    start_center = get_vertebra_center(segment[0].keypoints)
-    end_center = get_vertebra_center(segment[-1].keypoints)
-
-    # Calculate midline from start to end
-    midline = (start_center + end_center) / 2
-
-    # Find vertebra with maximum deviation from midline
-    max_deviation = 0
-    apex_idx = start_idx
-
-    for i, v in enumerate(segment):
-        center = get_vertebra_center(v.keypoints)
-        deviation = abs(center[0] - midline[0])  # Lateral (x) deviation
-
-        if deviation > max_deviation:
-            max_deviation = deviation
-            apex_idx = start_idx + i
-
-    return apex_idx
+    deviations = np.abs(segment_lateral_deviations(geometry, start_idx, end_idx))
+    return start_idx + int(np.argmax(deviations))
 
 
 def determine_curve_location(
@@ -163,7 +138,7 @@ def determine_curve_location(
 
 
 def determine_curve_direction(
-    vertebrae: List[Vertebra],
+    geometry: SpineGeometry,
     start_idx: int,
     end_idx: int,
     orientation: ImageOrientation = ImageOrientation.STANDARD
@@ -172,7 +147,7 @@ def determine_curve_direction(
     Determine curve direction (left/right convexity) based on apex position.
 
     Args:
-        vertebrae: List of detected vertebrae
+        geometry: Detected spine geometry
         start_idx: Start index of curve segment
         end_idx: End index of curve segment
         orientation: Image orientation to correctly interpret left/right
@@ -182,33 +157,18 @@ def determine_curve_direction(
 
     Note: If image is flipped, we invert the result to get anatomical direction.
     """
-    segment = vertebrae[start_idx:end_idx + 1]
-
-    if len(segment) < 3:
+    if len(geometry.centers[start_idx:end_idx + 1]) < 3:
         return CurveDirection.NONE
 
-    # Get x-coordinates of all vertebra centers
-    x_positions = [get_vertebra_center(v.keypoints)[0] for v in segment]
-
-    # Midline from endpoints
-    midline_x = (x_positions[0] + x_positions[-1]) / 2
-
-    # Find apex position
-    apex_local_idx = 0
-    max_deviation = 0
-    for i, x in enumerate(x_positions):
-        deviation = abs(x - midline_x)
-        if deviation > max_deviation:
-            max_deviation = deviation
-            apex_local_idx = i
-
-    apex_x = x_positions[apex_local_idx]
+    # Signed lateral deviation of the apex from the midline between the endpoints
+    deviations = segment_lateral_deviations(geometry, start_idx, end_idx)
+    apex_deviation = deviations[np.argmax(np.abs(deviations))]
 
     # Determine direction based on pixel coordinates
     # In standard view: higher x = right side of image = patient's left
-    if apex_x > midline_x:
+    if apex_deviation > 0:
         pixel_direction = CurveDirection.RIGHT
-    elif apex_x < midline_x:
+    elif apex_deviation < 0:
         pixel_direction = CurveDirection.LEFT
     else:
         return CurveDirection.NONE
@@ -223,87 +183,45 @@ def determine_curve_direction(
     return pixel_direction
 
 
-def calculate_cobb_angle_for_segment(
-    vertebrae: List[Vertebra],
-    upper_idx: int,
-    lower_idx: int
-) -> float:
-    """
-    Calculate Cobb angle between two vertebrae.
-
-    The Cobb angle is measured between:
-    - The upper endplate of the upper end vertebra
-    - The lower endplate of the lower end vertebra
-    """
-    upper_vertebra = vertebrae[upper_idx]
-    lower_vertebra = vertebrae[lower_idx]
-
-    # Get endplate vectors
-    upper_vector = get_endplate_vector(upper_vertebra.keypoints, "upper")
-    lower_vector = get_endplate_vector(lower_vertebra.keypoints, "lower")
-
-    # Calculate angle
-    angle = calculate_angle_between_vectors(upper_vector, lower_vector)
-
-    return round(angle, 1)
-
-
 def calculate_all_cobb_angles(
-    vertebrae: List[Vertebra],
-    orientation: ImageOrientation = ImageOrientation.STANDARD
+    geometry: SpineGeometry,
+    orientation: ImageOrientation = ImageOrientation.STANDARD,
+    top_k: Optional[int] = None
 ) -> List[CobbAngleMeasurement]:
     """
     Calculate all significant Cobb angles in the spine.
 
     Args:
-        vertebrae: List of detected vertebrae
+        geometry: Detected spine geometry
         orientation: Image orientation for correct left/right determination
+        top_k: Maximum number of curves to return (None for all)
 
     Returns measurements sorted by angle (largest first).
     """
-    if len(vertebrae) < 5:
+    if len(geometry) < 5:
         return []
 
-    # Find inflection points
-    inflections = find_inflection_points(vertebrae)
     measurements = []
 
-    # Calculate Cobb angle for each curve segment
-    for i in range(len(inflections) - 1):
-        upper_idx = inflections[i]
-        lower_idx = inflections[i + 1]
-
-        # Skip very short segments
-        if lower_idx - upper_idx < 3:
-            continue
-
-        # Calculate angle
-        angle = calculate_cobb_angle_for_segment(vertebrae, upper_idx, lower_idx)
-
-        # Skip angles below scoliosis threshold
-        if angle < 10:
-            continue
-
+    # Largest angle of each curve region, from all endplate pairs at once
+    for upper_idx, lower_idx, angle in select_curves(cobb_angle_matrix(geometry), top_k):
         # Find apex
-        apex_idx = find_apex_vertebra(vertebrae, upper_idx, lower_idx)
+        apex_idx = find_apex_vertebra(geometry, upper_idx, lower_idx)
 
         # Determine location and direction (pass orientation for correct left/right)
-        location = determine_curve_location(upper_idx, lower_idx, len(vertebrae))
-        direction = determine_curve_direction(vertebrae, upper_idx, lower_idx, orientation)
+        location = determine_curve_location(upper_idx, lower_idx, len(geometry))
+        direction = determine_curve_direction(geometry, upper_idx, lower_idx, orientation)
 
         measurement = CobbAngleMeasurement(
-            angle=angle,
-            upper_vertebra=vertebrae[upper_idx].label,
-            lower_vertebra=vertebrae[lower_idx].label,
-            apex_vertebra=vertebrae[apex_idx].label,
+            angle=round(angle, 1),
+            upper_vertebra=geometry.labels[upper_idx],
+            lower_vertebra=geometry.labels[lower_idx],
+            apex_vertebra=geometry.labels[apex_idx],
             curve_location=location,
             curve_direction=direction
         )
         measurements.append(measurement)
 
-    # Sort by angle (largest first)
-    measurements.sort(key=lambda m: m.angle, reverse=True)
-
     return measurements
 
 
@@ -0,0 +1,141 @@
+"""
+Array-backed spine geometry.
+
+Cobb angle measurement, classification and visualization all work from the
+vertebra corners. SpineGeometry keeps them as one (N, 4, 3) array, ordered
+top to bottom, with the quantities those modules need (centers, endplate
+vectors, tilts) computed once for the whole spine. Pydantic Vertebra
+objects are only built for the API response (see to_vertebrae).
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from api.schemas import Vertebra, Keypoint
+
+
+# Vertebra labels based on typical spine anatomy
+VERTEBRA_LABELS = [
+    "T1", "T2", "T3", "T4", "T5", "T6", "T7", "T8", "T9", "T10", "T11", "T12",
+    "L1", "L2", "L3", "L4", "L5"
+]
+
+# Keypoint order from model: [top-left, top-right, bottom-left, bottom-right]
+TOP_LEFT, TOP_RIGHT, BOTTOM_LEFT, BOTTOM_RIGHT = range(4)
+
+
+def vertebra_label(index: int) -> str:
+    """Label a vertebra by its position from the top (approximate)."""
+    return VERTEBRA_LABELS[index] if index < len(VERTEBRA_LABELS) else f"V{index + 1}"
+
+
+def geometry_nbytes(geometry: "SpineGeometry") -> int:
+    """Size of the geometry's arrays."""
+    return sum(
+        value.nbytes for value in vars(geometry).values() if isinstance(value, np.ndarray)
+    )
+
+
+@dataclass(frozen=True)
+class SpineGeometry:
+    """
+    Detected vertebrae as arrays, top to bottom.
+
+    Attributes:
+        keypoints: (N, 4, 3) corners as (x, y, confidence), TL, TR, BL, BR
+        boxes: (N, 4) bounding boxes (x1, y1, x2, y2)
+        scores: (N,) detection confidences
+        labels: Vertebra labels (T1..L5, then V18...)
+        centers: (N, 2) mean of the four corners
+        upper_endplates: (N, 2) vectors from top-left to top-right
+        lower_endplates: (N, 2) vectors from bottom-left to bottom-right
+        tilts: (N,) upper endplate angle from horizontal in degrees
+            (positive = tilted right), rounded to 2 decimals
+    """
+    keypoints: np.ndarray
+    boxes: np.ndarray
+    scores: np.ndarray
+    labels: List[str]
+    centers: np.ndarray
+    upper_endplates: np.ndarray
+    lower_endplates: np.ndarray
+    tilts: np.ndarray
+
+    @classmethod
+    def from_arrays(
+        cls,
+        keypoints: np.ndarray,
+        boxes: np.ndarray,
+        scores: np.ndarray
+    ) -> "SpineGeometry":
+        """
+        Build the geometry from detection arrays.
+
+        Args:
+            keypoints: (N, 4, 2) or (N, 4, 3) corners; confidence defaults to 1.0
+            boxes: (N, 4) bounding boxes
+            scores: (N,) detection confidences
+        """
+        keypoints = np.asarray(keypoints, dtype=np.float64)
+        if keypoints.size == 0:
+            keypoints = np.zeros((0, 4, 3))
+        if keypoints.shape[2] < 3:
+            confidence = np.ones(keypoints.shape[:2] + (1,))
+            keypoints = np.concatenate([keypoints[:, :, :2], confidence], axis=2)
+        else:
+            keypoints = keypoints[:, :, :3]
+
+        corners = keypoints[:, :, :2]
+        upper_endplates = corners[:, TOP_RIGHT] - corners[:, TOP_LEFT]
+        lower_endplates = corners[:, BOTTOM_RIGHT] - corners[:, BOTTOM_LEFT]
+        tilts = np.round(np.degrees(np.arctan2(upper_endplates[:, 1], upper_endplates[:, 0])), 2)
+
+        return cls(
+            keypoints=keypoints,
+            boxes=np.asarray(boxes, dtype=np.float64).reshape(-1, 4),
+            scores=np.asarray(scores, dtype=np.float64).reshape(-1),
+            labels=[vertebra_label(i) for i in range(len(boxes))],
+            centers=corners.mean(axis=1),
+            upper_endplates=upper_endplates,
+            lower_endplates=lower_endplates,
+            tilts=tilts
+        )
+
+    @classmethod
+    def from_detections(cls, filtered_outputs: Dict[str, Any]) -> "SpineGeometry":
+        """Build the geometry from filter_detections output."""
+        return cls.from_arrays(
+            filtered_outputs["keypoints"],
+            filtered_outputs["boxes"],
+            filtered_outputs["scores"]
+        )
+
+    def __len__(self) -> int:
+        return len(self.keypoints)
+
+    def index_of(self, label: str) -> Optional[int]:
+        """Index of the vertebra with this label, or None."""
+        try:
+            return self.labels.index(label)
+        except ValueError:
+            return None
+
+    def average_confidence(self) -> float:
+        """Mean detection confidence (0.0 for an empty spine)."""
+        return float(self.scores.mean()) if len(self) else 0.0
+
+    def to_vertebrae(self) -> List[Vertebra]:
+        """Vertebra response models."""
+        return [
+            Vertebra(
+                index=i,
+                label=self.labels[i],
+                bounding_box=self.boxes[i].tolist(),
+                keypoints=[Keypoint(x=x, y=y, confidence=c) for x, y, c in self.keypoints[i].tolist()],
+                confidence=float(self.scores[i]),
+                tilt_angle=float(self.tilts[i])
+            )
+            for i in range(len(self))
+        ]
@@ -0,0 +1,371 @@
+"""
+Inference strategies on top of SpineModel.
+
+- full: the whole frame, downscaled so its longest side is 1333 px (default)
+- roi: a cheap low-resolution pass locates the spine column from the detected
+  boxes, then only that crop goes through a fine pass sized from the crop's
+  own resolution (up to roi_max_size). The backbone sees far fewer pixels
+  than a full frame at the same scale, and on large films the spine itself
+  is downscaled less.
+- tiled: overlapping tiles run at native resolution and their detections are
+  merged with cross-tile NMS, so vertebrae on tall full-spine films are not
+  shrunk to a few pixels. Only a bounded number of tiles is in flight at once.
+
+All strategies return raw outputs in original-image coordinates, so the rest
+of the pipeline (filter_detections onwards) is unchanged. Every pass of a
+strategy uses the same detector profile (see profiles.py).
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
+
+import math
+
+import torch
+from torchvision.ops import nms
+from PIL import Image
+
+from .backends import BACKENDS, TUNABLE_BACKENDS
+from .batching import submit_inference
+from .postprocessing import filter_detections
+from .preprocessing import DEFAULT_MAX_SIZE
+from .profiles import DEFAULT_PROFILE, get_profile
+from .worker_pool import get_worker_pool
+
+
+INFERENCE_MODES = ("full", "roi", "tiled")
+
+
+@dataclass
+class InferenceSettings:
+    """Deployment-wide inference configuration (set once at startup)."""
+    mode: str = "full"
+    # Runtime the model runs on; only tunable backends support roi/tiled and non-default profiles
+    backend: str = "eager"
+    # Detector profile used when a request does not ask for one
+    profile: str = DEFAULT_PROFILE
+    # Longest side for the coarse spine-localization pass
+    roi_coarse_size: int = 512
+    # Cap on the longest side for the fine pass over the spine crop. Above the
+    # full-frame 1333 so tall films keep more vertical detail; the crop is
+    # narrow, so this still costs fewer pixels than a full-frame pass
+    roi_max_size: int = 2048
+    # Padding around the detected column, in median vertebra widths/heights
+    roi_pad_x: float = 0.75
+    roi_pad_y: float = 1.5
+    # Minimum vertebrae the coarse pass must find before we trust its crop
+    roi_min_vertebrae: int = 3
+    # Tile side and minimum overlap in original pixels; the overlap grows with
+    # the image (see tile_overlap_for) so a vertebra fits inside it
+    tile_size: int = 800
+    tile_overlap: int = 200
+    # Tiles in flight at once; they are batched together, which bounds peak memory
+    tile_parallelism: int = 2
+    # IoU above which detections from neighbouring tiles are treated as the same vertebra
+    tile_nms_threshold: float = 0.5
+    # Share of a cut-off detection a whole one must cover to replace it
+    tile_cover_threshold: float = 0.5
+
+
+_settings = InferenceSettings()
+
+# Largest vertebra expected, as a fraction of the image's long side: a lumbar
+# vertebra on a film the spine fills top to bottom, with some margin
+TILE_OVERLAP_FRACTION = 0.08
+
+# Fine-pass sizes are rounded up to a multiple of this, which bounds the
+# number of resize variants the backend keeps and lets similar crops batch
+ROI_SIZE_STEP = 128
+
+
+def configure_inference(**kwargs) -> InferenceSettings:
+    """Update the global inference settings."""
+    for key, value in kwargs.items():
+        if not hasattr(_settings, key):
+            raise ValueError(f"Unknown inference setting '{key}'")
+        setattr(_settings, key, value)
+
+    if _settings.mode not in INFERENCE_MODES:
+        raise ValueError(
+            f"Unknown inference mode '{_settings.mode}'. Use one of: {', '.join(INFERENCE_MODES)}"
+        )
+    get_profile(_settings.profile)
+
+    if _settings.backend not in BACKENDS:
+        raise ValueError(
+            f"Unknown inference backend '{_settings.backend}'. Use one of: {', '.join(BACKENDS)}"
+        )
+    if _settings.backend not in TUNABLE_BACKENDS:
+        # roi/tiled run the detector at other sizes, which exported artifacts cannot do
+        if _settings.mode != "full":
+            raise ValueError(
+                f"Inference mode '{_settings.mode}' needs the eager backend; "
+                f"the {_settings.backend} backend only supports mode 'full'"
+            )
+        if _settings.profile != DEFAULT_PROFILE:
+            raise ValueError(
+                f"Detector profile '{_settings.profile}' needs the eager backend; "
+                f"the {_settings.backend} backend only supports profile '{DEFAULT_PROFILE}'"
+            )
+    return _settings
+
+
+def get_inference_settings() -> InferenceSettings:
+    return _settings
+
+
+def profile_supported(profile: Optional[str]) -> bool:
+    """Whether the deployment's backend can run a request's detector profile."""
+    return (
+        profile is None
+        or profile == DEFAULT_PROFILE
+        or _settings.backend in TUNABLE_BACKENDS
+    )
+
+
+def offset_outputs(outputs: Dict[str, Any], dx: float, dy: float) -> Dict[str, Any]:
+    """Shift raw outputs from crop coordinates into original-image coordinates."""
+    boxes = outputs["boxes"].clone()
+    boxes[:, [0, 2]] += dx
+    boxes[:, [1, 3]] += dy
+
+    keypoints = outputs["keypoints"].clone()
+    keypoints[:, :, 0] += dx
+    keypoints[:, :, 1] += dy
+
+    return {
+        "boxes": boxes,
+        "scores": outputs["scores"],
+        "keypoints": keypoints
+    }
+
+
+def find_spine_roi(
+    outputs: Dict[str, Any],
+    image_size: Tuple[int, int],
+    settings: InferenceSettings
+) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Locate the spine column from coarse detections.
+
+    Returns:
+        (x1, y1, x2, y2) crop in original-image pixels, or None if the coarse
+        pass did not find enough vertebrae to be trusted
+    """
+    filtered = filter_detections(outputs)
+    if len(filtered["boxes"]) < settings.roi_min_vertebrae:
+        return None
+
+    boxes = torch.tensor(filtered["boxes"])
+    widths = boxes[:, 2] - boxes[:, 0]
+    heights = boxes[:, 3] - boxes[:, 1]
+
+    # Pad generously vertically so end vertebrae missed by the coarse pass are still inside
+    pad_x = float(widths.median()) * settings.roi_pad_x
+    pad_y = float(heights.median()) * settings.roi_pad_y
+
+    width, height = image_size
+    x1 = max(0, int(boxes[:, 0].min() - pad_x))
+    y1 = max(0, int(boxes[:, 1].min() - pad_y))
+    x2 = min(width, int(boxes[:, 2].max() + pad_x) + 1)
+    y2 = min(height, int(boxes[:, 3].max() + pad_y) + 1)
+
+    if x2 - x1 < 2 or y2 - y1 < 2:
+        return None
+    return x1, y1, x2, y2
+
+
+def tile_starts(length: int, tile_size: int, overlap: int) -> List[int]:
+    """Start offsets of overlapping tiles covering [0, length), last tile flush with the end."""
+    if length <= tile_size:
+        return [0]
+
+    step = max(1, tile_size - overlap)
+    starts = list(range(0, length - tile_size, step))
+    starts.append(length - tile_size)
+    return starts
+
+
+def tile_overlap_for(image_size: Tuple[int, int], settings: InferenceSettings) -> int:
+    """
+    Tile overlap for an image: large enough to contain a whole vertebra.
+
+    At least settings.tile_overlap and TILE_OVERLAP_FRACTION of the long
+    side, but at most half a tile, so tiles still advance.
+    """
+    derived = math.ceil(max(image_size) * TILE_OVERLAP_FRACTION)
+    return min(settings.tile_size // 2, max(settings.tile_overlap, derived))
+
+
+def tile_edge_mask(
+    outputs: Dict[str, Any],
+    tile: Tuple[int, int, int, int],
+    image_size: Tuple[int, int],
+    margin: float = 2.0
+) -> torch.Tensor:
+    """Detections cut off by a tile border that lies inside the image."""
+    x1, y1, x2, y2 = tile
+    width, height = image_size
+    boxes = outputs["boxes"]
+
+    cut = torch.zeros(len(boxes), dtype=torch.bool)
+    if x1 > 0:
+        cut |= boxes[:, 0] <= margin
+    if y1 > 0:
+        cut |= boxes[:, 1] <= margin
+    if x2 < width:
+        cut |= boxes[:, 2] >= (x2 - x1) - margin
+    if y2 < height:
+        cut |= boxes[:, 3] >= (y2 - y1) - margin
+    return cut
+
+
+def covered_fraction(boxes: torch.Tensor, others: torch.Tensor) -> torch.Tensor:
+    """For each box, the largest share of its area covered by one of the others."""
+    top_left = torch.maximum(boxes[:, None, :2], others[None, :, :2])
+    bottom_right = torch.minimum(boxes[:, None, 2:], others[None, :, 2:])
+    intersection = (bottom_right - top_left).clamp(min=0).prod(dim=2)
+    area = (boxes[:, 2:] - boxes[:, :2]).clamp(min=1e-6).prod(dim=1)
+    return (intersection / area[:, None]).max(dim=1).values
+
+
+def merge_tile_outputs(
+    outputs: List[Dict[str, Any]],
+    cut_masks: List[torch.Tensor],
+    iou_threshold: float,
+    cover_threshold: float = 0.5
+) -> Dict[str, Any]:
+    """
+    Concatenate per-tile detections and suppress cross-tile duplicates.
+
+    A detection cut off by an interior tile border is dropped only when a
+    whole detection from a neighbouring tile covers it; a vertebra that no
+    tile sees whole keeps its cut-off copies instead of disappearing.
+    """
+    boxes = torch.cat([o["boxes"] for o in outputs])
+    scores = torch.cat([o["scores"] for o in outputs])
+    keypoints = torch.cat([o["keypoints"] for o in outputs])
+    cut = torch.cat(cut_masks)
+
+    keep = torch.ones(len(boxes), dtype=torch.bool)
+    if cut.any() and (~cut).any():
+        keep[cut] = covered_fraction(boxes[cut], boxes[~cut]) < cover_threshold
+
+    boxes, scores, keypoints = boxes[keep], scores[keep], keypoints[keep]
+    keep = nms(boxes, scores, iou_threshold)
+    return {
+        "boxes": boxes[keep],
+        "scores": scores[keep],
+        "keypoints": keypoints[keep]
+    }
+
+
+def roi_fine_size(crop_size: Tuple[int, int], max_size: int) -> int:
+    """
+    Longest side for the fine pass: the crop's native resolution (rounded up
+    to ROI_SIZE_STEP), capped at max_size.
+    """
+    native = math.ceil(max(crop_size) / ROI_SIZE_STEP) * ROI_SIZE_STEP
+    return min(native, max_size)
+
+
+def predict_full(image: Image.Image, profile: str = DEFAULT_PROFILE) -> Dict[str, Any]:
+    """Single pass over the whole frame."""
+    return submit_inference(image, DEFAULT_MAX_SIZE, profile).result()
+
+
+def predict_roi(
+    image: Image.Image,
+    settings: InferenceSettings,
+    profile: str = DEFAULT_PROFILE
+) -> Dict[str, Any]:
+    """
+    Coarse-to-fine inference: locate the spine at low resolution, then run
+    the fine pass on the spine crop only.
+
+    The fine pass runs at the crop's native resolution up to
+    settings.roi_max_size. On a 4096 px film the spine crop is about as tall
+    as the film, so a cap of 1333 would give it the same vertical scale as a
+    full-frame pass; the default 2048 keeps half its native detail. Backbone
+    time grows with the crop's pixel count, so raising the cap trades
+    latency for keypoint precision on large films, while crops smaller than
+    the cap are never downscaled.
+
+    Falls back to a full-frame pass if the coarse pass is inconclusive.
+    """
+    coarse = submit_inference(image, settings.roi_coarse_size, profile).result()
+    roi = find_spine_roi(coarse, image.size, settings)
+    if roi is None:
+        return predict_full(image, profile)
+
+    x1, y1, x2, y2 = roi
+    crop = image.crop(roi)
+    fine_size = roi_fine_size(crop.size, settings.roi_max_size)
+    fine = submit_inference(crop, fine_size, profile).result()
+    return offset_outputs(fine, x1, y1)
+
+
+def predict_tiled(
+    image: Image.Image,
+    settings: InferenceSettings,
+    profile: str = DEFAULT_PROFILE
+) -> Dict[str, Any]:
+    """
+    Native-resolution inference over overlapping tiles.
+
+    Images small enough to be processed without downscaling skip tiling.
+    """
+    width, height = image.size
+    if max(width, height) <= DEFAULT_MAX_SIZE:
+        return predict_full(image, profile)
+
+    size, overlap = settings.tile_size, tile_overlap_for(image.size, settings)
+    tiles = [
+        (x, y, min(x + size, width), min(y + size, height))
+        for y in tile_starts(height, size, overlap)
+        for x in tile_starts(width, size, overlap)
+    ]
+
+    # Crops are made lazily, a few at a time, so peak memory stays bounded on 4096 px films
+    outputs, cut_masks = [], []
+    parallelism = max(1, settings.tile_parallelism)
+    for i in range(0, len(tiles), parallelism):
+        window = tiles[i:i + parallelism]
+        futures = [submit_inference(image.crop(tile), size, profile) for tile in window]
+        for tile, future in zip(window, futures):
+            tile_outputs = future.result()
+            cut_masks.append(tile_edge_mask(tile_outputs, tile, image.size))
+            outputs.append(offset_outputs(tile_outputs, tile[0], tile[1]))
+
+    return merge_tile_outputs(
+        outputs, cut_masks, settings.tile_nms_threshold, settings.tile_cover_threshold
+    )
+
+
+def predict_spine(image: Image.Image, profile: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Run vertebra detection on an image using the configured strategy.
+
+    Blocking; call it from a worker thread in async code so concurrent
+    requests can share batches. When the worker pool is running, the
+    image is handed to a worker process instead.
+
+    Args:
+        image: PIL Image in RGB format
+        profile: Detector profile name, or None for the deployment default
+
+    Returns:
+        Dictionary with boxes, scores, keypoints in original-image coordinates
+    """
+    settings = _settings
+    profile = profile or settings.profile
+
+    pool = get_worker_pool()
+    if pool is not None:
+        return pool.predict(image, profile)
+
+    if settings.mode == "roi":
+        return predict_roi(image, settings, profile)
+    if settings.mode == "tiled":
+        return predict_tiled(image, settings, profile)
+    return predict_full(image, profile)
@@ -0,0 +1,181 @@
+"""
+Classical L/R marker detection with OpenCV.
+
+Lead markers show up as a crisp, isolated letter in a film corner. Each
+corner is thresholded (Otsu, both polarities), split into connected
+components, and every letter-shaped component is compared against rendered
+L and R glyphs with normalized cross-correlation. Glyphs of similar
+letters (P, B, K, ...) are matched too, so a "P" in a "PA" label is not
+taken for an R. This takes a few milliseconds and needs no OCR model;
+detect_lr_marker falls back to EasyOCR only when no component matches one
+letter clearly.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+# Glyphs are compared at this square size
+GLYPH_SIZE = 32
+
+# Fonts and stroke weights the templates are rendered with
+TEMPLATE_FONTS = (
+    cv2.FONT_HERSHEY_SIMPLEX,
+    cv2.FONT_HERSHEY_DUPLEX,
+    cv2.FONT_HERSHEY_COMPLEX,
+    cv2.FONT_HERSHEY_TRIPLEX,
+)
+TEMPLATE_THICKNESS = (4, 8, 12, 20)
+
+# Letters easily confused with L or R in corner labels
+DISTRACTOR_LETTERS = "PBKJFEHDbhk"
+
+# Blur applied to normalized glyphs so stroke width and serifs matter less
+GLYPH_BLUR_SIGMA = 1.0
+
+# A match must reach this correlation...
+MIN_MATCH_SCORE = 0.65
+# ...and beat the other letter and every distractor by this much
+MIN_MATCH_MARGIN = 0.06
+
+# Letter-shaped components: size in pixels, height/width ratio and ink coverage.
+# A thin-stroked L covers as little as 5% of its box and a bold R up to 85%.
+MIN_GLYPH_HEIGHT = 12
+MAX_GLYPH_HEIGHT_RATIO = 0.8
+GLYPH_ASPECT_RANGE = (0.8, 2.5)
+GLYPH_FILL_RANGE = (0.05, 0.9)
+
+# Lazily rendered templates: letter (or "other" for distractors) -> (templates, GLYPH_SIZE²)
+_templates: Optional[Dict[str, np.ndarray]] = None
+
+
+def normalize_glyph(mask: np.ndarray) -> np.ndarray:
+    """Center a binary glyph in a GLYPH_SIZE square, keeping its aspect ratio."""
+    height, width = mask.shape[:2]
+    scale = (GLYPH_SIZE - 4) / max(height, width)
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    glyph = cv2.resize(mask.astype(np.float32), size, interpolation=cv2.INTER_AREA)
+
+    canvas = np.zeros((GLYPH_SIZE, GLYPH_SIZE), dtype=np.float32)
+    y = (GLYPH_SIZE - size[1]) // 2
+    x = (GLYPH_SIZE - size[0]) // 2
+    canvas[y:y + size[1], x:x + size[0]] = glyph
+    return cv2.GaussianBlur(canvas, (0, 0), GLYPH_BLUR_SIGMA)
+
+
+def standardize(glyphs: np.ndarray) -> np.ndarray:
+    """Flatten glyphs to zero-mean, unit-norm rows, so a dot product is their correlation."""
+    rows = glyphs.reshape(len(glyphs), -1)
+    rows = rows - rows.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(rows, axis=1, keepdims=True)
+    return rows / np.maximum(norms, 1e-6)
+
+
+def render_template(letter: str, font: int, thickness: int) -> np.ndarray:
+    """Draw a letter and normalize it like a detected glyph."""
+    canvas = np.zeros((200, 200), dtype=np.uint8)
+    cv2.putText(canvas, letter, (30, 160), font, 5, 255, thickness, cv2.LINE_AA)
+    ys, xs = np.nonzero(canvas > 127)
+    return normalize_glyph(canvas[ys.min():ys.max() + 1, xs.min():xs.max() + 1] > 127)
+
+
+def get_templates() -> Dict[str, np.ndarray]:
+    """
+    L, R and distractor templates across fonts and stroke weights.
+
+    Mirrored glyphs are included: a digitally flipped film shows its marker
+    mirrored, and it still tells which side is which. Its other labels are
+    mirrored too, and a mirrored P or K looks more like an R than like any
+    upright distractor.
+    """
+    global _templates
+    if _templates is None:
+        def render_all(letters: str) -> List[np.ndarray]:
+            return [
+                render_template(letter, font, thickness)
+                for letter in letters
+                for font in TEMPLATE_FONTS
+                for thickness in TEMPLATE_THICKNESS
+            ]
+
+        _templates = {}
+        for letter in ("L", "R"):
+            glyphs = render_all(letter)
+            _templates[letter] = standardize(np.array(glyphs + [np.fliplr(glyph) for glyph in glyphs]))
+        glyphs = render_all(DISTRACTOR_LETTERS)
+        _templates["other"] = standardize(np.array(glyphs + [np.fliplr(glyph) for glyph in glyphs]))
+    return _templates
+
+
+def glyph_candidates(corner: np.ndarray, width: int, height: int) -> List[np.ndarray]:
+    """
+    Normalized letter-shaped components of a grayscale corner, bright and dark.
+
+    Args:
+        corner: Letterboxed grayscale corner
+        width, height: Extent of the film crop in its top-left, without the padding
+    """
+    # The padding is not film: thresholding and the border test use the crop only
+    corner = corner[:height, :width]
+    height, width = corner.shape[:2]
+    _, bright = cv2.threshold(corner, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+    candidates = []
+    for binary in (bright, cv2.bitwise_not(bright)):
+        count, labels, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+        for label in range(1, count):
+            x, y, w, h, area = stats[label]
+
+            # Components touching the border are film edges or collimation, not markers
+            if x == 0 or y == 0 or x + w >= width or y + h >= height:
+                continue
+            if h < MIN_GLYPH_HEIGHT or h > MAX_GLYPH_HEIGHT_RATIO * height:
+                continue
+            if not GLYPH_ASPECT_RANGE[0] <= h / w <= GLYPH_ASPECT_RANGE[1]:
+                continue
+            if not GLYPH_FILL_RANGE[0] <= area / (w * h) <= GLYPH_FILL_RANGE[1]:
+                continue
+
+            candidates.append(normalize_glyph(labels[y:y + h, x:x + w] == label))
+    return candidates
+
+
+def match_glyph(glyph: np.ndarray) -> Tuple[str, float, float]:
+    """
+    Best matching letter for a normalized glyph (correlation against all
+    templates as one matrix product).
+
+    Returns:
+        Tuple of (letter, correlation, margin over the other letter and the
+        distractors); letter is "other" when a distractor matches best
+    """
+    vector = standardize(glyph[None])[0]
+    scores = {
+        letter: float((templates @ vector).max())
+        for letter, templates in get_templates().items()
+    }
+    letter = max(scores, key=scores.get)
+    runner_up = max(score for other, score in scores.items() if other != letter)
+    return letter, scores[letter], scores[letter] - runner_up
+
+
+def find_marker(corner: np.ndarray, width: int, height: int) -> Optional[Tuple[str, float]]:
+    """
+    Clearly matching L/R glyph in a grayscale corner.
+
+    Args:
+        corner: Letterboxed grayscale corner
+        width, height: Extent of the film crop in its top-left, without the padding
+
+    Returns:
+        Tuple of (letter, confidence), or None if no component is conclusive
+    """
+    best = None
+    for glyph in glyph_candidates(corner, width, height):
+        letter, score, margin = match_glyph(glyph)
+        if letter != "other" and score >= MIN_MATCH_SCORE and margin >= MIN_MATCH_MARGIN:
+            if best is None or score > best[1]:
+                best = (letter, score)
+    return best
@@ -1,12 +1,245 @@
 import os
+import time
 import torch
-from torchvision.models.detection import keypointrcnn_resnet50_fpn
+from torchvision.models import resnet50
+from torchvision.models.detection.backbone_utils import _resnet_fpn_extractor
+from torchvision.ops.misc import FrozenBatchNorm2d
 from torchvision.models.detection.keypoint_rcnn import KeypointRCNN
 from torchvision.models.detection.anchor_utils import AnchorGenerator
 from typing import Dict, List, Any, Optional
 from PIL import Image
 
-from .preprocessing import preprocess_for_model, resize_if_needed
+from .preprocessing import preprocess_for_model, resize_if_needed, DEFAULT_MAX_SIZE
+from .profiles import DEFAULT_PROFILE
+from .quantization import quantize_model
+from .worker_pool import get_worker_pool
+from .backends import (
+    BACKENDS, InferenceBackend, EagerBackend, TorchScriptBackend, OnnxBackend,
+    default_artifact_path
+)
+
+
+def safetensors_path(weights_path: str) -> str:
+    """Path of the safetensors copy of a checkpoint, e.g. models/keypointsrcnn_weights.safetensors."""
+    return os.path.splitext(weights_path)[0] + ".safetensors"
+
+
+def load_checkpoint(weights_path: str, device: torch.device) -> Dict[str, torch.Tensor]:
+    """
+    Load a state dict, memory-mapping the file where possible.
+
+    A safetensors copy next to the checkpoint (written by download_models.py)
+    is preferred. Otherwise the .pt file is loaded with mmap=True, and only
+    legacy pickles that cannot be mapped are read fully into memory. Mapped
+    tensors are backed by the page cache, so startup is mostly page faults and
+    forked workers share the same pages.
+
+    Returns:
+        State dict for the Keypoint RCNN
+    """
+    if weights_path.endswith(".safetensors"):
+        candidate = weights_path
+    else:
+        candidate = safetensors_path(weights_path)
+
+    if os.path.exists(candidate):
+        try:
+            # Optional dependency; the .pt path below works without it
+            from safetensors.torch import load_file
+
+            state_dict = load_file(candidate, device=str(device))
+            print(f"Weights format: safetensors ({candidate})")
+            return state_dict
+        except ImportError:
+            print("safetensors is not installed, falling back to the .pt checkpoint")
+
+    try:
+        state_dict = torch.load(weights_path, map_location=device, mmap=True, weights_only=True)
+        print(f"Weights format: memory-mapped torch checkpoint ({weights_path})")
+        return state_dict
+    except Exception as e:
+        # Legacy (non-zip) checkpoints cannot be mapped
+        print(f"Could not memory-map checkpoint ({e}), loading it fully")
+
+    return torch.load(weights_path, map_location=device, weights_only=False)
+
+
+def build_model(
+    weights_path: str,
+    device: torch.device,
+    quantization: Optional[str] = None,
+    calibration_images: Optional[List[Image.Image]] = None
+) -> KeypointRCNN:
+    """
+    Build the Keypoint RCNN and load the pre-trained weights.
+
+    Args:
+        weights_path: Path to the ScolioVis checkpoint
+        device: Device to load the model on
+        quantization: None for fp32, or an INT8 mode ("dynamic" or "static")
+        calibration_images: Representative X-rays for static quantization
+
+    Returns:
+        Model in eval mode
+    """
+    # Check if weights exist
+    if not os.path.exists(weights_path):
+        raise FileNotFoundError(
+            f"Model weights not found at {weights_path}. "
+            "Please download from https://github.com/Blankeos/scoliovis-training/releases"
+        )
+
+    # Create custom anchor generator to match checkpoint
+    # The checkpoint was trained with 7 anchors per location
+    # This uses 7 aspect ratios across 5 feature map levels
+    anchor_generator = AnchorGenerator(
+        sizes=((32,), (64,), (128,), (256,), (512,)),
+        aspect_ratios=((0.25, 0.5, 0.75, 1.0, 1.33, 2.0, 4.0),) * 5
+    )
+
+    # Create model with custom configuration
+    # ScolioVis uses 4 keypoints per vertebra (4 corners)
+    # Parameters are created on the meta device: every one of them comes from
+    # the checkpoint, so random initialization (and the ImageNet backbone
+    # download) would be wasted work. The backbone is built the way
+    # keypointrcnn_resnet50_fpn builds it for a pretrained backbone
+    # (FrozenBatchNorm2d, 3 trainable layers), just without the download
+    with torch.device("meta"):
+        backbone = resnet50(weights=None, norm_layer=FrozenBatchNorm2d)
+        model = KeypointRCNN(
+            _resnet_fpn_extractor(backbone, trainable_layers=3),
+            num_classes=2,  # background + vertebra
+            num_keypoints=4,  # 4 corners per vertebra
+            rpn_anchor_generator=anchor_generator
+        )
+
+    # Load pre-trained weights, adopting the (memory-mapped) tensors as-is
+    start_time = time.time()
+    checkpoint = load_checkpoint(weights_path, device)
+    model.load_state_dict(checkpoint, assign=True)
+    print(f"Weights loaded in {(time.time() - start_time) * 1000:.0f}ms")
+
+    model.to(device)
+    model.eval()
+
+    if quantization:
+        model = quantize_model(model, quantization, calibration_images)
+
+    return model
+
+
+def scale_outputs(
+    result: Dict[str, torch.Tensor],
+    scale_x: float,
+    scale_y: float
+) -> Dict[str, Any]:
+    """Scale raw model outputs from the resized input back to original coordinates."""
+    boxes = result["boxes"]
+    keypoints = result["keypoints"]
+
+    # Scale coordinates back to original image dimensions if resized
+    if scale_x != 1.0 or scale_y != 1.0:
+        # Scale boxes: [x1, y1, x2, y2]
+        boxes = boxes.clone()
+        boxes[:, 0] *= scale_x  # x1
+        boxes[:, 1] *= scale_y  # y1
+        boxes[:, 2] *= scale_x  # x2
+        boxes[:, 3] *= scale_y  # y2
+
+        # Scale keypoints: shape is [N, num_keypoints, 3] where 3 is [x, y, visibility]
+        keypoints = keypoints.clone()
+        keypoints[:, :, 0] *= scale_x  # x coordinates
+        keypoints[:, :, 1] *= scale_y  # y coordinates
+
+    return {
+        "boxes": boxes,
+        "scores": result["scores"],
+        "keypoints": keypoints
+    }
+
+
+def load_backend(
+    backend: str,
+    weights_path: str,
+    device: torch.device,
+    artifact_path: Optional[str] = None,
+    quantization: Optional[str] = None,
+    calibration_images: Optional[List[Image.Image]] = None
+) -> InferenceBackend:
+    """
+    Create the inference backend for a deployment.
+
+    Args:
+        backend: "eager", "torchscript" or "onnx"
+        weights_path: Path to the ScolioVis checkpoint
+        device: Device to run on (ONNX Runtime always uses CPU)
+        artifact_path: Exported artifact for torchscript/onnx (defaults next to the checkpoint)
+        quantization: Optional INT8 mode, eager backend only
+        calibration_images: Representative X-rays for static quantization
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}'. Use one of: {', '.join(BACKENDS)}")
+
+    if backend == "eager":
+        model = build_model(weights_path, device, quantization, calibration_images)
+        return EagerBackend(model, device)
+
+    if quantization:
+        raise ValueError("Quantization is only supported with the eager backend")
+
+    artifact_path = artifact_path or default_artifact_path(weights_path, backend)
+    if backend == "torchscript":
+        return TorchScriptBackend(artifact_path, device)
+    return OnnxBackend(artifact_path)
+
+
+@torch.no_grad()
+def run_model(
+    backend: InferenceBackend,
+    images: List[Image.Image],
+    max_size: int = DEFAULT_MAX_SIZE,
+    profile: str = DEFAULT_PROFILE
+) -> List[Dict[str, Any]]:
+    """
+    Run a list of images through the backend in a single call.
+
+    Args:
+        backend: Inference backend
+        images: PIL Images in RGB format
+        max_size: Longest side the images are downscaled to before inference
+        profile: Detector profile name (see profiles.py)
+
+    Returns:
+        One dictionary per image with boxes, scores, keypoints
+        (scaled to that image's original dimensions)
+    """
+    tensors = []
+    scales = []
+    for image in images:
+        # Store original dimensions
+        orig_width, orig_height = image.size
+
+        # Resize if too large
+        resized_image = resize_if_needed(image, max_size)
+        resized_width, resized_height = resized_image.size
+
+        # Calculate scale factors to map back to original coordinates
+        scales.append((orig_width / resized_width, orig_height / resized_height))
+
+        # Preprocess
+        tensors.append(preprocess_for_model(resized_image))
+
+    # Run inference (non-default sizes also change the model's internal resize)
+    outputs = backend.run(
+        tensors,
+        None if max_size == DEFAULT_MAX_SIZE else max_size,
+        None if profile == DEFAULT_PROFILE else profile
+    )
+
+    return [
+        scale_outputs(result, scale_x, scale_y)
+        for result, (scale_x, scale_y) in zip(outputs, scales)
+    ]
 
 
 class SpineModel:
@@ -15,117 +248,110 @@ class SpineModel:
     for vertebrae detection.
     """
     _instance: Optional["SpineModel"] = None
-    _model: Optional[KeypointRCNN] = None
+    _backend: Optional[InferenceBackend] = None
     _device: Optional[torch.device] = None
     _loaded: bool = False
+    _quantization: Optional[str] = None
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
 
-    def load(self, weights_path: str = "models/keypointsrcnn_weights.pt") -> None:
-        """Load the pre-trained model weights."""
+    def load(
+        self,
+        weights_path: str = "models/keypointsrcnn_weights.pt",
+        quantization: Optional[str] = None,
+        calibration_images: Optional[List[Image.Image]] = None,
+        backend: str = "eager",
+        artifact_path: Optional[str] = None
+    ) -> None:
+        """
+        Load the pre-trained model weights.
+
+        Args:
+            weights_path: Path to the ScolioVis checkpoint
+            quantization: Optional INT8 mode ("dynamic" or "static"), CPU only
+            calibration_images: Representative X-rays for static quantization
+            backend: Inference runtime ("eager", "torchscript" or "onnx")
+            artifact_path: Exported artifact for the torchscript/onnx backends
+        """
         if self._loaded:
             return
 
-        self._device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        start_time = time.time()
+        if quantization or backend == "onnx":
+            # Quantized kernels and our ONNX Runtime session are CPU-only
+            self._device = torch.device("cpu")
+        else:
+            self._device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         print(f"Using device: {self._device}")
 
-        # Check if weights exist
-        if not os.path.exists(weights_path):
-            raise FileNotFoundError(
-                f"Model weights not found at {weights_path}. "
-                "Please download from https://github.com/Blankeos/scoliovis-training/releases"
-            )
-
-        # Create custom anchor generator to match checkpoint
-        # The checkpoint was trained with 7 anchors per location
-        # This uses 7 aspect ratios across 5 feature map levels
-        anchor_generator = AnchorGenerator(
-            sizes=((32,), (64,), (128,), (256,), (512,)),
-            aspect_ratios=((0.25, 0.5, 0.75, 1.0, 1.33, 2.0, 4.0),) * 5
-        )
-
-        # Create model with custom configuration
-        # ScolioVis uses 4 keypoints per vertebra (4 corners)
-        self._model = keypointrcnn_resnet50_fpn(
-            weights=None,
-            num_classes=2,  # background + vertebra
-            num_keypoints=4,  # 4 corners per vertebra
-            rpn_anchor_generator=anchor_generator
+        self._backend = load_backend(
+            backend, weights_path, self._device, artifact_path,
+            quantization, calibration_images
         )
-
-        # Load pre-trained weights
-        checkpoint = torch.load(weights_path, map_location=self._device, weights_only=False)
-        self._model.load_state_dict(checkpoint)
-
-        self._model.to(self._device)
-        self._model.eval()
+        self._quantization = quantization
         self._loaded = True
-        print("Model loaded successfully!")
+        elapsed_ms = (time.time() - start_time) * 1000
+        if quantization:
+            print(f"Model loaded successfully in {elapsed_ms:.0f}ms! ({backend} backend, INT8 {quantization} quantization)")
+        else:
+            print(f"Model loaded successfully in {elapsed_ms:.0f}ms! ({backend} backend)")
 
     def is_loaded(self) -> bool:
-        """Check if model is loaded."""
+        """
+        Check if model is loaded.
+
+        With the inference worker pool running, the model lives in the
+        workers only, and it counts as loaded once all of them are ready.
+        """
+        pool = get_worker_pool()
+        if pool is not None:
+            return pool.is_ready()
         return self._loaded
 
-    @torch.no_grad()
-    def predict(self, image: Image.Image) -> Dict[str, Any]:
+    def predict(
+        self,
+        image: Image.Image,
+        max_size: int = DEFAULT_MAX_SIZE,
+        profile: str = DEFAULT_PROFILE
+    ) -> Dict[str, Any]:
         """
         Run inference on an image.
 
         Args:
             image: PIL Image in RGB format
+            max_size: Longest side the image is downscaled to before inference
+            profile: Detector profile name (see profiles.py)
 
         Returns:
             Dictionary with boxes, scores, keypoints (scaled to original image dimensions)
         """
-        if not self._loaded:
-            raise RuntimeError("Model not loaded. Call load() first.")
-
-        # Store original dimensions
-        orig_width, orig_height = image.size
-
-        # Resize if too large
-        resized_image = resize_if_needed(image)
-        resized_width, resized_height = resized_image.size
+        return self.predict_batch([image], max_size, profile)[0]
 
-        # Calculate scale factors to map back to original coordinates
-        scale_x = orig_width / resized_width
-        scale_y = orig_height / resized_height
-
-        # Preprocess
-        tensor = preprocess_for_model(resized_image)
-        tensor = tensor.to(self._device)
-
-        # Run inference
-        outputs = self._model([tensor])
-
-        # Extract first (and only) image results
-        result = outputs[0]
-
-        boxes = result["boxes"]
-        keypoints = result["keypoints"]
+    def predict_batch(
+        self,
+        images: List[Image.Image],
+        max_size: int = DEFAULT_MAX_SIZE,
+        profile: str = DEFAULT_PROFILE
+    ) -> List[Dict[str, Any]]:
+        """
+        Run inference on several images in a single forward pass.
 
-        # Scale coordinates back to original image dimensions if resized
-        if scale_x != 1.0 or scale_y != 1.0:
-            # Scale boxes: [x1, y1, x2, y2]
-            boxes = boxes.clone()
-            boxes[:, 0] *= scale_x  # x1
-            boxes[:, 1] *= scale_y  # y1
-            boxes[:, 2] *= scale_x  # x2
-            boxes[:, 3] *= scale_y  # y2
+        Args:
+            images: PIL Images in RGB format (sizes may differ)
+            max_size: Longest side the images are downscaled to before inference
+            profile: Detector profile name (see profiles.py)
 
-            # Scale keypoints: shape is [N, num_keypoints, 3] where 3 is [x, y, visibility]
-            keypoints = keypoints.clone()
-            keypoints[:, :, 0] *= scale_x  # x coordinates
-            keypoints[:, :, 1] *= scale_y  # y coordinates
+        Returns:
+            One dictionary per image with boxes, scores, keypoints
+            (scaled to that image's original dimensions)
+        """
+        if not self._loaded:
+            raise RuntimeError("Model not loaded. Call load() first.")
 
-        return {
-            "boxes": boxes,
-            "scores": result["scores"],
-            "keypoints": keypoints
-        }
+        return run_model(self._backend, images, max_size, profile)
 
 
 # Global model instance
@@ -140,8 +366,14 @@ def get_model() -> SpineModel:
     return _model_instance
 
 
-def load_model(weights_path: str = "models/keypointsrcnn_weights.pt") -> SpineModel:
+def load_model(
+    weights_path: str = "models/keypointsrcnn_weights.pt",
+    quantization: Optional[str] = None,
+    calibration_images: Optional[List[Image.Image]] = None,
+    backend: str = "eager",
+    artifact_path: Optional[str] = None
+) -> SpineModel:
     """Load the model and return the instance."""
     model = get_model()
-    model.load(weights_path)
+    model.load(weights_path, quantization, calibration_images, backend, artifact_path)
     return model
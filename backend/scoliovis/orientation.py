@@ -9,7 +9,7 @@ Standard PA X-ray convention:
 
 import numpy as np
 from PIL import Image
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 import cv2
 
 from api.schemas import (
@@ -17,10 +17,28 @@ from api.schemas import (
     DetectedMarker,
     OrientationDetectionResult,
 )
+from .markers import find_marker
 
 # Lazy-loaded EasyOCR reader
 _reader = None
 
+# Corner crops are converted to grayscale and letterboxed to this square size
+# (never upscaled), so every corner of a round has the same shape and goes
+# through EasyOCR in one batched call
+OCR_CORNER_SIZE = 320
+
+# Minimum OCR confidence for an L/R reading to count
+MIN_MARKER_CONFIDENCE = 0.4
+
+# A marker at least this confident ends the scan; remaining corners are skipped
+EARLY_STOP_CONFIDENCE = 0.8
+
+# Corners are read in rounds, top corners first (where markers usually are)
+CORNER_ROUNDS = (
+    (("left", "top"), ("right", "top")),
+    (("left", "bottom"), ("right", "bottom")),
+)
+
 
 def get_ocr_reader():
     """Lazy load EasyOCR reader to avoid startup delay."""
@@ -31,67 +49,170 @@ def get_ocr_reader():
     return _reader
 
 
+def corner_region(width: int, height: int, side: str, edge: str) -> Tuple[int, int, int, int]:
+    """
+    Corner region to search for a marker: 20% of the width, 15% of the height.
+
+    Returns:
+        Tuple of (x1, y1, x2, y2)
+    """
+    corner_size_w = int(width * 0.2)
+    corner_size_h = int(height * 0.15)
+    x1 = 0 if side == "left" else width - corner_size_w
+    y1 = 0 if edge == "top" else height - corner_size_h
+    return x1, y1, x1 + corner_size_w, y1 + corner_size_h
+
+
+def corner_extent(region: Tuple[int, int, int, int]) -> Tuple[int, int]:
+    """
+    Size of a corner's crop inside its letterboxed OCR_CORNER_SIZE square.
+
+    prepare_corner pads to the right and bottom, so the crop occupies
+    [0:height, 0:width] of the prepared corner.
+
+    Returns:
+        Tuple of (width, height)
+    """
+    x1, y1, x2, y2 = region
+    width, height = x2 - x1, y2 - y1
+    scale = min(1.0, OCR_CORNER_SIZE / max(width, height, 1))
+    if scale < 1.0:
+        return max(1, round(width * scale)), max(1, round(height * scale))
+    return width, height
+
+
+def prepare_corner(gray: np.ndarray, region: Tuple[int, int, int, int]) -> np.ndarray:
+    """Crop a corner, stretch its contrast and letterbox it to OCR_CORNER_SIZE."""
+    x1, y1, x2, y2 = region
+    corner = cv2.normalize(gray[y1:y2, x1:x2], None, 0, 255, cv2.NORM_MINMAX)
+
+    width, height = corner_extent(region)
+    if (width, height) != (x2 - x1, y2 - y1):
+        corner = cv2.resize(corner, (width, height), interpolation=cv2.INTER_AREA)
+
+    # Pad with the background level so the border reads as empty film
+    return cv2.copyMakeBorder(
+        corner, 0, OCR_CORNER_SIZE - height, 0, OCR_CORNER_SIZE - width,
+        cv2.BORDER_CONSTANT, value=int(np.median(corner)) if corner.size else 0
+    )
+
+
+def ocr_corners(corners: List[np.ndarray]) -> List[List[Tuple[str, float]]]:
+    """
+    Read L/R characters in same-sized grayscale corners with one batched EasyOCR call.
+
+    Returns:
+        Per corner, the (text, confidence) readings
+    """
+    results = get_ocr_reader().readtext_batched(corners, detail=1, allowlist='LRlr')
+    return [[(text, confidence) for (_bbox, text, confidence) in readings] for readings in results]
+
+
+def find_marker_classical(
+    corners: List[Tuple[str, np.ndarray, Tuple[int, int]]]
+) -> Optional[DetectedMarker]:
+    """
+    Most confident L/R glyph found by the OpenCV matcher (see markers.py).
+
+    Args:
+        corners: (position, prepared grayscale corner, (width, height) of its
+            crop before letterboxing) triples
+    """
+    detected_marker = None
+    for position, corner, (width, height) in corners:
+        match = find_marker(corner, width, height)
+        if match and (detected_marker is None or match[1] > detected_marker.confidence):
+            detected_marker = DetectedMarker(
+                marker=match[0],
+                position=position,
+                confidence=round(match[1], 3)
+            )
+    return detected_marker
+
+
+def find_marker_ocr(
+    corners: Dict[Tuple[str, str], np.ndarray]
+) -> Tuple[Optional[DetectedMarker], float]:
+    """
+    Read the corners with EasyOCR, round by round, until a marker is certain enough.
+
+    Args:
+        corners: Prepared grayscale corners keyed by (side, edge)
+
+    Returns:
+        Tuple of (best marker or None, its confidence)
+    """
+    detected_marker = None
+    best_confidence = 0.0
+
+    for corner_round in CORNER_ROUNDS:
+        round_corners = [corners[key] for key in corner_round]
+
+        # Run OCR on the corners of this round - only allow L, R characters
+        try:
+            readings = ocr_corners(round_corners)
+        except Exception:
+            # OCR can fail on some images, continue to next round
+            continue
+
+        for (position, _edge), corner_readings in zip(corner_round, readings):
+            for text, confidence in corner_readings:
+                text_upper = text.upper().strip()
+
+                # Check for L or R marker with reasonable confidence
+                if text_upper in ['L', 'R'] and confidence > MIN_MARKER_CONFIDENCE:
+                    if confidence > best_confidence:
+                        best_confidence = confidence
+                        detected_marker = DetectedMarker(
+                            marker=text_upper,
+                            position=position,
+                            confidence=round(confidence, 3)
+                        )
+
+        # Stop scanning once a marker is certain enough
+        if best_confidence >= EARLY_STOP_CONFIDENCE:
+            break
+
+    return detected_marker, best_confidence
+
+
 def detect_lr_marker(image: Image.Image) -> OrientationDetectionResult:
     """
-    Detect L or R marker on X-ray image using OCR.
+    Detect L or R marker on X-ray image.
 
     L/R markers are typically placed in corners of clinical X-rays.
     Standard PA view: "R" marker on patient's right side (appears on left of image)
 
+    A template matcher looks for a crisp lead-marker glyph first; EasyOCR is
+    loaded and run only when that is inconclusive.
+
     Args:
         image: PIL Image of the X-ray
 
     Returns:
         OrientationDetectionResult with detected marker and suggested orientation
     """
-    reader = get_ocr_reader()
-    image_np = np.array(image.convert('RGB'))
-
-    height, width = image_np.shape[:2]
-
-    # Define corner regions to search (markers are usually in corners)
-    # Search top and bottom corners, 20% of image dimensions
-    corner_size_w = int(width * 0.2)
-    corner_size_h = int(height * 0.15)
-
-    corners = {
-        "left": [
-            (0, 0, corner_size_w, corner_size_h),  # top-left
-            (0, height - corner_size_h, corner_size_w, height),  # bottom-left
-        ],
-        "right": [
-            (width - corner_size_w, 0, width, corner_size_h),  # top-right
-            (width - corner_size_w, height - corner_size_h, width, height),  # bottom-right
-        ],
+    # Markers are read from a grayscale copy; color adds nothing on an X-ray
+    gray = np.array(image.convert('L'))
+    height, width = gray.shape[:2]
+
+    regions = {
+        (side, edge): corner_region(width, height, side, edge)
+        for corner_round in CORNER_ROUNDS
+        for side, edge in corner_round
     }
+    corners = {key: prepare_corner(gray, region) for key, region in regions.items()}
 
-    detected_marker = None
-    best_confidence = 0.0
+    # Fast path: a lead marker matched without OCR
+    detected_marker = find_marker_classical([
+        (side, corner, corner_extent(regions[(side, edge)]))
+        for (side, edge), corner in corners.items()
+    ])
+    best_confidence = detected_marker.confidence if detected_marker else 0.0
 
-    for position, regions in corners.items():
-        for (x1, y1, x2, y2) in regions:
-            # Crop corner region
-            corner_img = image_np[y1:y2, x1:x2]
-
-            # Run OCR on corner - only allow L, R characters
-            try:
-                results = reader.readtext(corner_img, detail=1, allowlist='LRlr')
-
-                for (_bbox, text, confidence) in results:
-                    text_upper = text.upper().strip()
-
-                    # Check for L or R marker with reasonable confidence
-                    if text_upper in ['L', 'R'] and confidence > 0.4:
-                        if confidence > best_confidence:
-                            best_confidence = confidence
-                            detected_marker = DetectedMarker(
-                                marker=text_upper,
-                                position=position,
-                                confidence=round(confidence, 3)
-                            )
-            except Exception:
-                # OCR can fail on some images, continue to next region
-                continue
+    # Otherwise read the corners with OCR
+    if detected_marker is None:
+        detected_marker, best_confidence = find_marker_ocr(corners)
 
     # Determine suggested orientation based on detected marker
     if detected_marker:
@@ -137,6 +258,26 @@ def determine_orientation_from_marker(marker: DetectedMarker) -> ImageOrientatio
     return ImageOrientation.UNKNOWN
 
 
+def mirror_detection_result(result: OrientationDetectionResult) -> OrientationDetectionResult:
+    """
+    Marker detection for the horizontally flipped image.
+
+    Flipping moves the marker to the other side, so its position swaps and
+    the suggested orientation is derived again; nothing is re-read.
+    """
+    if result.detected_marker is None:
+        return result
+
+    marker = result.detected_marker.model_copy(update={
+        "position": "right" if result.detected_marker.position == "left" else "left"
+    })
+    return OrientationDetectionResult(
+        detected_marker=marker,
+        suggested_orientation=determine_orientation_from_marker(marker),
+        confidence=result.confidence
+    )
+
+
 def flip_image_horizontal(image: Image.Image) -> Image.Image:
     """Flip image horizontally (mirror)."""
     return image.transpose(Image.FLIP_LEFT_RIGHT)
@@ -160,15 +301,8 @@ def draw_marker_highlight(
     height, width = image_np.shape[:2]
     result = image_np.copy()
 
-    # Determine corner region based on marker position
-    corner_size_w = int(width * 0.2)
-    corner_size_h = int(height * 0.15)
-
-    if marker.position == "left":
-        # Check top-left first, assume marker is there
-        x1, y1, x2, y2 = 0, 0, corner_size_w, corner_size_h
-    else:
-        x1, y1, x2, y2 = width - corner_size_w, 0, width, corner_size_h
+    # Determine corner region based on marker position (assume the top corner)
+    x1, y1, x2, y2 = corner_region(width, height, marker.position, "top")
 
     # Draw rectangle with primary green color (RGB: 63, 155, 97 -> BGR for OpenCV)
     cv2.rectangle(result, (x1, y1), (x2, y2), (63, 155, 97), 3)
@@ -1,15 +1,42 @@
 import torch
-import numpy as np
 from typing import List, Dict, Any
-from torchvision.ops import nms
-from api.schemas import Vertebra, Keypoint
+from torchvision.ops import batched_nms
+from api.schemas import Vertebra
+from .geometry import SpineGeometry, TOP_LEFT, TOP_RIGHT, BOTTOM_LEFT, BOTTOM_RIGHT
 
 
-# Vertebra labels based on typical spine anatomy
-VERTEBRA_LABELS = [
-    "T1", "T2", "T3", "T4", "T5", "T6", "T7", "T8", "T9", "T10", "T11", "T12",
-    "L1", "L2", "L3", "L4", "L5"
-]
+# Keypoint order after a horizontal flip: each left/right corner pair trades places
+MIRRORED_CORNERS = [TOP_RIGHT, TOP_LEFT, BOTTOM_RIGHT, BOTTOM_LEFT]
+
+
+def mirror_detections(outputs: Dict[str, torch.Tensor], width: int) -> Dict[str, torch.Tensor]:
+    """
+    Raw model outputs for the horizontally flipped image.
+
+    A flip is an exact transform: x becomes width - x, so boxes are mirrored
+    (x1' = width - x2, x2' = width - x1) and keypoints too, with each
+    left/right corner pair swapped to keep the TL, TR, BL, BR order.
+    Returns a new dict; the (possibly cached) outputs are not modified.
+
+    Args:
+        outputs: Model outputs for the unflipped image
+        width: Image width in pixels
+    """
+    mirrored = dict(outputs)
+
+    boxes = outputs["boxes"]
+    mirrored["boxes"] = torch.stack(
+        [width - boxes[:, 2], boxes[:, 1], width - boxes[:, 0], boxes[:, 3]], dim=1
+    )
+
+    keypoints = outputs["keypoints"][:, MIRRORED_CORNERS].clone()
+    keypoints[..., 0] = width - keypoints[..., 0]
+    mirrored["keypoints"] = keypoints
+
+    if "keypoints_scores" in outputs:
+        mirrored["keypoints_scores"] = outputs["keypoints_scores"][:, MIRRORED_CORNERS]
+
+    return mirrored
 
 
 def filter_detections(
@@ -24,59 +51,152 @@ def filter_detections(
     Steps:
     1. Filter by confidence score
     2. Apply Non-Maximum Suppression
-    3. Keep top-k detections
-    4. Sort by y-coordinate (top to bottom)
-    5. Filter spatial outliers (detections far from the spine)
+    3. Sort by y-coordinate (top to bottom)
+    4. Filter spatial outliers (detections far from the spine)
+    5. Keep top-k detections
     """
-    boxes = outputs["boxes"]
-    scores = outputs["scores"]
-    keypoints = outputs["keypoints"]
+    return filter_detections_batch(
+        [outputs], confidence_threshold, nms_threshold, max_detections
+    )[0]
+
+
+def filter_detections_batch(
+    outputs_list: List[Dict[str, torch.Tensor]],
+    confidence_threshold: float = 0.5,
+    nms_threshold: float = 0.3,
+    max_detections: int = 17
+) -> List[Dict[str, Any]]:
+    """
+    filter_detections for the outputs of many images at once.
+
+    Detections of all images are concatenated and every step runs as one
+    tensor operation over the batch: NMS is batched per image, and the
+    outlier statistics are computed on a padded (images x detections) layout.
+    Candidates are tracked by index and boxes, scores and keypoints are
+    gathered only once at the end.
+    """
+    num_images = len(outputs_list)
+    if num_images == 0:
+        return []
+
+    boxes = torch.cat([o["boxes"] for o in outputs_list])
+    scores = torch.cat([o["scores"] for o in outputs_list])
+    keypoints = torch.cat([o["keypoints"] for o in outputs_list])
+    image_ids = torch.cat([
+        torch.full((len(o["boxes"]),), i, dtype=torch.long, device=boxes.device)
+        for i, o in enumerate(outputs_list)
+    ])
 
     # 1. Filter by confidence
-    confident_mask = scores >= confidence_threshold
-    boxes = boxes[confident_mask]
-    scores = scores[confident_mask]
-    keypoints = keypoints[confident_mask]
-
-    if len(boxes) == 0:
-        return {"boxes": [], "scores": [], "keypoints": []}
-
-    # 2. Apply NMS
-    keep_indices = nms(boxes, scores, nms_threshold)
-    boxes = boxes[keep_indices]
-    scores = scores[keep_indices]
-    keypoints = keypoints[keep_indices]
-
-    # 3. Sort by y-coordinate first (top of bounding box)
-    y_positions = boxes[:, 1]  # y1 (top)
-    sort_indices = torch.argsort(y_positions)
-    boxes = boxes[sort_indices]
-    scores = scores[sort_indices]
-    keypoints = keypoints[sort_indices]
+    candidates = torch.nonzero(scores >= confidence_threshold).squeeze(1)
+
+    # 2. Apply NMS (per image)
+    keep = batched_nms(boxes[candidates], scores[candidates], image_ids[candidates], nms_threshold)
+    candidates = candidates[keep]
+
+    # 3. Sort by image, then by y-coordinate (top of bounding box)
+    candidates = candidates[torch.argsort(boxes[candidates, 1], stable=True)]
+    candidates = candidates[torch.argsort(image_ids[candidates], stable=True)]
+
+    # Lay candidates out as (image, rank from top), padded with -1
+    candidate_images = image_ids[candidates]
+    counts = torch.bincount(candidate_images, minlength=num_images)
+    width = int(counts.max()) if len(candidates) > 0 else 0
+    offsets = torch.cumsum(counts, 0) - counts
+    ranks = torch.arange(len(candidates), device=boxes.device) - offsets[candidate_images]
+    layout = torch.full((num_images, width), -1, dtype=torch.long, device=boxes.device)
+    layout[candidate_images, ranks] = candidates
+    valid = layout >= 0
 
     # 4. Filter spatial outliers - remove detections far from the spine centerline
-    if len(boxes) >= 3:
-        boxes, scores, keypoints = filter_spatial_outliers(boxes, scores, keypoints)
-
-    # 5. Keep top-k (by score) if still too many
-    if len(boxes) > max_detections:
-        top_k_indices = torch.topk(scores, max_detections).indices
-        # Re-sort these by y-position
-        selected_boxes = boxes[top_k_indices]
-        selected_scores = scores[top_k_indices]
-        selected_keypoints = keypoints[top_k_indices]
-
-        y_positions = selected_boxes[:, 1]
-        sort_indices = torch.argsort(y_positions)
-        boxes = selected_boxes[sort_indices]
-        scores = selected_scores[sort_indices]
-        keypoints = selected_keypoints[sort_indices]
-
-    return {
-        "boxes": boxes.cpu().numpy().tolist(),
-        "scores": scores.cpu().numpy().tolist(),
-        "keypoints": keypoints.cpu().numpy().tolist()
-    }
+    keep_mask = valid
+    if width >= 3:
+        keep_mask = spatial_outlier_mask(boxes[layout.clamp(min=0)], valid)
+
+    # 5. Keep top-k (by score) if still too many; positions stay in y order
+    if width > max_detections:
+        layout_scores = scores[layout.clamp(min=0)].masked_fill(~keep_mask, float("-inf"))
+        top_k = torch.topk(layout_scores, max_detections, dim=1).indices
+        in_top_k = torch.zeros_like(keep_mask).scatter_(1, top_k, True)
+        keep_mask = keep_mask & (in_top_k | (keep_mask.sum(dim=1, keepdim=True) <= max_detections))
+
+    results = []
+    for image_index in range(num_images):
+        selected = layout[image_index][keep_mask[image_index]]
+        results.append({
+            "boxes": boxes[selected].cpu().numpy().tolist(),
+            "scores": scores[selected].cpu().numpy().tolist(),
+            "keypoints": keypoints[selected].cpu().numpy().tolist()
+        })
+    return results
+
+
+def spatial_outlier_mask(
+    boxes: torch.Tensor,
+    valid: torch.Tensor,
+    x_deviation_threshold: float = 2.5,  # Number of MADs from median
+    y_gap_threshold: float = 2.0,  # Max gap multiplier relative to median spacing
+    min_keep: int = 3
+) -> torch.Tensor:
+    """
+    Keep-mask of detections that are spatially consistent with the spine.
+
+    Args:
+        boxes: (images, detections, 4) boxes, padded where `valid` is False
+        valid: (images, detections) mask of real detections
+
+    Returns:
+        (images, detections) mask; images with fewer than 3 detections keep
+        all of them, and at least 3 are always kept otherwise
+    """
+    nan = torch.tensor(float("nan"), device=boxes.device)
+    center_x = torch.where(valid, (boxes[..., 0] + boxes[..., 2]) / 2, nan)
+    center_y = torch.where(valid, (boxes[..., 1] + boxes[..., 3]) / 2, nan)
+    widths = torch.where(valid, boxes[..., 2] - boxes[..., 0], nan)
+    counts = valid.sum(dim=1)
+
+    # Median Absolute Deviation (MAD) of the x-position around the centerline
+    median_x = torch.nanmedian(center_x, dim=1, keepdim=True).values
+    x_deviations = torch.abs(center_x - median_x)
+    mad_x = torch.nanmedian(x_deviations, dim=1, keepdim=True).values
+
+    # Avoid division by zero - use a minimum MAD based on typical vertebra width
+    min_mad = torch.nanmedian(widths, dim=1, keepdim=True).values * 0.3  # 30% of median width
+    mad_x = torch.maximum(mad_x, min_mad)
+
+    # Filter by x-deviation: keep detections within threshold MADs of median
+    x_inlier_mask = x_deviations <= (x_deviation_threshold * mad_x)
+
+    # Abnormal vertical gaps: only the topmost and bottommost detections can be
+    # cut off from the rest of the column (artifacts above or below the spine).
+    # Padding sorts last (NaN), so its gaps are NaN and never count as large.
+    sorted_y, order = torch.sort(center_y, dim=1)
+    gaps = sorted_y[:, 1:] - sorted_y[:, :-1]
+    median_gap = torch.nanmedian(gaps, dim=1, keepdim=True).values
+    large_gap = gaps > y_gap_threshold * median_gap
+
+    rank = torch.arange(boxes.shape[1], device=boxes.device).unsqueeze(0)
+    last_gap = (counts - 2).clamp(min=0).unsqueeze(1)
+    first_cut = (rank == 0) & large_gap[:, :1]
+    last_cut = (rank == counts.unsqueeze(1) - 1) & torch.gather(large_gap, 1, last_gap)
+    y_gap_mask = torch.ones_like(valid).scatter_(1, order, ~(first_cut | last_cut))
+
+    # Combine masks
+    keep_mask = x_inlier_mask & y_gap_mask & valid
+
+    # Always keep at least 3 detections (don't over-filter): fall back to the
+    # x-deviation test alone, then to the 3 detections closest to median x
+    closest = torch.zeros_like(valid)
+    num_closest = min(min_keep, boxes.shape[1])
+    closest_indices = torch.topk(-x_deviations.nan_to_num(float("inf")), num_closest, dim=1).indices
+    closest.scatter_(1, closest_indices, True)
+
+    x_only = x_inlier_mask & valid
+    keep_mask = torch.where((keep_mask.sum(dim=1) >= min_keep).unsqueeze(1), keep_mask, x_only)
+    keep_mask = torch.where((keep_mask.sum(dim=1) >= min_keep).unsqueeze(1), keep_mask, closest & valid)
+
+    # Too few detections to judge outliers: keep them all
+    return torch.where((counts >= min_keep).unsqueeze(1), keep_mask, valid)
 
 
 def filter_spatial_outliers(
@@ -98,133 +218,27 @@ def filter_spatial_outliers(
     if len(boxes) < 3:
         return boxes, scores, keypoints
 
-    # Calculate center x-position for each detection
-    center_x = (boxes[:, 0] + boxes[:, 2]) / 2  # (x1 + x2) / 2
-    center_y = (boxes[:, 1] + boxes[:, 3]) / 2  # (y1 + y2) / 2
-
-    # Calculate median x-position (spine should be roughly vertical)
-    median_x = torch.median(center_x)
-
-    # Calculate Median Absolute Deviation (MAD) for x-position
-    x_deviations = torch.abs(center_x - median_x)
-    mad_x = torch.median(x_deviations)
-
-    # Avoid division by zero - use a minimum MAD based on typical vertebra width
-    min_mad = (boxes[:, 2] - boxes[:, 0]).median() * 0.3  # 30% of median width
-    mad_x = torch.max(mad_x, min_mad)
-
-    # Filter by x-deviation: keep detections within threshold MADs of median
-    x_inlier_mask = x_deviations <= (x_deviation_threshold * mad_x)
-
-    # Also check for abnormal vertical gaps (detections too far from neighbors)
-    y_gap_mask = torch.ones(len(boxes), dtype=torch.bool, device=boxes.device)
-
-    if len(center_y) >= 3:
-        # Calculate gaps between consecutive vertebrae
-        y_sorted_indices = torch.argsort(center_y)
-        sorted_y = center_y[y_sorted_indices]
-        gaps = sorted_y[1:] - sorted_y[:-1]
-
-        if len(gaps) > 0:
-            median_gap = torch.median(gaps)
-            # Mark detections with abnormally large gaps before or after them
-            for i in range(len(y_sorted_indices)):
-                original_idx = y_sorted_indices[i]
-                # Check gap to previous (if exists)
-                if i > 0:
-                    gap_before = gaps[i - 1]
-                    if gap_before > y_gap_threshold * median_gap:
-                        # This vertebra might be an outlier if it's the last one
-                        # and has a huge gap from the rest
-                        if i == len(y_sorted_indices) - 1:
-                            y_gap_mask[original_idx] = False
-                # Check gap to next (if exists)
-                if i < len(gaps):
-                    gap_after = gaps[i]
-                    if gap_after > y_gap_threshold * median_gap:
-                        # If first vertebra has huge gap, might be artifact at top
-                        if i == 0:
-                            y_gap_mask[original_idx] = False
-
-    # Combine masks
-    keep_mask = x_inlier_mask & y_gap_mask
-
-    # Always keep at least 3 detections (don't over-filter)
-    if keep_mask.sum() < 3:
-        # Fall back to keeping based on x-deviation only, sorted by score
-        keep_mask = x_inlier_mask
-        if keep_mask.sum() < 3:
-            # Keep the 3 highest scoring ones that are closest to median x
-            _, closest_indices = torch.topk(-x_deviations, min(3, len(boxes)))
-            keep_mask = torch.zeros(len(boxes), dtype=torch.bool, device=boxes.device)
-            keep_mask[closest_indices] = True
-
+    valid = torch.ones((1, len(boxes)), dtype=torch.bool, device=boxes.device)
+    keep_mask = spatial_outlier_mask(
+        boxes.unsqueeze(0), valid, x_deviation_threshold, y_gap_threshold
+    )[0]
     return boxes[keep_mask], scores[keep_mask], keypoints[keep_mask]
 
 
-def extract_vertebrae(filtered_outputs: Dict[str, Any]) -> List[Vertebra]:
+def extract_geometry(filtered_outputs: Dict[str, Any]) -> SpineGeometry:
     """
-    Convert filtered detections to Vertebra objects.
+    Convert filtered detections to the array-backed spine geometry.
 
     Keypoint order from model: [top-left, top-right, bottom-left, bottom-right]
     """
-    vertebrae = []
-
-    boxes = filtered_outputs["boxes"]
-    scores = filtered_outputs["scores"]
-    keypoints_list = filtered_outputs["keypoints"]
-
-    for idx, (box, score, kps) in enumerate(zip(boxes, scores, keypoints_list)):
-        # Assign label based on position (approximate)
-        label = VERTEBRA_LABELS[idx] if idx < len(VERTEBRA_LABELS) else f"V{idx + 1}"
-
-        # Extract keypoints (format: [[x, y, visibility], ...])
-        extracted_keypoints = [
-            Keypoint(x=kp[0], y=kp[1], confidence=kp[2] if len(kp) > 2 else 1.0)
-            for kp in kps
-        ]
-
-        # Calculate tilt angle from keypoints
-        tilt_angle = calculate_vertebra_tilt(extracted_keypoints)
-
-        vertebra = Vertebra(
-            index=idx,
-            label=label,
-            bounding_box=box,
-            keypoints=extracted_keypoints,
-            confidence=score,
-            tilt_angle=tilt_angle
-        )
-        vertebrae.append(vertebra)
-
-    return vertebrae
-
-
-def calculate_vertebra_tilt(keypoints: List[Keypoint]) -> float:
-    """
-    Calculate the tilt angle of a vertebra from horizontal.
-    Uses the upper endplate (top-left to top-right).
-    Positive = tilted right, Negative = tilted left.
-    """
-    if len(keypoints) < 4:
-        return 0.0
-
-    # Top-left and top-right keypoints
-    tl = keypoints[0]
-    tr = keypoints[1]
+    return SpineGeometry.from_detections(filtered_outputs)
 
-    # Calculate angle from horizontal
-    dx = tr.x - tl.x
-    dy = tr.y - tl.y
 
-    angle_rad = np.arctan2(dy, dx)
-    angle_deg = np.degrees(angle_rad)
-
-    return round(angle_deg, 2)
+def extract_vertebrae(filtered_outputs: Dict[str, Any]) -> List[Vertebra]:
+    """Convert filtered detections to Vertebra objects."""
+    return extract_geometry(filtered_outputs).to_vertebrae()
 
 
-def calculate_average_confidence(vertebrae: List[Vertebra]) -> float:
+def calculate_average_confidence(geometry: SpineGeometry) -> float:
     """Calculate average confidence score across all detections."""
-    if not vertebrae:
-        return 0.0
-    return sum(v.confidence for v in vertebrae) / len(vertebrae)
+    return geometry.average_confidence()
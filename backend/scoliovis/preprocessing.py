@@ -6,6 +6,10 @@ import torch
 from torchvision import transforms
 
 
+# Longest side images are downscaled to before inference
+DEFAULT_MAX_SIZE = 1333
+
+
 def decode_base64_image(base64_string: str) -> Image.Image:
     """Decode a base64 encoded image string to PIL Image."""
     # Handle data URL prefix if present
@@ -37,7 +41,7 @@ def preprocess_for_model(image: Image.Image) -> torch.Tensor:
     return tensor
 
 
-def resize_if_needed(image: Image.Image, max_size: int = 1333) -> Image.Image:
+def resize_if_needed(image: Image.Image, max_size: int = DEFAULT_MAX_SIZE) -> Image.Image:
     """
     Resize image if larger than max_size while maintaining aspect ratio.
     Keypoint RCNN works best with images around 800-1333 pixels.
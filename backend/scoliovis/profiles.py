@@ -0,0 +1,68 @@
+"""
+Detector profiles for the single-class vertebra task.
+
+torchvision builds the Keypoint RCNN with general-purpose limits: 1000 RPN
+proposals kept before and after NMS and up to 100 detections per image at a
+0.05 score floor. A spine has at most 17 vertebrae and filter_detections drops
+everything under 0.5, so most of that work is thrown away. The lighter
+profiles cut the proposals carried into the ROI heads (box and keypoint heads
+run per proposal/detection) and the detections kept.
+
+- accurate: torchvision defaults, identical to the model as built
+- balanced: fewer proposals, detections capped well above 17
+- fast: minimal proposals and detections for latency-sensitive deployments
+
+Latency versus recall has not been measured yet. The balanced and fast
+limits are derived from the task bounds above (at most 17 vertebrae, a 0.5
+confidence floor), not from a benchmark run, so treat them as unvalidated
+and keep "accurate" where recall matters. To record the table, run
+benchmark_profiles.py on representative films with the production weights
+and paste its markdown table here:
+
+    python benchmark_profiles.py IMAGE_DIR --runs 3
+"""
+
+from dataclasses import dataclass
+from typing import Dict
+
+
+@dataclass(frozen=True)
+class DetectorProfile:
+    """RPN and ROI head limits applied at inference time."""
+    # Proposals kept per image before and after RPN NMS
+    rpn_pre_nms_top_n: int
+    rpn_post_nms_top_n: int
+    # Detections returned per image and the score floor they must clear
+    detections_per_img: int
+    score_thresh: float
+
+
+DEFAULT_PROFILE = "accurate"
+
+PROFILES: Dict[str, DetectorProfile] = {
+    "accurate": DetectorProfile(
+        rpn_pre_nms_top_n=1000,
+        rpn_post_nms_top_n=1000,
+        detections_per_img=100,
+        score_thresh=0.05,
+    ),
+    "balanced": DetectorProfile(
+        rpn_pre_nms_top_n=500,
+        rpn_post_nms_top_n=200,
+        detections_per_img=40,
+        score_thresh=0.2,
+    ),
+    "fast": DetectorProfile(
+        rpn_pre_nms_top_n=250,
+        rpn_post_nms_top_n=75,
+        detections_per_img=25,
+        score_thresh=0.3,
+    ),
+}
+
+
+def get_profile(name: str) -> DetectorProfile:
+    """Look up a profile by name."""
+    if name not in PROFILES:
+        raise ValueError(f"Unknown detector profile '{name}'. Use one of: {', '.join(PROFILES)}")
+    return PROFILES[name]
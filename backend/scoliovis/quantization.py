@@ -0,0 +1,137 @@
+"""
+INT8 quantization of the Keypoint RCNN for CPU inference.
+
+Modes:
+- "dynamic": Linear layers (box head fc6/fc7 and predictors, the bulk of the
+  ROI head parameters) store INT8 weights and quantize activations on the fly.
+  No calibration needed.
+- "static": additionally quantizes the ResNet50 backbone body with FX graph
+  mode. FrozenBatchNorm layers are folded into the preceding convolutions and
+  activation ranges are calibrated on representative X-rays.
+"""
+
+import os
+from typing import List, Optional
+
+import torch
+from torch import nn
+from torchvision.ops.misc import FrozenBatchNorm2d
+from PIL import Image
+
+from .preprocessing import preprocess_for_model, resize_if_needed
+
+
+QUANTIZATION_MODES = ("dynamic", "static")
+CALIBRATION_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def select_quantized_engine() -> str:
+    """Pick the best available INT8 kernel backend for this CPU."""
+    supported = torch.backends.quantized.supported_engines
+    for engine in ("x86", "fbgemm", "qnnpack"):
+        if engine in supported:
+            torch.backends.quantized.engine = engine
+            return engine
+    raise RuntimeError("No quantized engine available in this torch build")
+
+
+def fold_frozen_batchnorm(module: nn.Module) -> None:
+    """
+    Fold every FrozenBatchNorm2d into the convolution before it.
+
+    torchvision's detection backbones use FrozenBatchNorm2d, which the FX
+    fuser does not recognize. Folding it by hand lets conv + relu fuse into
+    a single quantized op.
+    """
+    for parent in module.modules():
+        children = dict(parent.named_children())
+        names = list(children)
+        for i, name in enumerate(names):
+            bn = children[name]
+            if not isinstance(bn, FrozenBatchNorm2d):
+                continue
+
+            # ResNet names its pairs conv1/bn1, conv2/bn2...; downsample is Sequential(conv, bn)
+            conv_name = "conv" + name[2:] if name.startswith("bn") else names[i - 1]
+            conv = children.get(conv_name)
+            if not isinstance(conv, nn.Conv2d):
+                continue
+
+            scale = bn.weight * torch.rsqrt(bn.running_var + bn.eps)
+            bias = conv.bias if conv.bias is not None else torch.zeros_like(bn.bias)
+            conv.weight = nn.Parameter(conv.weight * scale.reshape(-1, 1, 1, 1))
+            conv.bias = nn.Parameter(bn.bias + (bias - bn.running_mean) * scale)
+            setattr(parent, name, nn.Identity())
+
+
+@torch.no_grad()
+def quantize_backbone_static(
+    model: nn.Module,
+    calibration_images: List[Image.Image]
+) -> None:
+    """Statically quantize the backbone body in place, calibrating on the given images."""
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+    engine = torch.backends.quantized.engine
+    body = model.backbone.body
+    fold_frozen_batchnorm(body)
+
+    example_inputs = (torch.zeros(1, 3, 800, 800),)
+    prepared = prepare_fx(body, get_default_qconfig_mapping(engine), example_inputs)
+
+    # Run the full model so observers see realistic backbone activations
+    model.backbone.body = prepared
+    for image in calibration_images:
+        model([preprocess_for_model(resize_if_needed(image))])
+
+    model.backbone.body = convert_fx(prepared)
+
+
+def quantize_model(
+    model: nn.Module,
+    mode: str,
+    calibration_images: Optional[List[Image.Image]] = None
+) -> nn.Module:
+    """
+    Quantize a loaded fp32 Keypoint RCNN (CPU, eval mode).
+
+    Args:
+        model: fp32 model
+        mode: "dynamic" or "static"
+        calibration_images: Representative X-rays, required for "static"
+
+    Returns:
+        Quantized model
+    """
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(
+            f"Unknown quantization mode '{mode}'. Use one of: {', '.join(QUANTIZATION_MODES)}"
+        )
+
+    engine = select_quantized_engine()
+    print(f"Quantizing model ({mode}, engine: {engine})...")
+
+    if mode == "static":
+        if not calibration_images:
+            raise ValueError("Static quantization needs calibration images")
+        quantize_backbone_static(model, calibration_images)
+
+    return torch.ao.quantization.quantize_dynamic(
+        model, {nn.Linear}, dtype=torch.qint8, inplace=True
+    )
+
+
+def load_calibration_images(directory: str, limit: int = 16) -> List[Image.Image]:
+    """Load up to `limit` RGB images from a directory for static calibration."""
+    images = []
+    if not os.path.isdir(directory):
+        return images
+
+    for name in sorted(os.listdir(directory)):
+        if not name.lower().endswith(CALIBRATION_EXTENSIONS):
+            continue
+        images.append(Image.open(os.path.join(directory, name)).convert("RGB"))
+        if len(images) >= limit:
+            break
+    return images
@@ -5,26 +5,30 @@ from io import BytesIO
 from PIL import Image
 from typing import List, Tuple, Optional
 
-from api.schemas import Vertebra, CobbAngleMeasurement
+from api.schemas import CobbAngleMeasurement
+from .geometry import SpineGeometry, TOP_LEFT, TOP_RIGHT, BOTTOM_LEFT, BOTTOM_RIGHT
 
 
-# Color scheme (BGR for OpenCV) matching the app's design
+# Color scheme (RGB, drawn directly on the RGB image) matching the app's design
 COLORS = {
-    "vertebra_fill": (97, 155, 63),      # Primary green #3F9B61
-    "vertebra_outline": (80, 127, 53),   # Darker green
+    "vertebra_fill": (63, 155, 97),      # Primary green #3F9B61
+    "vertebra_outline": (53, 127, 80),   # Darker green
     "keypoint": (255, 255, 255),         # White
-    "keypoint_outline": (97, 155, 63),   # Green outline
-    "spine_line": (115, 175, 76),        # Primary light #4CAF73
-    "cobb_line": (0, 100, 255),          # Orange-red for Cobb lines
-    "cobb_arc": (0, 165, 255),           # Orange for angle arc
-    "label_text": (50, 45, 41),          # Dark #292D32
+    "keypoint_outline": (63, 155, 97),   # Green outline
+    "spine_line": (76, 175, 115),        # Primary light #4CAF73
+    "cobb_line": (255, 100, 0),          # Orange-red for Cobb lines
+    "cobb_arc": (255, 165, 0),           # Orange for angle arc
+    "label_text": (41, 45, 50),          # Dark #292D32
     "label_bg": (239, 247, 239),         # Light #EFF7EF
 }
 
+# Opacity of the vertebra fills
+FILL_ALPHA = 0.25
+
 
 def draw_skeleton_overlay(
     image: np.ndarray,
-    vertebrae: List[Vertebra],
+    geometry: SpineGeometry,
     cobb_angles: List[CobbAngleMeasurement]
 ) -> np.ndarray:
     """
@@ -39,41 +43,40 @@ def draw_skeleton_overlay(
 
     Args:
         image: Input image as numpy array (RGB)
-        vertebrae: List of detected vertebrae with keypoints
+        geometry: Detected spine geometry
         cobb_angles: List of Cobb angle measurements
 
     Returns:
         Annotated image as numpy array (RGB)
     """
-    # Convert RGB to BGR for OpenCV
-    overlay = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+    # Draw on a copy in RGB (the colors are RGB, so no conversions are needed)
+    overlay = image.copy()
     h, w = overlay.shape[:2]
 
     # Calculate scale factor for line thickness based on image size
     scale = max(w, h) / 1000
 
-    # 1. Draw vertebra shapes (semi-transparent)
-    for vertebra in vertebrae:
-        draw_vertebra_shape(overlay, vertebra, scale)
+    corners = geometry.keypoints[:, :, :2]
+
+    # 1. Draw vertebra shapes (semi-transparent, blended in one pass)
+    draw_vertebra_shapes(overlay, vertebra_polygons(corners, w, h), scale)
 
     # 2. Draw spine centerline
-    draw_spine_centerline(overlay, vertebrae, scale)
+    draw_spine_centerline(overlay, geometry, scale)
 
     # 3. Draw Cobb angle measurements
     for cobb in cobb_angles:
-        draw_cobb_angle_lines(overlay, vertebrae, cobb, scale)
+        draw_cobb_angle_lines(overlay, geometry, cobb, scale)
 
     # 4. Draw keypoint markers
-    for vertebra in vertebrae:
-        draw_keypoints(overlay, vertebra, scale)
+    for vertebra_corners in corners:
+        draw_keypoints(overlay, vertebra_corners, scale)
 
     # 5. Draw vertebra labels
-    for vertebra in vertebrae:
-        draw_vertebra_label(overlay, vertebra, scale)
+    for vertebra_corners, label in zip(corners, geometry.labels):
+        draw_vertebra_label(overlay, vertebra_corners, label, scale)
 
-    # Convert back to RGB
-    result = cv2.cvtColor(overlay, cv2.COLOR_BGR2RGB)
-    return result
+    return overlay
 
 
 def clamp_to_image(x: float, y: float, width: int, height: int) -> tuple:
@@ -84,39 +87,57 @@ def clamp_to_image(x: float, y: float, width: int, height: int) -> tuple:
     )
 
 
-def draw_vertebra_shape(img: np.ndarray, vertebra: Vertebra, scale: float):
-    """Draw a semi-transparent quadrilateral for a vertebra."""
-    kp = vertebra.keypoints
-    h, w = img.shape[:2]
+def clamp_points_to_image(points: np.ndarray, width: int, height: int) -> np.ndarray:
+    """Clamp an (N, 2) array of coordinates to image bounds as int32 pixels."""
+    pixels = points.astype(np.int32)
+    pixels[:, 0] = np.clip(pixels[:, 0], 0, width - 1)
+    pixels[:, 1] = np.clip(pixels[:, 1], 0, height - 1)
+    return pixels
+
+
+def vertebra_polygons(corners: np.ndarray, width: int, height: int) -> np.ndarray:
+    """
+    Vertebra quadrilaterals as (N, 4, 2) int32 pixels, clamped to the image.
+
+    Points are in TL, TR, BR, BL order for a proper quadrilateral.
+    """
+    points = corners[:, [TOP_LEFT, TOP_RIGHT, BOTTOM_RIGHT, BOTTOM_LEFT]].reshape(-1, 2)
+    return clamp_points_to_image(points, width, height).reshape(-1, 4, 2)
+
+
+def draw_vertebra_shapes(img: np.ndarray, polygons: np.ndarray, scale: float):
+    """
+    Draw semi-transparent quadrilaterals for the vertebrae, then their outlines.
 
-    if len(kp) < 4:
+    All fills go into one layer that is blended once, and only over the
+    union bounding box of the vertebrae, so the cost scales with the spine's
+    area rather than the image size times the vertebra count.
+    """
+    if len(polygons) == 0:
         return
 
-    # Define polygon points (TL, TR, BR, BL order for proper quadrilateral)
-    # Clamp to image bounds to prevent drawing outside
-    pts = np.array([
-        clamp_to_image(kp[0].x, kp[0].y, w, h),  # top-left
-        clamp_to_image(kp[1].x, kp[1].y, w, h),  # top-right
-        clamp_to_image(kp[3].x, kp[3].y, w, h),  # bottom-right
-        clamp_to_image(kp[2].x, kp[2].y, w, h),  # bottom-left
-    ], dtype=np.int32)
-
-    # Draw semi-transparent fill
-    overlay_copy = img.copy()
-    cv2.fillPoly(overlay_copy, [pts], COLORS["vertebra_fill"])
-    cv2.addWeighted(overlay_copy, 0.25, img, 0.75, 0, img)
-
-    # Draw outline
-    cv2.polylines(img, [pts], True, COLORS["vertebra_outline"],
+    x1, y1 = polygons.reshape(-1, 2).min(axis=0)
+    x2, y2 = polygons.reshape(-1, 2).max(axis=0) + 1
+    region = img[y1:y2, x1:x2]
+
+    # Fill each polygon on its own: one fillPoly call over overlapping
+    # polygons could leave their intersection unfilled
+    layer = region.copy()
+    offset = np.array([x1, y1], dtype=np.int32)
+    for pts in polygons:
+        cv2.fillPoly(layer, [pts - offset], COLORS["vertebra_fill"])
+    img[y1:y2, x1:x2] = cv2.addWeighted(layer, FILL_ALPHA, region, 1 - FILL_ALPHA, 0)
+
+    cv2.polylines(img, list(polygons), True, COLORS["vertebra_outline"],
                   thickness=max(1, int(2 * scale)), lineType=cv2.LINE_AA)
 
 
-def draw_keypoints(img: np.ndarray, vertebra: Vertebra, scale: float):
-    """Draw keypoint markers for a vertebra."""
+def draw_keypoints(img: np.ndarray, corners: np.ndarray, scale: float):
+    """Draw keypoint markers for a vertebra's (4, 2) corners."""
     h, w = img.shape[:2]
-    for kp in vertebra.keypoints:
-        # Clamp to image bounds
-        center = clamp_to_image(kp.x, kp.y, w, h)
+    # Clamp to image bounds
+    for x, y in clamp_points_to_image(corners, w, h).tolist():
+        center = (x, y)
         radius = max(3, int(4 * scale))
 
         # White filled circle
@@ -126,104 +147,80 @@ def draw_keypoints(img: np.ndarray, vertebra: Vertebra, scale: float):
                    thickness=max(1, int(1.5 * scale)), lineType=cv2.LINE_AA)
 
 
-def draw_spine_centerline(img: np.ndarray, vertebrae: List[Vertebra], scale: float):
+def draw_spine_centerline(img: np.ndarray, geometry: SpineGeometry, scale: float):
     """Draw a smooth line through vertebra centers."""
-    if len(vertebrae) < 2:
+    if len(geometry) < 2:
         return
 
     h, w = img.shape[:2]
 
-    # Calculate centers
-    centers = []
-    for v in vertebrae:
-        kp = v.keypoints
-        if len(kp) >= 4:
-            cx = (kp[0].x + kp[1].x + kp[2].x + kp[3].x) / 4
-            cy = (kp[0].y + kp[1].y + kp[2].y + kp[3].y) / 4
-            centers.append(clamp_to_image(cx, cy, w, h))
-
-    if len(centers) < 2:
-        return
-
     # Draw smooth curve through centers
-    pts = np.array(centers, dtype=np.int32).reshape(-1, 1, 2)
+    pts = clamp_points_to_image(geometry.centers, w, h).reshape(-1, 1, 2)
     cv2.polylines(img, [pts], False, COLORS["spine_line"],
                   thickness=max(2, int(3 * scale)), lineType=cv2.LINE_AA)
 
 
+def draw_extended_line(
+    img: np.ndarray,
+    start: List[float],
+    end: List[float],
+    extension: int,
+    scale: float
+):
+    """Draw an endplate line extended past both corners."""
+    h, w = img.shape[:2]
+    x1, y1 = int(start[0]), int(start[1])
+    x2, y2 = int(end[0]), int(end[1])
+
+    # Extend the line
+    dx, dy = x2 - x1, y2 - y1
+    length = np.sqrt(dx*dx + dy*dy)
+    if length > 0:
+        dx, dy = dx/length, dy/length
+        ext_x1 = int(x1 - dx * extension)
+        ext_y1 = int(y1 - dy * extension)
+        ext_x2 = int(x2 + dx * extension)
+        ext_y2 = int(y2 + dy * extension)
+
+        # Clamp extended line endpoints to image bounds
+        pt1 = clamp_to_image(ext_x1, ext_y1, w, h)
+        pt2 = clamp_to_image(ext_x2, ext_y2, w, h)
+        cv2.line(img, pt1, pt2,
+                 COLORS["cobb_line"], thickness=max(2, int(2.5 * scale)), lineType=cv2.LINE_AA)
+
+
 def draw_cobb_angle_lines(
     img: np.ndarray,
-    vertebrae: List[Vertebra],
+    geometry: SpineGeometry,
     cobb: CobbAngleMeasurement,
     scale: float
 ):
     """Draw Cobb angle measurement lines and annotation."""
     # Find upper and lower vertebrae by label
-    upper = None
-    lower = None
-
-    for v in vertebrae:
-        if v.label == cobb.upper_vertebra:
-            upper = v
-        if v.label == cobb.lower_vertebra:
-            lower = v
+    upper_idx = geometry.index_of(cobb.upper_vertebra)
+    lower_idx = geometry.index_of(cobb.lower_vertebra)
 
-    if not upper or not lower:
+    if upper_idx is None or lower_idx is None:
         return
 
     h, w = img.shape[:2]
     extension = int(80 * scale)  # How far to extend lines
 
+    upper_kp = geometry.keypoints[upper_idx, :, :2].tolist()
+    lower_kp = geometry.keypoints[lower_idx, :, :2].tolist()
+
     # Upper endplate line
-    upper_kp = upper.keypoints
-    if len(upper_kp) >= 2:
-        x1, y1 = int(upper_kp[0].x), int(upper_kp[0].y)
-        x2, y2 = int(upper_kp[1].x), int(upper_kp[1].y)
-
-        # Extend the line
-        dx, dy = x2 - x1, y2 - y1
-        length = np.sqrt(dx*dx + dy*dy)
-        if length > 0:
-            dx, dy = dx/length, dy/length
-            ext_x1 = int(x1 - dx * extension)
-            ext_y1 = int(y1 - dy * extension)
-            ext_x2 = int(x2 + dx * extension)
-            ext_y2 = int(y2 + dy * extension)
-
-            # Clamp extended line endpoints to image bounds
-            pt1 = clamp_to_image(ext_x1, ext_y1, w, h)
-            pt2 = clamp_to_image(ext_x2, ext_y2, w, h)
-            cv2.line(img, pt1, pt2,
-                     COLORS["cobb_line"], thickness=max(2, int(2.5 * scale)), lineType=cv2.LINE_AA)
+    draw_extended_line(img, upper_kp[TOP_LEFT], upper_kp[TOP_RIGHT], extension, scale)
 
     # Lower endplate line
-    lower_kp = lower.keypoints
-    if len(lower_kp) >= 4:
-        x1, y1 = int(lower_kp[2].x), int(lower_kp[2].y)
-        x2, y2 = int(lower_kp[3].x), int(lower_kp[3].y)
-
-        # Extend the line
-        dx, dy = x2 - x1, y2 - y1
-        length = np.sqrt(dx*dx + dy*dy)
-        if length > 0:
-            dx, dy = dx/length, dy/length
-            ext_x1 = int(x1 - dx * extension)
-            ext_y1 = int(y1 - dy * extension)
-            ext_x2 = int(x2 + dx * extension)
-            ext_y2 = int(y2 + dy * extension)
-
-            # Clamp extended line endpoints to image bounds
-            pt1 = clamp_to_image(ext_x1, ext_y1, w, h)
-            pt2 = clamp_to_image(ext_x2, ext_y2, w, h)
-            cv2.line(img, pt1, pt2,
-                     COLORS["cobb_line"], thickness=max(2, int(2.5 * scale)), lineType=cv2.LINE_AA)
+    draw_extended_line(img, lower_kp[BOTTOM_LEFT], lower_kp[BOTTOM_RIGHT], extension, scale)
 
     # Draw angle annotation
     # Position it to the right of the curve
-    upper_center_x = (upper_kp[0].x + upper_kp[1].x) / 2
-    lower_center_x = (lower_kp[2].x + lower_kp[3].x) / 2
+    upper_center_x = (upper_kp[TOP_LEFT][0] + upper_kp[TOP_RIGHT][0]) / 2
+    lower_center_x = (lower_kp[BOTTOM_LEFT][0] + lower_kp[BOTTOM_RIGHT][0]) / 2
     mid_x = int(max(upper_center_x, lower_center_x) + 30 * scale)
-    mid_y = int((upper_kp[0].y + lower_kp[2].y) / 2)
+    mid_y = int((upper_kp[TOP_LEFT][1] + lower_kp[BOTTOM_LEFT][1]) / 2)
 
     # Clamp annotation position to image bounds
     mid_x = max(0, min(mid_x, w - 1))
@@ -253,17 +250,14 @@ def draw_cobb_angle_lines(
                 font, font_scale, COLORS["cobb_line"], thickness, cv2.LINE_AA)
 
 
-def draw_vertebra_label(img: np.ndarray, vertebra: Vertebra, scale: float):
+def draw_vertebra_label(img: np.ndarray, corners: np.ndarray, label: str, scale: float):
     """Draw vertebra label (e.g., T1, L5) to the right of the vertebra."""
-    kp = vertebra.keypoints
+    kp = corners.tolist()
     h, w = img.shape[:2]
 
-    if len(kp) < 4:
-        return
-
     # Position label to the right, clamped to image bounds
-    label_x = int(max(kp[1].x, kp[3].x) + 10 * scale)
-    label_y = int((kp[0].y + kp[2].y) / 2)
+    label_x = int(max(kp[TOP_RIGHT][0], kp[BOTTOM_RIGHT][0]) + 10 * scale)
+    label_y = int((kp[TOP_LEFT][1] + kp[BOTTOM_LEFT][1]) / 2)
     label_x = max(0, min(label_x, w - 1))
     label_y = max(0, min(label_y, h - 1))
 
@@ -272,7 +266,7 @@ def draw_vertebra_label(img: np.ndarray, vertebra: Vertebra, scale: float):
     font_scale = 0.4 * scale
     thickness = max(1, int(1.5 * scale))
 
-    cv2.putText(img, vertebra.label, (label_x, label_y),
+    cv2.putText(img, label, (label_x, label_y),
                 font, font_scale, COLORS["vertebra_fill"], thickness, cv2.LINE_AA)
 
 
@@ -0,0 +1,144 @@
+"""
+Model warm-up at startup.
+
+The first forward pass pays for oneDNN kernel selection, allocator growth and
+lazy torchvision initialization. Running synthetic inputs through the models
+before serving traffic moves that cost out of the first real request. The
+readiness state is reported by /health so load balancers can hold traffic
+until warm-up finishes, and keep it away for good if the inference workers
+never came up.
+"""
+
+import time
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Tuple
+
+import numpy as np
+from PIL import Image
+
+from .inference import predict_spine
+from .worker_pool import get_worker_pool
+
+
+# Readiness states
+WARMUP_PENDING = "pending"
+WARMUP_RUNNING = "warming"
+WARMUP_DONE = "done"
+WARMUP_FAILED = "failed"
+
+_state = WARMUP_PENDING
+
+
+def get_warmup_state() -> str:
+    return _state
+
+
+def is_warming() -> bool:
+    return _state == WARMUP_RUNNING
+
+
+def mark_warming() -> None:
+    """Report "warming" from now on, before the warm-up thread has started."""
+    global _state
+    _state = WARMUP_RUNNING
+
+
+def parse_warmup_sizes(value: str) -> List[Tuple[int, int]]:
+    """Parse "WIDTHxHEIGHT,WIDTHxHEIGHT" into a list of (width, height)."""
+    sizes = []
+    for item in value.split(","):
+        item = item.strip().lower()
+        if not item:
+            continue
+        width, height = item.split("x")
+        sizes.append((int(width), int(height)))
+    return sizes
+
+
+def synthetic_xray(width: int, height: int) -> Image.Image:
+    """A grayscale-looking noise image with a bright vertical band, roughly X-ray shaped."""
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 80, size=(height, width), dtype=np.uint8)
+    band = slice(width * 2 // 5, width * 3 // 5)
+    pixels[:, band] += 120
+    return Image.fromarray(np.stack([pixels] * 3, axis=-1))
+
+
+def warmup_spine_model(sizes: List[Tuple[int, int]], runs: int = 1) -> None:
+    """
+    Run synthetic X-rays at the typical resolutions through the spine model.
+
+    With the inference worker pool running, each worker has already run
+    these passes itself while starting; this waits until all of them have.
+    """
+    pool = get_worker_pool()
+    if pool is not None:
+        pool.wait_ready()
+        return
+
+    for width, height in sizes:
+        image = synthetic_xray(width, height)
+        for _ in range(runs):
+            start_time = time.time()
+            predict_spine(image)
+            print(f"Warm-up: spine model {width}x{height} in {(time.time() - start_time) * 1000:.0f}ms")
+
+
+def warmup_ocr() -> None:
+    """Load the EasyOCR reader and run it once on a small synthetic corner."""
+    from .orientation import ocr_corners, prepare_corner
+
+    start_time = time.time()
+    gray = np.array(synthetic_xray(200, 150).convert('L'))
+    ocr_corners([prepare_corner(gray, (0, 0, 200, 150))])
+    print(f"Warm-up: EasyOCR in {(time.time() - start_time) * 1000:.0f}ms")
+
+
+def warmup_pose() -> None:
+    """Load the MediaPipe pose landmarker and run it once."""
+    from photo_analysis import detect_pose_landmarks
+
+    start_time = time.time()
+    detect_pose_landmarks(synthetic_xray(480, 640))
+    print(f"Warm-up: MediaPipe pose in {(time.time() - start_time) * 1000:.0f}ms")
+
+
+def run_warmup(
+    sizes: List[Tuple[int, int]],
+    runs: int = 1,
+    include_ocr: bool = False,
+    include_pose: bool = False
+) -> None:
+    """
+    Warm up the configured models. Blocking; run it in a worker thread.
+
+    Failures are logged and do not keep the instance out of rotation, since
+    a cold model is still better than no model. Inference workers that
+    failed to start are the exception: there is no model then, and the
+    state becomes "failed".
+    """
+    global _state
+    mark_warming()
+    start_time = time.time()
+
+    steps = [lambda: warmup_spine_model(sizes, runs)]
+    if include_ocr:
+        steps.append(warmup_ocr)
+    if include_pose:
+        steps.append(warmup_pose)
+
+    failed = False
+    for step in steps:
+        try:
+            step()
+        except BrokenProcessPool as e:
+            print(f"Warm-up failed, inference workers did not start: {e}")
+            failed = True
+        except Exception as e:
+            print(f"Warm-up step failed: {e}")
+
+    if failed:
+        _state = WARMUP_FAILED
+        return
+    _state = WARMUP_DONE
+    print(f"Warm-up complete in {(time.time() - start_time) * 1000:.0f}ms")
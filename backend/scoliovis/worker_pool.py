@@ -0,0 +1,230 @@
+"""
+Multi-process inference worker pool.
+
+Workers are started with "spawn", not forked: by the time the pool starts,
+the server process has run torch ops (loading, static-quantization
+calibration), and a forked child can deadlock on the OpenMP/intra-op thread
+pool it inherits. Each worker loads the model itself from the same
+memory-mapped weights file, so the weight pages are still shared through
+the page cache, then runs its own warm-up passes. Every worker gets its own
+pinned torch thread budget (and CPU cores where the platform allows), so
+workers do not fight each other or OpenCV/MediaPipe for cores.
+
+Decoded images reach the workers through shared memory rather than being
+pickled through the task queue.
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Dict, Any, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import torch
+from PIL import Image
+
+
+def _init_worker(
+    threads: int,
+    counter,
+    ready,
+    settings,
+    model_config: Dict[str, Any],
+    warmup_sizes: List[Tuple[int, int]],
+    warmup_runs: int
+) -> None:
+    """Runs once in each spawned worker: load the model, then warm it up."""
+    from .inference import configure_inference
+    from .model import load_model
+    from .warmup import warmup_spine_model
+
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+
+    # Pin the worker to its own slice of cores when there are enough of them
+    if hasattr(os, "sched_setaffinity"):
+        cores = sorted(os.sched_getaffinity(0))
+        first = index * threads
+        if first + threads <= len(cores):
+            os.sched_setaffinity(0, cores[first:first + threads])
+
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(1)
+
+    configure_inference(**vars(settings))
+    load_model(**model_config)
+    if warmup_sizes:
+        warmup_spine_model(warmup_sizes, warmup_runs)
+
+    with ready.get_lock():
+        ready.value += 1
+
+
+def _worker_ping() -> int:
+    return os.getpid()
+
+
+def _worker_predict(shm_name: str, shape: Tuple[int, ...], profile: str) -> Dict[str, np.ndarray]:
+    """Run detection on an image passed through shared memory."""
+    from .inference import predict_spine
+
+    # The parent owns (and unlinks) the segment. Workers share its resource
+    # tracker, where attaching registers the same name again (a no-op)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        pixels = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+        image = Image.fromarray(pixels.copy())
+    finally:
+        shm.close()
+
+    outputs = predict_spine(image, profile)
+    return {key: value.cpu().numpy() for key, value in outputs.items()}
+
+
+class InferenceWorkerPool:
+    """Spawned worker processes that run predict_spine on shared-memory images."""
+
+    def __init__(
+        self,
+        num_workers: int,
+        threads_per_worker: int,
+        settings,
+        model_config: Dict[str, Any],
+        warmup_sizes: Optional[List[Tuple[int, int]]] = None,
+        warmup_runs: int = 1,
+        start_timeout: float = 600.0
+    ):
+        self.num_workers = num_workers
+        self.start_timeout = start_timeout
+        self.threads_per_worker = max(1, threads_per_worker)
+        context = multiprocessing.get_context("spawn")
+        self._ready = context.Value("i", 0)
+        self._executor = ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(
+                self.threads_per_worker, context.Value("i", 0), self._ready,
+                settings, model_config, warmup_sizes or [], warmup_runs
+            ),
+        )
+        self._started = []
+        self._broken = False
+
+    def start(self) -> None:
+        """Start all workers now; they load and warm up in the background (see wait_ready)."""
+        # Each submit starts another process while none of them is idle yet
+        self._started = [self._executor.submit(_worker_ping) for _ in range(self.num_workers)]
+        print(f"Inference worker pool: {self.num_workers} workers, {self.threads_per_worker} threads each")
+
+    def wait_ready(self) -> None:
+        """
+        Block until every worker has loaded the model and run its warm-up passes.
+
+        Raises:
+            BrokenProcessPool: If a worker failed to start, or the workers are
+                not all ready after start_timeout seconds (a hung load); the
+                pool counts as broken from then on
+        """
+        start_time = time.time()
+        while self._ready.value < self.num_workers:
+            for future in self._started:
+                if future.done() and future.exception() is not None:
+                    self._broken = True
+                    raise future.exception()
+            if time.time() - start_time > self.start_timeout:
+                self._broken = True
+                raise BrokenProcessPool(
+                    f"{self._ready.value} of {self.num_workers} inference workers "
+                    f"ready after {self.start_timeout:g}s"
+                )
+            time.sleep(0.1)
+        print(f"Inference worker pool ready in {(time.time() - start_time) * 1000:.0f}ms")
+
+    def is_ready(self) -> bool:
+        """Whether every worker has loaded the model and warmed up, and the pool still works."""
+        return self._ready.value >= self.num_workers and not self.is_broken()
+
+    def is_broken(self) -> bool:
+        """
+        Whether the pool can no longer run inference: a worker failed to start
+        or died, and the executor refuses all further tasks.
+        """
+        if not self._broken:
+            self._broken = any(
+                future.done() and future.exception() is not None for future in self._started
+            )
+        return self._broken
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def predict(self, image: Image.Image, profile: str) -> Dict[str, Any]:
+        """Run detection in a worker. Blocking; returns the same format as predict_spine."""
+        pixels = np.asarray(image.convert("RGB"))
+        shm = shared_memory.SharedMemory(create=True, size=pixels.nbytes)
+        try:
+            np.ndarray(pixels.shape, dtype=np.uint8, buffer=shm.buf)[:] = pixels
+            outputs = self._executor.submit(
+                _worker_predict, shm.name, pixels.shape, profile
+            ).result()
+        except BrokenProcessPool:
+            self._broken = True
+            raise
+        finally:
+            shm.close()
+            shm.unlink()
+
+        return {key: torch.from_numpy(value) for key, value in outputs.items()}
+
+
+# Global worker pool (None when inference runs in the server process)
+_pool: Optional[InferenceWorkerPool] = None
+
+
+def get_worker_pool() -> Optional[InferenceWorkerPool]:
+    return _pool
+
+
+def start_worker_pool(
+    num_workers: int,
+    threads_per_worker: int,
+    settings,
+    model_config: Dict[str, Any],
+    warmup_sizes: Optional[List[Tuple[int, int]]] = None,
+    warmup_runs: int = 1,
+    start_timeout: float = 600.0
+) -> InferenceWorkerPool:
+    """
+    Start the global worker pool.
+
+    Args:
+        num_workers: Worker processes
+        threads_per_worker: Torch threads per worker
+        settings: InferenceSettings the workers run with
+        model_config: load_model keyword arguments
+        warmup_sizes: Synthetic (width, height) passes each worker runs before serving
+        warmup_runs: Passes per size
+        start_timeout: Seconds the workers get to load and warm up before
+            the pool counts as broken
+    """
+    global _pool
+    if _pool is None:
+        _pool = InferenceWorkerPool(
+            num_workers, threads_per_worker, settings, model_config,
+            warmup_sizes, warmup_runs, start_timeout
+        )
+        _pool.start()
+    return _pool
+
+
+def stop_worker_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
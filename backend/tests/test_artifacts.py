@@ -0,0 +1,64 @@
+"""Tests for the rendered image store (utils/artifacts.py)."""
+
+import threading
+
+import numpy as np
+
+from utils.artifacts import ArtifactStore
+
+
+def gradient(width: int = 64, height: int = 48) -> np.ndarray:
+    row = np.linspace(0, 255, width, dtype=np.uint8)
+    return np.repeat(np.tile(row, (height, 1))[:, :, None], 3, axis=2)
+
+
+def test_charges_render_inputs_and_encodings_only():
+    store = ArtifactStore(10 * 1024 * 1024, 60)
+    artifact_id = store.put(gradient, pending_bytes=1000)
+
+    webp, _, _ = store.fetch(artifact_id, "webp")
+    png, _, _ = store.fetch(artifact_id, "png", 32)
+
+    artifact = store._artifacts[artifact_id]
+    assert artifact.size() == 1000 + len(webp) + len(png)
+    assert not any(isinstance(value, np.ndarray) for value in vars(artifact).values())
+
+
+def test_renders_once_per_variant():
+    calls = []
+
+    def render():
+        calls.append(1)
+        return gradient()
+
+    store = ArtifactStore(10 * 1024 * 1024, 60)
+    artifact_id = store.put(render)
+
+    first = store.fetch(artifact_id, "webp")
+    assert store.fetch(artifact_id, "webp") == first
+    store.fetch(artifact_id, "jpeg")
+
+    assert len(calls) == 2
+
+
+def test_concurrent_variants_and_puts():
+    store = ArtifactStore(10 * 1024 * 1024, 60)
+    artifact_id = store.put(gradient)
+    errors = []
+
+    def fetch_variants(image_format):
+        try:
+            for max_width in range(16, 64):
+                store.fetch(artifact_id, image_format, max_width)
+                store.put(gradient, 100)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=fetch_variants, args=(f,)) for f in ("webp", "jpeg", "png")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(store._artifacts[artifact_id].encodings) == 3 * 48
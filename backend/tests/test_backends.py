@@ -0,0 +1,61 @@
+"""Output parity of the exported inference backends (scoliovis/backends.py)."""
+
+import os
+
+import pytest
+import torch
+
+from export_model import check_parity
+from scoliovis.backends import EagerBackend, export_onnx, export_torchscript
+from scoliovis.model import build_model, load_backend
+from scoliovis.warmup import synthetic_xray
+
+
+WEIGHTS_PATH = os.getenv("MODEL_PATH", "models/keypointsrcnn_weights.pt")
+
+# Same default as export_model.py --check, in pixels
+TOLERANCE = 1.0
+
+# Set in CI (with the weights downloaded) so missing weights or ONNX packages
+# fail these tests instead of skipping them
+REQUIRE_PARITY = os.getenv("REQUIRE_BACKEND_PARITY", "false").lower() == "true"
+
+pytestmark = pytest.mark.skipif(
+    not REQUIRE_PARITY and not os.path.exists(WEIGHTS_PATH),
+    reason=f"model weights not found at {WEIGHTS_PATH}"
+)
+
+
+@pytest.fixture(scope="module")
+def eager():
+    device = torch.device("cpu")
+    return EagerBackend(build_model(WEIGHTS_PATH, device), device)
+
+
+@pytest.fixture(scope="module")
+def images():
+    return [synthetic_xray(800, 1333), synthetic_xray(600, 1500)]
+
+
+def test_torchscript_matches_eager(eager, images, tmp_path):
+    artifact_path = str(tmp_path / "model.torchscript.pt")
+    with torch.no_grad():
+        export_torchscript(eager.model, artifact_path)
+
+    exported = load_backend("torchscript", WEIGHTS_PATH, torch.device("cpu"), artifact_path)
+
+    assert check_parity(eager, exported, images, TOLERANCE)
+
+
+def test_onnx_matches_eager(eager, images, tmp_path):
+    if REQUIRE_PARITY:
+        import onnxruntime  # noqa: F401
+    else:
+        pytest.importorskip("onnxruntime")
+    artifact_path = str(tmp_path / "model.onnx")
+    with torch.no_grad():
+        export_onnx(eager.model, artifact_path)
+
+    exported = load_backend("onnx", WEIGHTS_PATH, torch.device("cpu"), artifact_path)
+
+    assert check_parity(eager, exported, images, TOLERANCE)
@@ -0,0 +1,140 @@
+"""Tests for the size-bounded LRU cache (utils/cache.py)."""
+
+import torch
+
+from scoliovis.inference import get_inference_settings
+from utils.cache import (
+    LRUCache, SMALL_ENTRY_BYTES, outputs_nbytes, configure_cache, cached_outputs
+)
+
+
+def keys(cache: LRUCache):
+    return list(cache._entries)
+
+
+def test_evicts_least_recently_used_to_stay_within_bound():
+    cache = LRUCache(100)
+    cache.put("a", 1, 40)
+    cache.put("b", 2, 40)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+
+    cache.put("c", 3, 40)
+
+    assert keys(cache) == ["a", "c"]
+    assert cache.get("b") is None
+    assert cache.stats()["size_bytes"] == 80
+    assert cache.stats()["evictions"] == 1
+
+
+def test_evicts_as_many_entries_as_needed():
+    cache = LRUCache(100)
+    for key in "abcd":
+        cache.put(key, key, 25)
+
+    cache.put("big", "big", 90)
+
+    assert keys(cache) == ["big"]
+    assert cache.stats()["size_bytes"] == 90
+    assert cache.stats()["evictions"] == 4
+
+
+def test_put_replaces_an_entry_and_its_size():
+    cache = LRUCache(100)
+    cache.put("a", 1, 60)
+    cache.put("b", 2, 30)
+
+    cache.put("a", 3, 20)
+
+    assert cache.get("a") == 3
+    assert keys(cache) == ["b", "a"]
+    assert cache.stats()["size_bytes"] == 50
+    assert cache.stats()["evictions"] == 0
+
+
+def test_entry_larger_than_the_cache_is_not_stored():
+    cache = LRUCache(100)
+    cache.put("a", 1, 50)
+
+    cache.put("huge", 2, 101)
+
+    assert keys(cache) == ["a"]
+    assert cache.stats()["size_bytes"] == 50
+
+
+def test_disabled_cache_stores_nothing():
+    for max_bytes in (0, -5):
+        cache = LRUCache(max_bytes)
+        cache.put("a", 1, 0)
+        cache.put("b", 2, 10)
+
+        assert cache.stats()["entries"] == 0
+        assert cache.stats()["max_bytes"] == 0
+        assert cache.get("a") is None
+
+
+def test_non_positive_sizes_are_not_stored():
+    cache = LRUCache(100)
+    cache.put("zero", 1, 0)
+    cache.put("negative", 2, -10)
+
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["size_bytes"] == 0
+
+
+def test_get_or_compute_computes_once_and_counts_hits():
+    cache = LRUCache(100)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return "value"
+
+    assert cache.get_or_compute("k", compute, lambda _: 10) == "value"
+    assert cache.get_or_compute("k", compute, lambda _: 10) == "value"
+
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_get_or_compute_on_a_disabled_cache_always_computes():
+    cache = LRUCache(0)
+    calls = []
+
+    for _ in range(3):
+        cache.get_or_compute("k", lambda: calls.append(1) or "value", lambda _: 10)
+
+    assert len(calls) == 3
+    assert cache.stats()["entries"] == 0
+
+
+def test_clear_resets_size():
+    cache = LRUCache(100)
+    cache.put("a", 1, 40)
+
+    cache.clear()
+
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["size_bytes"] == 0
+
+
+def test_outputs_nbytes_charges_tensors_and_a_floor():
+    empty = {"boxes": torch.zeros(0, 4), "scores": torch.zeros(0), "keypoints": torch.zeros(0, 4, 3)}
+    outputs = {"boxes": torch.zeros(5, 4), "scores": torch.zeros(5), "keypoints": torch.zeros(5, 4, 3)}
+
+    assert outputs_nbytes(empty) == SMALL_ENTRY_BYTES
+    assert outputs_nbytes(outputs) == SMALL_ENTRY_BYTES + 4 * (20 + 5 + 60)
+
+
+def test_outputs_for_the_default_profile_share_one_entry():
+    configure_cache(1024 * 1024)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"boxes": torch.zeros(1, 4)}
+
+    cached_outputs("digest", None, compute)
+    cached_outputs("digest", get_inference_settings().profile, compute)
+
+    assert len(calls) == 1
@@ -0,0 +1,141 @@
+"""Tests for the vectorized Cobb angle measurement (scoliovis/cobb_angle.py)."""
+
+import numpy as np
+import pytest
+
+from scoliovis.cobb_angle import cobb_angle_matrix, select_curves, calculate_all_cobb_angles
+from scoliovis.geometry import SpineGeometry
+
+
+# Endplate tilts (degrees) of an S-shaped spine, T1..L5: a thoracic curve
+# between T4 and T11 (10 - (-30) = 40) and a lumbar one between T11 and L3
+# (5 - (-30) = 35)
+S_CURVE_TILTS = [2, 3, 6, 10, 8, 4, 0, -8, -15, -22, -30, -20, -10, 0, 5, 3, 1]
+
+
+def spine_from_tilts(upper_tilts, lower_tilts=None, width=40.0, height=30.0, spacing=45.0):
+    """Geometry of vertebrae stacked top to bottom with the given endplate tilts."""
+    lower_tilts = upper_tilts if lower_tilts is None else lower_tilts
+    keypoints = []
+    for i, (upper, lower) in enumerate(zip(upper_tilts, lower_tilts)):
+        center = np.array([300.0 + 5 * np.sin(i / 3), 100.0 + i * spacing])
+        corners = []
+        for tilt, dy in ((upper, -height / 2), (lower, height / 2)):
+            half = np.array([np.cos(np.radians(tilt)), np.sin(np.radians(tilt))]) * width / 2
+            corners += [center + [0, dy] - half, center + [0, dy] + half]
+        keypoints.append(corners)
+    keypoints = np.array(keypoints)
+    boxes = np.concatenate([keypoints.min(axis=1), keypoints.max(axis=1)], axis=1)
+    return SpineGeometry.from_arrays(keypoints, boxes, np.full(len(keypoints), 0.9))
+
+
+def reference_angle(v1: np.ndarray, v2: np.ndarray) -> float:
+    """The original per-pair angle between two endplate vectors."""
+    norm1, norm2 = np.linalg.norm(v1), np.linalg.norm(v2)
+    if norm1 == 0 or norm2 == 0:
+        return 0.0
+    return float(np.degrees(np.arccos(np.clip(np.dot(v1 / norm1, v2 / norm2), -1.0, 1.0))))
+
+
+def test_cobb_angle_matrix_matches_pairwise_angles():
+    rng = np.random.default_rng(0)
+    geometry = spine_from_tilts(rng.uniform(-40, 40, 17), rng.uniform(-40, 40, 17))
+
+    angles = cobb_angle_matrix(geometry)
+
+    assert angles.shape == (17, 17)
+    for i in range(17):
+        for j in range(17):
+            expected = reference_angle(geometry.upper_endplates[i], geometry.lower_endplates[j])
+            assert angles[i, j] == pytest.approx(expected, abs=1e-6)
+
+
+def test_cobb_angle_matrix_is_tilt_difference():
+    geometry = spine_from_tilts(S_CURVE_TILTS)
+    tilts = np.array(S_CURVE_TILTS, dtype=float)
+
+    angles = cobb_angle_matrix(geometry)
+
+    np.testing.assert_allclose(angles, np.abs(tilts[:, None] - tilts[None, :]), atol=1e-6)
+
+
+def test_cobb_angle_matrix_zero_length_endplate():
+    geometry = spine_from_tilts([0, 10, 20, 30, 40])
+    keypoints = geometry.keypoints.copy()
+    keypoints[2, 1, :2] = keypoints[2, 0, :2]  # collapse the upper endplate of vertebra 2
+    geometry = SpineGeometry.from_arrays(keypoints, geometry.boxes, geometry.scores)
+
+    angles = cobb_angle_matrix(geometry)
+
+    assert np.all(angles[2] == 0.0)
+    assert not np.isnan(angles).any()
+
+
+def test_select_curves_finds_both_curves_of_an_s_spine():
+    angles = cobb_angle_matrix(spine_from_tilts(S_CURVE_TILTS))
+
+    curves = select_curves(angles)
+
+    assert [(upper, lower) for upper, lower, _ in curves] == [(3, 10), (10, 14)]
+    assert [angle for _, _, angle in curves] == pytest.approx([40.0, 35.0])
+
+
+def test_select_curves_top_k_and_thresholds():
+    angles = cobb_angle_matrix(spine_from_tilts(S_CURVE_TILTS))
+
+    assert [c[:2] for c in select_curves(angles, top_k=1)] == [(3, 10)]
+    assert select_curves(angles, min_angle=45.0) == []
+    # Without a minimum span, the primary curve is still the largest pair
+    assert select_curves(angles, min_span=1)[0][:2] == (3, 10)
+
+
+def test_select_curves_threshold_applies_to_the_reported_angle():
+    # 9.96 degrees is reported as 10.0, so it counts as a curve
+    angles = cobb_angle_matrix(spine_from_tilts([0, 0, 0, 9.96, 9.96, 9.96]))
+
+    curves = select_curves(angles, min_angle=10.0)
+
+    assert len(curves) == 1
+    assert round(curves[0][2], 1) == 10.0
+    assert select_curves(cobb_angle_matrix(spine_from_tilts([0, 0, 0, 9.94, 9.94])), min_angle=10.0) == []
+
+
+def test_select_curves_spine_without_curves():
+    angles = cobb_angle_matrix(spine_from_tilts([1, 2, 0, -1, 2, 3, 1, 0, -2]))
+
+    assert select_curves(angles) == []
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_select_curves_invariants(seed):
+    rng = np.random.default_rng(seed)
+    tilts = np.cumsum(rng.uniform(-8, 8, 17))
+    angles = cobb_angle_matrix(spine_from_tilts(tilts))
+
+    curves = select_curves(angles)
+
+    # Every curve is at least MIN_CURVE_SPAN long and past MIN_COBB_ANGLE, largest first
+    for upper, lower, angle in curves:
+        assert lower - upper >= 3
+        assert angle >= 10.0
+        assert angle == pytest.approx(angles[upper, lower])
+    assert [c[2] for c in curves] == sorted((c[2] for c in curves), reverse=True)
+
+    # Curves never overlap; neighbours may share an end vertebra
+    spans = sorted((upper, lower) for upper, lower, _ in curves)
+    for (_, previous_lower), (upper, _) in zip(spans, spans[1:]):
+        assert upper >= previous_lower
+
+    # The primary curve is the largest pair overall
+    if curves:
+        rows, cols = np.indices(angles.shape)
+        assert curves[0][2] == pytest.approx(angles[cols - rows >= 3].max())
+
+
+def test_calculate_all_cobb_angles_labels_curves():
+    measurements = calculate_all_cobb_angles(spine_from_tilts(S_CURVE_TILTS))
+
+    assert [(m.upper_vertebra, m.lower_vertebra, m.angle) for m in measurements] == [
+        ("T4", "T11", 40.0), ("T11", "L3", 35.0)
+    ]
+    assert calculate_all_cobb_angles(spine_from_tilts(S_CURVE_TILTS[:4])) == []
@@ -0,0 +1,50 @@
+"""Tests for the classical L/R marker pre-detector (scoliovis/markers.py)."""
+
+import cv2
+import numpy as np
+import pytest
+
+from scoliovis.markers import find_marker
+
+
+FONTS = {
+    "simplex": cv2.FONT_HERSHEY_SIMPLEX,
+    "duplex": cv2.FONT_HERSHEY_DUPLEX,
+    "complex": cv2.FONT_HERSHEY_COMPLEX,
+}
+
+
+def corner_with(text: str, font: int, thickness: int = 3, mirrored: bool = False) -> np.ndarray:
+    """A dark film corner with a bright lead label."""
+    corner = np.full((260, 400), 30, dtype=np.uint8)
+    cv2.putText(corner, text, (40, 180), font, 2, 230, thickness, cv2.LINE_AA)
+    return np.ascontiguousarray(np.fliplr(corner)) if mirrored else corner
+
+
+def detect(corner: np.ndarray):
+    return find_marker(corner, corner.shape[1], corner.shape[0])
+
+
+@pytest.mark.parametrize("font", FONTS.values(), ids=FONTS.keys())
+@pytest.mark.parametrize("mirrored", [False, True], ids=["upright", "mirrored"])
+@pytest.mark.parametrize("letter", ["L", "R"])
+def test_finds_the_marker_letter(letter, mirrored, font):
+    result = detect(corner_with(letter, font, mirrored=mirrored))
+
+    assert result is not None
+    assert result[0] == letter
+
+
+@pytest.mark.parametrize("font", FONTS.values(), ids=FONTS.keys())
+@pytest.mark.parametrize("mirrored", [False, True], ids=["upright", "mirrored"])
+@pytest.mark.parametrize("text", ["PA", "P", "K"])
+def test_ignores_letters_that_resemble_r(text, mirrored, font):
+    assert detect(corner_with(text, font, mirrored=mirrored)) is None
+
+
+@pytest.mark.parametrize("thickness", [2, 5])
+def test_finds_thin_and_bold_strokes(thickness):
+    result = detect(corner_with("L", cv2.FONT_HERSHEY_SIMPLEX, thickness))
+
+    assert result is not None
+    assert result[0] == "L"
@@ -0,0 +1,219 @@
+"""Tests for detection filtering and mirroring (scoliovis/postprocessing.py)."""
+
+import pytest
+import torch
+from torchvision.ops import nms
+
+from scoliovis.postprocessing import (
+    filter_detections, filter_detections_batch, mirror_detections
+)
+
+
+def reference_filter_spatial_outliers(boxes, scores, keypoints, x_deviation_threshold=2.5, y_gap_threshold=2.0):
+    """The original per-image outlier filter, kept as the behaviour to match."""
+    if len(boxes) < 3:
+        return boxes, scores, keypoints
+
+    center_x = (boxes[:, 0] + boxes[:, 2]) / 2
+    center_y = (boxes[:, 1] + boxes[:, 3]) / 2
+    median_x = torch.median(center_x)
+    x_deviations = torch.abs(center_x - median_x)
+    mad_x = torch.median(x_deviations)
+    min_mad = (boxes[:, 2] - boxes[:, 0]).median() * 0.3
+    mad_x = torch.max(mad_x, min_mad)
+    x_inlier_mask = x_deviations <= (x_deviation_threshold * mad_x)
+
+    y_gap_mask = torch.ones(len(boxes), dtype=torch.bool)
+    y_sorted_indices = torch.argsort(center_y)
+    sorted_y = center_y[y_sorted_indices]
+    gaps = sorted_y[1:] - sorted_y[:-1]
+    median_gap = torch.median(gaps)
+    for i in range(len(y_sorted_indices)):
+        original_idx = y_sorted_indices[i]
+        if i > 0 and gaps[i - 1] > y_gap_threshold * median_gap and i == len(y_sorted_indices) - 1:
+            y_gap_mask[original_idx] = False
+        if i < len(gaps) and gaps[i] > y_gap_threshold * median_gap and i == 0:
+            y_gap_mask[original_idx] = False
+
+    keep_mask = x_inlier_mask & y_gap_mask
+    if keep_mask.sum() < 3:
+        keep_mask = x_inlier_mask
+        if keep_mask.sum() < 3:
+            _, closest_indices = torch.topk(-x_deviations, min(3, len(boxes)))
+            keep_mask = torch.zeros(len(boxes), dtype=torch.bool)
+            keep_mask[closest_indices] = True
+
+    return boxes[keep_mask], scores[keep_mask], keypoints[keep_mask]
+
+
+def reference_filter_detections(outputs, confidence_threshold=0.5, nms_threshold=0.3, max_detections=17):
+    """The original per-image filter_detections, kept as the behaviour to match."""
+    boxes, scores, keypoints = outputs["boxes"], outputs["scores"], outputs["keypoints"]
+
+    confident_mask = scores >= confidence_threshold
+    boxes, scores, keypoints = boxes[confident_mask], scores[confident_mask], keypoints[confident_mask]
+    if len(boxes) == 0:
+        return {"boxes": [], "scores": [], "keypoints": []}
+
+    keep = nms(boxes, scores, nms_threshold)
+    boxes, scores, keypoints = boxes[keep], scores[keep], keypoints[keep]
+
+    order = torch.argsort(boxes[:, 1])
+    boxes, scores, keypoints = boxes[order], scores[order], keypoints[order]
+
+    if len(boxes) >= 3:
+        boxes, scores, keypoints = reference_filter_spatial_outliers(boxes, scores, keypoints)
+
+    if len(boxes) > max_detections:
+        top_k = torch.topk(scores, max_detections).indices
+        boxes, scores, keypoints = boxes[top_k], scores[top_k], keypoints[top_k]
+        order = torch.argsort(boxes[:, 1])
+        boxes, scores, keypoints = boxes[order], scores[order], keypoints[order]
+
+    return {
+        "boxes": boxes.numpy().tolist(),
+        "scores": scores.numpy().tolist(),
+        "keypoints": keypoints.numpy().tolist()
+    }
+
+
+def box_keypoints(boxes: torch.Tensor) -> torch.Tensor:
+    """TL, TR, BL, BR corners of each box with a visibility of 1."""
+    x1, y1, x2, y2 = boxes.unbind(1)
+    corners = torch.stack([
+        torch.stack([x1, y1], 1), torch.stack([x2, y1], 1),
+        torch.stack([x1, y2], 1), torch.stack([x2, y2], 1)
+    ], dim=1)
+    return torch.cat([corners, torch.ones(len(boxes), 4, 1)], dim=2)
+
+
+def synthetic_outputs(generator: torch.Generator, vertebrae: int, duplicates: int, outliers: int):
+    """
+    Raw model outputs for a spine column: stacked vertebrae with lateral drift,
+    shifted duplicates for NMS to remove, and stray boxes off the column.
+    Scores are distinct so the top-k step has a single answer.
+    """
+    def rand(*shape):
+        return torch.rand(*shape, generator=generator)
+
+    y = 100 + torch.arange(vertebrae, dtype=torch.float32) * 60 + rand(vertebrae) * 10
+    x = 500 + torch.cumsum(rand(vertebrae) * 20 - 10, 0)
+    spine = torch.stack([x - 40, y, x + 40, y + 45], dim=1)
+
+    pick = torch.randint(0, vertebrae, (duplicates,), generator=generator)
+    shifted = spine[pick] + rand(duplicates, 4) * 6
+
+    stray_x = torch.where(rand(outliers) < 0.5, 100.0, 900.0) + rand(outliers) * 50
+    stray_y = rand(outliers) * (y[-1] + 400)
+    strays = torch.stack([stray_x - 30, stray_y, stray_x + 30, stray_y + 40], dim=1)
+
+    boxes = torch.cat([spine, shifted, strays])
+    scores = torch.randperm(len(boxes), generator=generator).float() / len(boxes) * 0.55 + 0.45
+    return {"boxes": boxes, "scores": scores, "keypoints": box_keypoints(boxes)}
+
+
+def assert_same_detections(actual, expected):
+    assert len(actual["boxes"]) == len(expected["boxes"])
+    for key in ("boxes", "scores", "keypoints"):
+        assert torch.allclose(torch.tensor(actual[key]), torch.tensor(expected[key]))
+
+
+CASES = [
+    # (vertebrae, duplicates, outliers)
+    (17, 0, 0),
+    (17, 5, 3),
+    (22, 4, 2),
+    (28, 3, 3),  # more than 17 left after filtering: exercises top-k
+    (6, 2, 4),
+    (3, 0, 2),
+    (2, 1, 0),  # fewer than 3: no outlier filtering
+]
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("case", CASES)
+def test_filter_detections_matches_per_image_filter(seed, case):
+    outputs = synthetic_outputs(torch.Generator().manual_seed(seed), *case)
+    assert_same_detections(filter_detections(outputs), reference_filter_detections(outputs))
+
+
+def test_filter_detections_batch_matches_per_image_filter():
+    generator = torch.Generator().manual_seed(42)
+    outputs_list = [synthetic_outputs(generator, *case) for case in CASES for _ in range(2)]
+
+    results = filter_detections_batch(outputs_list)
+
+    assert len(results) == len(outputs_list)
+    for result, outputs in zip(results, outputs_list):
+        assert_same_detections(result, reference_filter_detections(outputs))
+
+
+def test_filter_detections_batch_handles_images_without_confident_detections():
+    generator = torch.Generator().manual_seed(0)
+    spine = synthetic_outputs(generator, 17, 2, 2)
+    empty = {"boxes": torch.zeros(0, 4), "scores": torch.zeros(0), "keypoints": torch.zeros(0, 4, 3)}
+    faint = dict(spine, scores=spine["scores"] * 0.1)
+
+    results = filter_detections_batch([empty, spine, faint])
+
+    assert results[0] == {"boxes": [], "scores": [], "keypoints": []}
+    assert_same_detections(results[1], reference_filter_detections(spine))
+    assert results[2] == {"boxes": [], "scores": [], "keypoints": []}
+    assert filter_detections_batch([]) == []
+
+
+def test_filter_detections_sorts_top_to_bottom():
+    outputs = synthetic_outputs(torch.Generator().manual_seed(3), 17, 0, 0)
+    order = torch.randperm(17, generator=torch.Generator().manual_seed(1))
+    shuffled = {key: value[order] for key, value in outputs.items()}
+
+    tops = [box[1] for box in filter_detections(shuffled)["boxes"]]
+    assert tops == sorted(tops)
+
+
+def test_mirror_detections_mirrors_boxes_and_swaps_corners():
+    boxes = torch.tensor([[10.0, 20.0, 50.0, 60.0]])
+    keypoints = torch.tensor([[
+        [12.0, 21.0, 0.9],  # TL
+        [48.0, 25.0, 0.8],  # TR
+        [11.0, 58.0, 0.7],  # BL
+        [49.0, 55.0, 0.6],  # BR
+    ]])
+    outputs = {"boxes": boxes, "scores": torch.tensor([0.9]), "keypoints": keypoints}
+
+    mirrored = mirror_detections(outputs, width=100)
+
+    assert mirrored["boxes"].tolist() == [[50.0, 20.0, 90.0, 60.0]]
+    # The old TR becomes the new TL (and so on), at x = width - x
+    assert mirrored["keypoints"].tolist() == [[
+        [52.0, 25.0, 0.800000011920929],
+        [88.0, 21.0, 0.8999999761581421],
+        [51.0, 55.0, 0.6000000238418579],
+        [89.0, 58.0, 0.699999988079071],
+    ]]
+    assert mirrored["scores"] is outputs["scores"]
+
+
+def test_mirror_detections_round_trip_leaves_input_untouched():
+    outputs = synthetic_outputs(torch.Generator().manual_seed(7), 17, 3, 3)
+    outputs["keypoints_scores"] = torch.rand(len(outputs["boxes"]), 4)
+    original = {key: value.clone() for key, value in outputs.items()}
+
+    restored = mirror_detections(mirror_detections(outputs, 1000), 1000)
+
+    for key, value in original.items():
+        assert torch.equal(outputs[key], value)
+        assert torch.allclose(restored[key], value)
+
+
+def test_mirror_detections_commutes_with_filtering():
+    width = 1000
+    outputs = synthetic_outputs(torch.Generator().manual_seed(11), 17, 4, 3)
+
+    filtered_then_mirrored = mirror_detections(
+        {key: torch.tensor(value) for key, value in filter_detections(outputs).items()}, width
+    )
+    mirrored_then_filtered = filter_detections(mirror_detections(outputs, width))
+
+    for key in ("boxes", "scores", "keypoints"):
+        assert torch.allclose(filtered_then_mirrored[key], torch.tensor(mirrored_then_filtered[key]))
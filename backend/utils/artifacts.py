@@ -0,0 +1,157 @@
+"""
+Short-lived store for rendered images (annotated X-rays, pose overlays).
+
+Analysis responses reference images by id instead of inlining multi-megabyte
+base64 PNGs. An artifact is registered with a render function and is only
+drawn when a (format, max_width) encoding is first requested; the encoding
+is kept, the full-resolution drawing is not. Artifacts expire after a TTL and the store is bounded by
+total size, evicting the least recently used artifacts first.
+
+Encoded variants never change for a given id, so they are served with a
+strong ETag and cached by the browser for the artifact's remaining lifetime.
+"""
+
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+# Supported output formats: OpenCV extension, media type, encode parameters
+ARTIFACT_FORMATS = {
+    "webp": (".webp", "image/webp", [cv2.IMWRITE_WEBP_QUALITY, 90]),
+    "jpeg": (".jpg", "image/jpeg", [cv2.IMWRITE_JPEG_QUALITY, 90]),
+    "png": (".png", "image/png", [cv2.IMWRITE_PNG_COMPRESSION, 3]),
+}
+
+
+@dataclass
+class Artifact:
+    """A lazily rendered image and its encoded variants."""
+    render: Callable[[], np.ndarray]
+    expires_at: float
+    # Charged for the render inputs, kept to draw further variants
+    pending_bytes: int
+    encodings: Dict[Tuple[str, Optional[int]], Tuple[bytes, str]] = field(default_factory=dict)
+    # Total length of the encodings, updated with them under the lock
+    encoded_bytes: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def size(self) -> int:
+        # Reads counters only: encodings may be added while the store sizes us
+        return self.pending_bytes + self.encoded_bytes
+
+
+def encode_image(image: np.ndarray, image_format: str, max_width: Optional[int]) -> bytes:
+    """Encode an RGB image, downscaling it to max_width if it is wider."""
+    extension, _, params = ARTIFACT_FORMATS[image_format]
+
+    height, width = image.shape[:2]
+    if max_width and width > max_width:
+        new_height = max(1, round(height * max_width / width))
+        image = cv2.resize(image, (max_width, new_height), interpolation=cv2.INTER_AREA)
+
+    if image.ndim == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    else:
+        image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+
+    ok, buffer = cv2.imencode(extension, image, params)
+    if not ok:
+        raise ValueError(f"Could not encode image as {image_format}")
+    return buffer.tobytes()
+
+
+class ArtifactStore:
+    """Thread-safe, TTL- and size-bounded store of lazily rendered images."""
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._artifacts: "OrderedDict[str, Artifact]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, render: Callable[[], np.ndarray], pending_bytes: int = 0) -> str:
+        """Register an image to be rendered on first fetch; returns its id."""
+        artifact_id = uuid.uuid4().hex
+        artifact = Artifact(render, time.time() + self.ttl_seconds, pending_bytes)
+        with self._lock:
+            self._artifacts[artifact_id] = artifact
+            self._evict()
+        return artifact_id
+
+    def _evict(self) -> None:
+        """Drop expired artifacts, then the least recently used ones over the size bound."""
+        now = time.time()
+        for artifact_id in [k for k, a in self._artifacts.items() if a.expires_at <= now]:
+            del self._artifacts[artifact_id]
+
+        total = sum(a.size() for a in self._artifacts.values())
+        while total > self.max_bytes and len(self._artifacts) > 1:
+            _, evicted = self._artifacts.popitem(last=False)
+            total -= evicted.size()
+
+    def _get(self, artifact_id: str) -> Optional[Artifact]:
+        with self._lock:
+            artifact = self._artifacts.get(artifact_id)
+            if artifact is None:
+                return None
+            if artifact.expires_at <= time.time():
+                del self._artifacts[artifact_id]
+                return None
+            self._artifacts.move_to_end(artifact_id)
+            return artifact
+
+    def fetch(
+        self,
+        artifact_id: str,
+        image_format: str = "webp",
+        max_width: Optional[int] = None
+    ) -> Optional[Tuple[bytes, str, float]]:
+        """
+        Encoded artifact, rendering and encoding it on first use. Blocking.
+
+        Returns:
+            Tuple of (bytes, ETag, expiry timestamp), or None if the id is
+            unknown or expired
+        """
+        artifact = self._get(artifact_id)
+        if artifact is None:
+            return None
+
+        key = (image_format, max_width)
+        with artifact.lock:
+            encoded = artifact.encodings.get(key)
+            if encoded is None:
+                # The drawing is dropped once encoded; clients fetch one or two
+                # variants, and keeping a full-resolution RGB copy for the
+                # artifact's lifetime costs more than drawing it again
+                data = encode_image(artifact.render(), image_format, max_width)
+                etag = '"' + hashlib.sha1(data).hexdigest() + '"'
+                encoded = artifact.encodings[key] = (data, etag)
+                artifact.encoded_bytes += len(data)
+
+        with self._lock:
+            self._evict()
+
+        return encoded[0], encoded[1], artifact.expires_at
+
+
+# Global store (configured at startup)
+_store = ArtifactStore(160 * 1024 * 1024, 3600)
+
+
+def configure_artifacts(max_bytes: int, ttl_seconds: float) -> ArtifactStore:
+    global _store
+    _store = ArtifactStore(max_bytes, ttl_seconds)
+    return _store
+
+
+def get_artifact_store() -> ArtifactStore:
+    return _store
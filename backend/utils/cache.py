@@ -0,0 +1,190 @@
+"""
+Content-addressed, memory-bounded LRU cache for per-image work.
+
+The same X-ray usually reaches the API several times: /detect-orientation,
+then /analyze, then /analyze again after the user flips the image or confirms
+the orientation. Entries are keyed by the SHA-256 of the uploaded file bytes,
+so every repeat of that work becomes a lookup:
+
+- the decoded, validated image
+- the raw model outputs (per detector profile)
+- the L/R marker detection result
+
+Model outputs and marker results are cached for the image as uploaded; a
+flipped request mirrors them (see api/pipeline.py) instead of recomputing.
+
+Cached values are shared between requests and must not be mutated.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import torch
+from PIL import Image
+
+from scoliovis.inference import get_inference_settings
+from .validation import validate_image_bytes
+
+
+# Rough size charged for small Python objects such as OCR results
+SMALL_ENTRY_BYTES = 4 * 1024
+
+
+class LRUCache:
+    """Thread-safe LRU cache that evicts by total estimated size in bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max(0, max_bytes)
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value (marking it recently used), or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: int) -> None:
+        """
+        Store a value, evicting least recently used entries to stay within max_bytes.
+
+        Nothing is stored when the cache is disabled (max_bytes 0), or for a
+        size that is not positive: such entries would never count against
+        the bound.
+        """
+        if self.max_bytes <= 0 or size <= 0 or size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[1]
+
+            self._entries[key] = (value, size)
+            self._size += size
+
+            while self._size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self.evictions += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any], sizeof: Callable[[Any], int]) -> Any:
+        """
+        Return the cached value or compute, store and return it.
+
+        Concurrent misses on the same key may both compute; the results are
+        equivalent, so the duplicate work is accepted rather than serialized.
+        """
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value, sizeof(value))
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+def image_digest(image_data: bytes) -> str:
+    """Content address of an uploaded image file."""
+    return hashlib.sha256(image_data).hexdigest()
+
+
+def image_nbytes(image: Image.Image) -> int:
+    """Decoded size of a PIL image."""
+    return image.width * image.height * len(image.getbands())
+
+
+def outputs_nbytes(outputs: Dict[str, Any]) -> int:
+    """Size of a raw model output dict (at least SMALL_ENTRY_BYTES, even with no detections)."""
+    return SMALL_ENTRY_BYTES + sum(
+        value.element_size() * value.nelement()
+        for value in outputs.values()
+        if isinstance(value, torch.Tensor)
+    )
+
+
+# Global cache (disabled until configured)
+_cache = LRUCache(0)
+
+
+def configure_cache(max_bytes: int) -> LRUCache:
+    """Replace the global cache with one bounded to max_bytes (0 disables caching)."""
+    global _cache
+    _cache = LRUCache(max_bytes)
+    return _cache
+
+
+def get_cache() -> LRUCache:
+    return _cache
+
+
+def load_image_cached(image_data: bytes, digest: Optional[str] = None) -> Tuple[str, Image.Image]:
+    """
+    Validate and decode image bytes, reusing an earlier decode of the same file.
+
+    Args:
+        image_data: Raw file bytes
+        digest: Their content digest, if already known
+
+    Returns:
+        Tuple of (content digest, validated RGB image)
+
+    Raises:
+        ValidationError: If the image is invalid
+    """
+    digest = digest or image_digest(image_data)
+
+    def decode() -> Image.Image:
+        image = validate_image_bytes(image_data)
+        # Decode now: lazily loaded images are not safe to share between threads
+        image.load()
+        return image
+
+    return digest, _cache.get_or_compute(("image", digest), decode, image_nbytes)
+
+
+def cached_outputs(
+    digest: str,
+    profile: Optional[str],
+    compute: Callable[[], Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Raw model outputs for an unflipped image, computed once per profile.
+
+    No profile means the deployment default, which shares its entry with
+    requests naming that profile explicitly.
+    """
+    profile = profile or get_inference_settings().profile
+    return _cache.get_or_compute(("outputs", digest, profile), compute, outputs_nbytes)
+
+
+def cached_orientation(digest: str, compute: Callable[[], Any]) -> Any:
+    """L/R marker detection for an unflipped image, computed once."""
+    return _cache.get_or_compute(
+        ("orientation", digest), compute, lambda _: SMALL_ENTRY_BYTES
+    )
@@ -0,0 +1,148 @@
+"""
+Bounded executors for the blocking stages of a request.
+
+Route handlers are async, but decoding, OCR, inference, MediaPipe and
+rendering are blocking CPU work. Each stage runs on its own thread pool with
+a fixed number of workers, so a slow X-ray never stalls the event loop (and
+with it /health), and one stage cannot starve the others.
+
+Each stage also admits only a bounded number of queued calls. When a stage
+is full, StageBusyError is raised immediately instead of letting the request
+wait until the client times out; routes answer it with 429 and a
+Retry-After estimated from the stage's recent latency.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+STAGES = ("decode", "ocr", "inference", "render", "pose")
+
+# Workers per stage. EasyOCR and MediaPipe keep one shared model each, so they
+# run one call at a time; inference allows a full micro-batch to form.
+DEFAULT_STAGE_CONCURRENCY = {
+    "decode": 4,
+    "ocr": 1,
+    "inference": 4,
+    "render": 2,
+    "pose": 1,
+}
+
+
+class StageBusyError(Exception):
+    """A stage has no free worker and its queue is full."""
+    def __init__(self, stage: str, retry_after: int):
+        self.stage = stage
+        self.retry_after = retry_after
+        super().__init__(f"The server is busy ({stage}). Please retry in {retry_after}s.")
+
+
+class StageExecutor:
+    """Thread pool with a cap on running plus queued calls."""
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.capacity = self.max_workers + max(0, max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"stage-{name}")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        # Exponential moving average of call duration, for Retry-After
+        self._avg_seconds = 1.0
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                raise StageBusyError(self.name, self.retry_after())
+            self._in_flight += 1
+
+    def _release(self, duration: Optional[float]) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            if duration is not None:
+                self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * duration
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained."""
+        rounds = self._in_flight / self.max_workers
+        return max(1, math.ceil(rounds * self._avg_seconds))
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run fn(*args) on this stage's workers."""
+        self._acquire()
+
+        def timed() -> Any:
+            start_time = time.monotonic()
+            try:
+                return fn(*args)
+            finally:
+                self._release(time.monotonic() - start_time)
+
+        future = self._executor.submit(timed)
+        # A call cancelled while still queued never runs timed(), so release its slot here
+        future.add_done_callback(lambda f: self._release(None) if f.cancelled() else None)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "in_flight": self._in_flight,
+                "capacity": self.capacity,
+                "avg_ms": round(self._avg_seconds * 1000, 1),
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+_stages: Dict[str, StageExecutor] = {}
+
+
+def parse_stage_concurrency(value: str) -> Dict[str, int]:
+    """Parse "inference=2,ocr=1" into per-stage worker counts (unlisted stages keep defaults)."""
+    concurrency = dict(DEFAULT_STAGE_CONCURRENCY)
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, workers = item.split("=")
+        name = name.strip().lower()
+        if name not in STAGES:
+            raise ValueError(f"Unknown stage '{name}'. Use one of: {', '.join(STAGES)}")
+        concurrency[name] = int(workers)
+    return concurrency
+
+
+def configure_stages(concurrency: Dict[str, int], max_queue: int = 16) -> None:
+    """Create the stage executors (replacing any existing ones)."""
+    shutdown_stages()
+    for name in STAGES:
+        workers = concurrency.get(name, DEFAULT_STAGE_CONCURRENCY[name])
+        _stages[name] = StageExecutor(name, workers, max_queue)
+
+
+def shutdown_stages() -> None:
+    for executor in _stages.values():
+        executor.shutdown()
+    _stages.clear()
+
+
+def get_stage_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: executor.stats() for name, executor in _stages.items()}
+
+
+async def run_stage(stage: str, fn: Callable[..., Any], *args: Any) -> Any:
+    """
+    Run blocking work on a stage executor.
+
+    Raises:
+        StageBusyError: If the stage is at capacity
+    """
+    if not _stages:
+        configure_stages(DEFAULT_STAGE_CONCURRENCY)
+    return await _stages[stage].run(fn, *args)
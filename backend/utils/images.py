@@ -0,0 +1,28 @@
+"""
+Image files on disk, for the offline scripts (batch analysis, profile
+benchmark, quantization report).
+"""
+
+import os
+from typing import List
+
+
+# Extensions the scripts pick up; PIL and OpenCV decode all of them
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def is_image_file(name: str) -> bool:
+    return name.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def list_images(directory: str, recursive: bool = False) -> List[str]:
+    """Image paths relative to directory, sorted."""
+    if not recursive:
+        return sorted(name for name in os.listdir(directory) if is_image_file(name))
+
+    paths = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if is_image_file(name):
+                paths.append(os.path.relpath(os.path.join(root, name), directory))
+    return sorted(paths)
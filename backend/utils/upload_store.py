@@ -0,0 +1,101 @@
+"""
+Short-lived store of staged X-ray uploads.
+
+The X-ray flow sends the same image twice: to /detect-orientation, then to
+/analyze with the confirmed orientation. /detect-orientation stages the
+upload here and returns its upload_id; /analyze accepts that id in place of
+the image, so the client uploads the X-ray once.
+
+A staged upload is the content digest plus the (compressed) file bytes. The
+decoded image itself lives only in the image cache (utils/cache.py), so
+/analyze reuses that decode; the bytes are there to decode again should the
+cache have evicted it.
+
+Uploads expire after a TTL and the store is bounded by file size,
+evicting the least recently used uploads first. An id is a random token,
+not the image digest, so it can only be used by the client it was given to.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class StagedUpload:
+    """A validated image file awaiting analysis."""
+    digest: str
+    data: bytes
+    expires_at: float
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+
+class UploadStore:
+    """Thread-safe, TTL- and size-bounded store of uploaded image files."""
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._uploads: "OrderedDict[str, StagedUpload]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._size = 0
+
+    def put(self, digest: str, data: bytes) -> Optional[str]:
+        """
+        Stage a validated image file.
+
+        Returns:
+            The upload id, or None if the store is disabled or the file alone exceeds it
+        """
+        if len(data) > self.max_bytes:
+            return None
+
+        upload_id = uuid.uuid4().hex
+        upload = StagedUpload(digest, data, time.time() + self.ttl_seconds)
+        with self._lock:
+            self._uploads[upload_id] = upload
+            self._size += upload.size
+            self._evict()
+        return upload_id
+
+    def _evict(self) -> None:
+        """Drop expired uploads, then the least recently used ones over the size bound."""
+        now = time.time()
+        for upload_id in [k for k, u in self._uploads.items() if u.expires_at <= now]:
+            self._size -= self._uploads.pop(upload_id).size
+
+        while self._size > self.max_bytes:
+            _, evicted = self._uploads.popitem(last=False)
+            self._size -= evicted.size
+
+    def get(self, upload_id: str) -> Optional[StagedUpload]:
+        """The staged upload, or None if the id is unknown, expired or evicted."""
+        with self._lock:
+            upload = self._uploads.get(upload_id)
+            if upload is None:
+                return None
+            if upload.expires_at <= time.time():
+                self._size -= self._uploads.pop(upload_id).size
+                return None
+            self._uploads.move_to_end(upload_id)
+            return upload
+
+
+# Global store (configured at startup)
+_store = UploadStore(32 * 1024 * 1024, 900)
+
+
+def configure_uploads(max_bytes: int, ttl_seconds: float) -> UploadStore:
+    global _store
+    _store = UploadStore(max_bytes, ttl_seconds)
+    return _store
+
+
+def get_upload_store() -> UploadStore:
+    return _store
@@ -22,36 +22,61 @@ class ErrorCodes:
     INSUFFICIENT_VERTEBRAE = "INSUFFICIENT_VERTEBRAE"
     LOW_CONFIDENCE = "LOW_CONFIDENCE"
     MODEL_ERROR = "MODEL_ERROR"
+    SERVER_BUSY = "SERVER_BUSY"
+    ARTIFACT_NOT_FOUND = "ARTIFACT_NOT_FOUND"
+    UPLOAD_NOT_FOUND = "UPLOAD_NOT_FOUND"
+    UNSUPPORTED_PROFILE = "UNSUPPORTED_PROFILE"
 
 
 # Validation constants
 MIN_DIMENSION = 256
 MAX_DIMENSION = 4096
+MAX_UPLOAD_BYTES = 50 * 1024 * 1024
 MIN_VERTEBRAE = 5
 MIN_CONFIDENCE = 0.3
 
 
-def validate_base64_image(base64_string: str) -> Image.Image:
+def decode_base64_data(base64_string: str) -> bytes:
     """
-    Validate and decode a base64 encoded image string.
+    Decode a base64 image string into the raw file bytes.
 
     Args:
         base64_string: Base64 encoded image (with or without data URL prefix)
 
     Returns:
-        PIL Image object
+        Encoded image file bytes
 
     Raises:
-        ValidationError: If the image is invalid
+        ValidationError: If the string is not valid base64
     """
     try:
         # Handle data URL prefix
         if "," in base64_string:
             base64_string = base64_string.split(",")[1]
 
-        # Decode base64
-        image_data = base64.b64decode(base64_string)
+        return base64.b64decode(base64_string)
+
+    except base64.binascii.Error:
+        raise ValidationError(
+            "Invalid base64 encoding. Please provide a valid base64 image string.",
+            ErrorCodes.INVALID_BASE64
+        )
+
+
+def open_image_bytes(image_data: bytes) -> Image.Image:
+    """
+    Open and verify encoded image bytes.
+
+    Args:
+        image_data: Encoded image file bytes
+
+    Returns:
+        PIL Image object
 
+    Raises:
+        ValidationError: If the bytes are not a readable image
+    """
+    try:
         # Open as PIL Image
         image = Image.open(io.BytesIO(image_data))
 
@@ -63,11 +88,6 @@ def validate_base64_image(base64_string: str) -> Image.Image:
 
         return image
 
-    except base64.binascii.Error:
-        raise ValidationError(
-            "Invalid base64 encoding. Please provide a valid base64 image string.",
-            ErrorCodes.INVALID_BASE64
-        )
     except Exception as e:
         raise ValidationError(
             f"Invalid image file: {str(e)}. Please upload a valid JPG or PNG image.",
@@ -75,6 +95,22 @@ def validate_base64_image(base64_string: str) -> Image.Image:
         )
 
 
+def validate_base64_image(base64_string: str) -> Image.Image:
+    """
+    Validate and decode a base64 encoded image string.
+
+    Args:
+        base64_string: Base64 encoded image (with or without data URL prefix)
+
+    Returns:
+        PIL Image object
+
+    Raises:
+        ValidationError: If the image is invalid
+    """
+    return open_image_bytes(decode_base64_data(base64_string))
+
+
 def validate_image_format(image: Image.Image) -> None:
     """
     Validate that the image format is supported.
@@ -159,21 +195,21 @@ def validate_detection_results(
             )
 
 
-def validate_image(base64_string: str) -> Image.Image:
+def validate_image_bytes(image_data: bytes) -> Image.Image:
     """
-    Full validation pipeline for input images.
+    Full validation pipeline for encoded image bytes.
 
     Args:
-        base64_string: Base64 encoded image
+        image_data: Encoded image file bytes (JPG, PNG or WEBP)
 
     Returns:
-        Validated PIL Image object
+        Validated PIL Image object in RGB mode
 
     Raises:
         ValidationError: If any validation fails
     """
-    # 1. Decode and validate base64
-    image = validate_base64_image(base64_string)
+    # 1. Open and verify the file
+    image = open_image_bytes(image_data)
 
     # 2. Validate format
     validate_image_format(image)
@@ -186,3 +222,19 @@ def validate_image(base64_string: str) -> Image.Image:
         image = image.convert("RGB")
 
     return image
+
+
+def validate_image(base64_string: str) -> Image.Image:
+    """
+    Full validation pipeline for input images.
+
+    Args:
+        base64_string: Base64 encoded image
+
+    Returns:
+        Validated PIL Image object
+
+    Raises:
+        ValidationError: If any validation fails
+    """
+    return validate_image_bytes(decode_base64_data(base64_string))